@@ -5,33 +5,211 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
-from flask import Flask
-from database import init_database, add_sample_data
+import functools
+import os
+import time
+from contextlib import ExitStack
+from typing import Dict, Optional
+import click
+from flask import Flask, abort, g, request
+from flask.json.provider import DefaultJSONProvider
+from database import (
+    init_database, init_branch_databases, add_sample_data, get_schema_version, check_patron_counters,
+    archive_returned_loans, refresh_overdue_loans, configure_branches, get_branches, use_branch,
+    ARCHIVE_AFTER_DAYS, OVERDUE_REFRESH_INTERVAL
+)
+from instrumentation import init_instrumentation
+from models import Record
 from routes import register_blueprints
+from storage import create_repository, get_repository, set_repository
+from templating import init_templating
+from services.overdue_scheduler import OverdueScheduler
 
 
-def create_app():
+# Request header naming the branch library a request is for; set it per
+# branch site in the reverse proxy. Requests without it use LIBRARY_DATABASE.
+BRANCH_HEADER = 'X-Library-Branch'
+
+
+class LibraryJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the Book and BorrowRecord row models."""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Record):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+
+def create_app(config: Optional[Dict] = None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        config: Optional settings applied on top of the defaults. Set
+            INSTRUMENTATION to True to record per-request query and timing
+            metrics (also enabled by LIBRARY_INSTRUMENTATION=1). Set
+            MIGRATE_ON_STARTUP or SAMPLE_DATA_ON_STARTUP to False (or
+            LIBRARY_MIGRATE_ON_STARTUP=0 / LIBRARY_SAMPLE_DATA_ON_STARTUP=0)
+            to leave schema migrations and sample data to the
+            "flask migrate-db" and "flask seed-sample-data" commands. Set
+            OVERDUE_SCHEDULER to True (or LIBRARY_OVERDUE_SCHEDULER=1) to
+            assess overdue loans on a background thread in this process.
+            Set RESPONSE_CACHE to False (or LIBRARY_RESPONSE_CACHE=0) to
+            render /catalog and the searches on every request, without
+            ETags or 304 responses. Compiled templates are cached on disk in
+            TEMPLATE_CACHE_DIR (LIBRARY_TEMPLATE_CACHE_DIR), by default a
+            per-user directory under the system temp dir. BRANCHES maps
+            branch keys to their database files (default: LIBRARY_BRANCHES,
+            e.g. "east=east.db,west=west.db"); requests with an
+            X-Library-Branch header are served from that branch's file.
+            STORAGE picks the storage engine the services use (default:
+            LIBRARY_STORAGE or 'sqlite'); 'memory' keeps the catalog and
+            loans in this process only, with no database file, migrations
+            or overdue scheduler.
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
+    app.json = LibraryJSONProvider(app)
     app.secret_key = "super secret key"
+    app.config['INSTRUMENTATION'] = os.environ.get('LIBRARY_INSTRUMENTATION') == '1'
+    app.config['MIGRATE_ON_STARTUP'] = os.environ.get('LIBRARY_MIGRATE_ON_STARTUP', '1') == '1'
+    app.config['SAMPLE_DATA_ON_STARTUP'] = os.environ.get('LIBRARY_SAMPLE_DATA_ON_STARTUP', '1') == '1'
+    app.config['OVERDUE_SCHEDULER'] = os.environ.get('LIBRARY_OVERDUE_SCHEDULER') == '1'
+    app.config['RESPONSE_CACHE'] = os.environ.get('LIBRARY_RESPONSE_CACHE', '1') == '1'
+    app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('LIBRARY_TEMPLATE_CACHE_DIR')
+    app.config['BRANCHES'] = None
+    app.config['STORAGE'] = os.environ.get('LIBRARY_STORAGE', 'sqlite')
+    app.config.update(config or {})
     
-    # Initialize the database
-    init_database()
+    set_repository(create_repository(app.config['STORAGE']))
+    uses_database = app.config['STORAGE'] == 'sqlite'
     
-    # Add sample data for testing and demonstration
-    add_sample_data()
+    if app.config['BRANCHES'] is not None:
+        configure_branches(app.config['BRANCHES'])
+    
+    if app.config['MIGRATE_ON_STARTUP'] and uses_database:
+        # Initialize the database and every branch shard
+        init_database()
+        init_branch_databases()
+    
+    if app.config['SAMPLE_DATA_ON_STARTUP']:
+        # Add sample data for testing and demonstration
+        get_repository().add_sample_data()
     
     # Register all route blueprints
     register_blueprints(app)
+    register_branch_routing(app)
+    init_templating(app, app.config['TEMPLATE_CACHE_DIR'])
+    register_commands(app)
+    
+    if app.config['INSTRUMENTATION']:
+        init_instrumentation(app)
+    
+    if app.config['OVERDUE_SCHEDULER'] and uses_database:
+        scheduler = OverdueScheduler()
+        scheduler.start()
+        app.extensions['overdue_scheduler'] = scheduler
     
     return app
 
 
+def register_branch_routing(app):
+    """Serve each request from the branch shard named in its X-Library-Branch header."""
+    
+    @app.before_request
+    def select_branch():
+        branch = request.headers.get(BRANCH_HEADER)
+        if branch is None:
+            return
+        stack = ExitStack()
+        try:
+            stack.enter_context(use_branch(branch))
+        except ValueError as e:
+            abort(400, description=str(e))
+        g._branch_context = stack
+    
+    @app.teardown_request
+    def release_branch(exc):
+        stack = g.pop('_branch_context', None)
+        if stack is not None:
+            stack.close()
+
+
+def branch_option(command):
+    """Add a --branch option that runs the command against that branch's shard."""
+    @click.option('--branch', type=click.Choice(get_branches()), default=None,
+                  help="Branch shard to use (default: LIBRARY_DATABASE).")
+    @functools.wraps(command)
+    def wrapper(branch, **kwargs):
+        with use_branch(branch):
+            return command(**kwargs)
+    return wrapper
+
+
+def register_commands(app):
+    """Register the database management commands with the Flask CLI."""
+    
+    @app.cli.command('migrate-db')
+    def migrate_db_command():
+        """Apply pending schema migrations to the database and every branch shard."""
+        init_database()
+        click.echo(f"Database schema is at version {get_schema_version()}.")
+        for branch in get_branches():
+            with use_branch(branch):
+                init_database()
+                click.echo(f"Branch {branch} schema is at version {get_schema_version()}.")
+    
+    @app.cli.command('seed-sample-data')
+    def seed_sample_data_command():
+        """Add the sample books and loan if the catalog is empty."""
+        init_database()
+        add_sample_data()
+        click.echo("Sample data is in place.")
+    
+    @app.cli.command('check-patron-counters')
+    @click.option('--repair', is_flag=True, help="Rebuild the counters from borrow_records if any are off.")
+    @branch_option
+    def check_patron_counters_command(repair):
+        """Compare patron loan/fee counters with borrow_records."""
+        mismatches = check_patron_counters(repair=repair)
+        for row in mismatches:
+            click.echo(f"{row['patron_id']}: active_loans {row['active_loans']} "
+                       f"(expected {row['expected_active_loans']}), outstanding_fees "
+                       f"{row['outstanding_fees']:.2f} (expected {row['expected_outstanding_fees']:.2f})")
+        if not mismatches:
+            click.echo("Patron counters are consistent.")
+        elif repair:
+            click.echo(f"Rebuilt counters after {len(mismatches)} mismatches.")
+        else:
+            raise SystemExit(1)
+    
+    @app.cli.command('archive-loans')
+    @click.option('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS, show_default=True,
+                  help="Archive loans returned more than this many days ago.")
+    @branch_option
+    def archive_loans_command(older_than_days):
+        """Move old returned loans from borrow_records to borrow_records_archive."""
+        archived = archive_returned_loans(older_than_days)
+        click.echo(f"Archived {archived} loans returned more than {older_than_days} days ago.")
+    
+    @app.cli.command('refresh-overdue-loans')
+    @click.option('--every', type=int, default=None,
+                  help=f"Keep running, refreshing every N seconds (e.g. {OVERDUE_REFRESH_INTERVAL}).")
+    @branch_option
+    def refresh_overdue_loans_command(every):
+        """Assess late fees for loans that became overdue since the last run."""
+        while True:
+            result = refresh_overdue_loans()
+            click.echo(f"{result['newly_overdue']} newly overdue, {result['overdue_loans']} overdue loans "
+                       f"as of {result['watermark']:%Y-%m-%d %H:%M:%S}.")
+            if not every:
+                return
+            time.sleep(every)
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,6 @@
+"""
+Benchmarks Package - Performance benchmarks for the Library Management System
+
+Run a benchmark from the repository root, e.g.:
+    python -m benchmarks.bench_borrow_contention
+"""
@@ -0,0 +1,74 @@
+"""
+Loan archive benchmark: hot-path latency before and after archiving returned loans.
+
+Seeds patrons with long borrowing histories, times open-loan lookups,
+borrow/return cycles and full histories, then runs archive_returned_loans()
+and times the same operations again. Also reports archive throughput and
+how many loans are left in borrow_records.
+
+    python -m benchmarks.bench_archive --patrons 20000 --loans-per-patron 50
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+import database
+from benchmarks.common import temp_database, seed_books, seed_patrons, summarize
+
+
+def measure(patrons: int, books: int, repeat: int, seed: int = 327):
+    rng = random.Random(seed)
+    results = {'open loans': [], 'borrow+return': [], 'history': []}
+    for _ in range(repeat):
+        patron_id = f'{100000 + rng.randrange(patrons):06d}'
+        book_id = rng.randrange(books) + 1
+        
+        started = time.perf_counter()
+        database.get_patron_borrowed_books(patron_id)
+        results['open loans'].append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        now = datetime.now()
+        status, _ = database.borrow_book_transaction(patron_id, book_id, now, now, borrow_limit=10 ** 6)
+        if status == 'borrowed':
+            database.return_book_transaction(patron_id, book_id, now)
+        results['borrow+return'].append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        database.get_patron_borrowing_history(patron_id)
+        results['history'].append(time.perf_counter() - started)
+    return {name: summarize(samples) for name, samples in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--patrons', type=int, default=20000)
+    parser.add_argument('--loans-per-patron', type=int, default=50)
+    parser.add_argument('--older-than-days', type=int, default=database.ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_database():
+        seed_books(args.books)
+        seed_patrons(args.patrons, args.loans_per_patron, args.books)
+        before = measure(args.patrons, args.books, args.repeat)
+        
+        started = time.perf_counter()
+        archived = database.archive_returned_loans(args.older_than_days)
+        elapsed = time.perf_counter() - started
+        stats = database.get_archive_stats()
+        print(f"archived {archived} loans in {elapsed:.2f}s ({archived / elapsed if elapsed else 0:.0f}/s); "
+              f"{stats['borrow_records']} left in borrow_records")
+        
+        after = measure(args.patrons, args.books, args.repeat)
+        print(f"\n{'operation':<14} {'before p50':>11} {'after p50':>10} {'before p95':>11} {'after p95':>10}")
+        for name in before:
+            print(f"{name:<14} {before[name]['p50_ms']:>11.3f} {after[name]['p50_ms']:>10.3f} "
+                  f"{before[name]['p95_ms']:>11.3f} {after[name]['p95_ms']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Batch borrowing benchmark: a stack of books borrowed and returned one at a time vs in one batch.
+
+Seeds a temporary catalog, then for each stack size times a patron
+borrowing and returning that many books through the single-book service
+functions and through the batch ones, and counts the SQL statements and
+connection checkouts each makes (executemany counts once per row).
+
+    python -m benchmarks.bench_batch_borrowing --stacks 1 3 5 --rounds 200
+"""
+
+import argparse
+import time
+
+from benchmarks.common import temp_database, seed_books, count_queries, summarize
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, borrow_books_by_patron, return_books_by_patron
+)
+
+
+def single(patron_id: str, book_ids):
+    for book_id in book_ids:
+        borrow_book_by_patron(patron_id, book_id)
+    for book_id in book_ids:
+        return_book_by_patron(patron_id, book_id)
+
+
+def batch(patron_id: str, book_ids):
+    borrow_books_by_patron(patron_id, book_ids)
+    return_books_by_patron(patron_id, book_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--stacks', type=int, nargs='+', default=[1, 3, 5])
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    with temp_database():
+        seed_books(args.books)
+        print(f"{'stack':>5} {'mode':>7} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'connections':>12}")
+        for stack in args.stacks:
+            for name, run in (('single', single), ('batch', batch)):
+                samples = []
+                for round_number in range(args.rounds):
+                    book_ids = [(round_number * stack + i) % args.books + 1 for i in range(stack)]
+                    started = time.perf_counter()
+                    run(f'{round_number % 1000:06d}', book_ids)
+                    samples.append(time.perf_counter() - started)
+                with count_queries() as counts:
+                    run('999999', list(range(1, stack + 1)))
+                stats = summarize(samples)
+                print(f"{stack:>5} {name:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                      f"{counts['queries']:>8} {counts['connections']:>12}")
+
+
+if __name__ == '__main__':
+    main()
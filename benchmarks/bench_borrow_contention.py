@@ -0,0 +1,106 @@
+"""
+Borrow contention stress benchmark.
+
+Many threads race to borrow copies of the same book. The transactional
+path (borrow_book_transaction) must never hand out more copies than exist;
+the legacy read-check-then-write path is run alongside for comparison.
+
+    python -m benchmarks.bench_borrow_contention --threads 64 --copies 10 --attempts 2000
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.common import temp_database
+
+
+def legacy_borrow(patron_id: str, book_id: int) -> bool:
+    """The original borrow sequence: separate connections and commits per step."""
+    book = database.get_book_by_id(book_id)
+    if not book or book['available_copies'] <= 0:
+        return False
+    if database.get_patron_borrow_count(patron_id) > 5:
+        return False
+    now = datetime.now()
+    if not database.insert_borrow_record(patron_id, book_id, now, now + timedelta(days=14)):
+        return False
+    return database.update_book_availability(book_id, -1)
+
+
+def atomic_borrow(patron_id: str, book_id: int) -> bool:
+    now = datetime.now()
+    status, _ = database.borrow_book_transaction(patron_id, book_id, now, now + timedelta(days=14),
+                                                 borrow_limit=5)
+    return status == 'borrowed'
+
+
+def run(borrow, threads: int, copies: int, attempts: int) -> dict:
+    with temp_database():
+        database.insert_book('Contended Book', 'Bench Author', '9999999999999', copies, copies)
+        book_id = database.get_book_by_isbn('9999999999999')['id']
+
+        successes = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(threads)
+
+        def worker(index):
+            start_barrier.wait()
+            for attempt in range(index, attempts, threads):
+                patron_id = f'{attempt % 1000000:06d}'
+                if borrow(patron_id, book_id):
+                    with lock:
+                        successes.append(patron_id)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        book = database.get_book_by_id(book_id)
+        conn = database.get_db_connection()
+        records = conn.execute('SELECT COUNT(*) FROM borrow_records WHERE book_id = ?',
+                               (book_id,)).fetchone()[0]
+        conn.close()
+        return {
+            'successful_borrows': len(successes),
+            'borrow_records': records,
+            'available_copies': book['available_copies'],
+            'oversold': max(0, records - copies),
+            'elapsed_s': elapsed,
+            'attempts_per_s': attempts / elapsed if elapsed else 0.0
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--copies', type=int, default=10)
+    parser.add_argument('--attempts', type=int, default=2000)
+    parser.add_argument('--skip-legacy', action='store_true', help='only run the transactional path')
+    args = parser.parse_args()
+
+    paths = [('transactional', atomic_borrow)]
+    if not args.skip_legacy:
+        paths.append(('legacy', legacy_borrow))
+
+    failed = False
+    for name, borrow in paths:
+        result = run(borrow, args.threads, args.copies, args.attempts)
+        print(f"{name:>13}: {result['successful_borrows']} borrowed of {args.copies} copies, "
+              f"{result['borrow_records']} records, available_copies={result['available_copies']}, "
+              f"oversold={result['oversold']}, {result['attempts_per_s']:.0f} attempts/s")
+        if name == 'transactional' and (result['oversold'] or result['available_copies'] < 0):
+            failed = True
+
+    if failed:
+        raise SystemExit('transactional borrow path oversold')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Loan date storage benchmark: ISO-8601 TEXT vs integer epoch seconds.
+
+Builds two copies of the same synthetic loans, one with dates stored as
+ISO-8601 text (schema versions 1 to 5) and one as epoch seconds (version 6
+on), and times the work each read path does with them:
+
+- python: fetch every loan and turn its three dates into datetimes, as the
+  patron helpers did (fromisoformat, with due_date parsed twice) vs
+  from_timestamp
+- sql: per-loan days overdue for open loans with julianday() vs integer
+  arithmetic, the expression used by the late fee and counter queries
+
+    python -m benchmarks.bench_date_storage --loans 1000000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models import to_timestamp, from_timestamp
+
+SCHEMA = '''
+    CREATE TABLE loans_{kind} (
+        id INTEGER PRIMARY KEY,
+        borrow_date {type} NOT NULL,
+        due_date {type} NOT NULL,
+        return_date {type}
+    )
+'''
+
+SQL_DAYS = {
+    'iso': '''SELECT SUM(CAST(julianday(:as_of) - julianday(due_date) AS INTEGER)) FROM loans_iso
+              WHERE return_date IS NULL AND due_date < :as_of''',
+    'epoch': '''SELECT SUM((:as_of - due_date) / 86400) FROM loans_epoch
+                WHERE return_date IS NULL AND due_date < :as_of''',
+}
+
+
+def seed(conn, count: int, seed: int = 327):
+    rng = random.Random(seed)
+    now = datetime.now()
+    iso_rows, epoch_rows = [], []
+    for i in range(count):
+        borrow_date = now - timedelta(days=rng.uniform(0, 720))
+        due_date = borrow_date + timedelta(days=14)
+        return_date = borrow_date + timedelta(days=rng.uniform(1, 20)) if rng.random() < 0.8 else None
+        iso_rows.append((i, borrow_date.isoformat(), due_date.isoformat(),
+                         return_date.isoformat() if return_date else None))
+        epoch_rows.append((i, to_timestamp(borrow_date), to_timestamp(due_date),
+                           to_timestamp(return_date) if return_date else None))
+    for kind, column_type, rows in (('iso', 'TEXT', iso_rows), ('epoch', 'INTEGER', epoch_rows)):
+        conn.execute(SCHEMA.format(kind=kind, type=column_type))
+        conn.executemany(f'INSERT INTO loans_{kind} VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+
+
+def python_iso(conn):
+    for borrow_date, due_date, return_date in conn.execute('SELECT borrow_date, due_date, return_date FROM loans_iso'):
+        datetime.fromisoformat(borrow_date)
+        datetime.fromisoformat(due_date)
+        datetime.now() > datetime.fromisoformat(due_date)
+        if return_date:
+            datetime.fromisoformat(return_date)
+
+
+def python_epoch(conn):
+    for borrow_date, due_date, return_date in conn.execute('SELECT borrow_date, due_date, return_date FROM loans_epoch'):
+        from_timestamp(borrow_date)
+        datetime.now() > from_timestamp(due_date)
+        if return_date:
+            from_timestamp(return_date)
+
+
+def best_of(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='library_bench_')
+    conn = sqlite3.connect(os.path.join(directory, 'dates.db'))
+    try:
+        seed(conn, args.loans)
+        now = datetime.now()
+        params = {'iso': {'as_of': now.isoformat()}, 'epoch': {'as_of': to_timestamp(now)}}
+        
+        python_seconds = {'iso': best_of(args.repeat, lambda: python_iso(conn)),
+                          'epoch': best_of(args.repeat, lambda: python_epoch(conn))}
+        sql_seconds = {kind: best_of(args.repeat, lambda kind=kind: conn.execute(SQL_DAYS[kind], params[kind]).fetchone())
+                       for kind in ('iso', 'epoch')}
+        
+        print(f"{'storage':<8} {'python s':>9} {'per row us':>11} {'sql s':>8}")
+        for kind in ('iso', 'epoch'):
+            print(f"{kind:<8} {python_seconds[kind]:>9.2f} {python_seconds[kind] / args.loans * 1e6:>11.2f} "
+                  f"{sql_seconds[kind]:>8.3f}")
+        print(f"speedup  {python_seconds['iso'] / python_seconds['epoch']:>8.1f}x {'':>11} "
+              f"{sql_seconds['iso'] / sql_seconds['epoch']:>7.1f}x")
+    finally:
+        conn.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+HTTP cache benchmark: repeated catalog and search requests with and without the response cache.
+
+Seeds a temporary catalog, then requests each page repeatedly through the
+WSGI test client in three modes: cache off (query and render every time),
+cache on (served from the rendered-response cache), and conditional (cache
+on, client sending the ETag it got, so the answer is an empty 304).
+
+    python -m benchmarks.bench_http_cache --books 100000 --requests 500
+"""
+
+import argparse
+import time
+
+from app import create_app
+from benchmarks.common import temp_database, seed_books, summarize
+from http_cache import response_cache
+
+URLS = [
+    '/catalog',
+    '/catalog?per_page=200',
+    '/search?q=golden&type=title',
+    '/api/search?q=river+sha',
+]
+
+
+def time_requests(client, url: str, requests: int, conditional: bool):
+    headers = {}
+    if conditional:
+        headers['If-None-Match'] = client.get(url).headers['ETag']
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples), response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with temp_database():
+        seed_books(args.books)
+        modes = [
+            ('cache off', create_app({'TESTING': True, 'RESPONSE_CACHE': False}).test_client(), False),
+            ('cache on', create_app({'TESTING': True}).test_client(), False),
+            ('conditional', create_app({'TESTING': True}).test_client(), True),
+        ]
+        print(f"{'url':<30} {'mode':<12} {'status':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        for url in URLS:
+            response_cache.clear()
+            for name, client, conditional in modes:
+                stats, status = time_requests(client, url, args.requests, conditional)
+                print(f"{url:<30} {name:<12} {status:>6} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
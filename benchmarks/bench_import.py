@@ -0,0 +1,45 @@
+"""
+Bulk import benchmark: streaming batched import vs add_book_to_catalog per row.
+
+    python -m benchmarks.bench_import --rows 100000 --batch-size 1000 --single-rows 5000
+"""
+
+import argparse
+import io
+import time
+
+from benchmarks.common import temp_database
+from services.import_service import import_books_from_stream
+from services.library_service import add_book_to_catalog
+
+
+def generate_csv(rows: int, offset: int = 0) -> io.StringIO:
+    lines = ['title,author,isbn,total_copies']
+    for i in range(offset, offset + rows):
+        lines.append(f'Imported Title {i},Author {i % 997},{9790000000000 + i:013d},{i % 5 + 1}')
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--single-rows', type=int, default=5000,
+                        help='rows to add one at a time through add_book_to_catalog')
+    args = parser.parse_args()
+
+    with temp_database():
+        report = import_books_from_stream(generate_csv(args.rows), 'csv', batch_size=args.batch_size)
+        print(f"bulk import: {report['inserted']} inserted, {report['rejected']} rejected, "
+              f"{report['rows_per_second']:.0f} rows/sec")
+
+    with temp_database():
+        started = time.perf_counter()
+        for i in range(args.single_rows):
+            add_book_to_catalog(f'Single Title {i}', f'Author {i % 997}', f'{9790000000000 + i:013d}', i % 5 + 1)
+        elapsed = time.perf_counter() - started
+        print(f"add_book_to_catalog: {args.single_rows} rows, {args.single_rows / elapsed:.0f} rows/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Bulk late-fee assessment benchmark.
+
+Compares the SQL aggregate (assess_late_fees) against computing each open
+loan's fee in Python with the scalar schedule, and checks both agree.
+
+    python -m benchmarks.bench_late_fees --loans 100000 1000000
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.common import temp_database, seed_books
+from models import to_timestamp, from_timestamp
+from services import library_service
+
+
+def seed_loans(count: int, patrons: int, books: int, batch_size: int = 50000):
+    rng = random.Random(327)
+    now = datetime.now()
+    conn = database.get_db_connection()
+    batch = []
+    for i in range(count):
+        due_date = now - timedelta(days=rng.uniform(-14, 40))
+        batch.append((f'{rng.randrange(patrons):06d}', rng.randrange(books) + 1,
+                      to_timestamp(due_date - timedelta(days=14)), to_timestamp(due_date)))
+        if len(batch) >= batch_size:
+            _insert(conn, batch)
+            batch = []
+    if batch:
+        _insert(conn, batch)
+    conn.close()
+
+
+def _insert(conn, rows):
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def scalar_assessment(as_of: datetime):
+    """Fetch every open loan and apply the scalar fee schedule row by row."""
+    conn = database.get_db_connection()
+    rows = conn.execute(
+        'SELECT patron_id, book_id, due_date FROM borrow_records WHERE return_date IS NULL'
+    ).fetchall()
+    conn.close()
+    by_patron = defaultdict(float)
+    by_book = defaultdict(float)
+    for row in rows:
+        fee, _ = library_service._late_fee_for_due_date(from_timestamp(row['due_date']), as_of)
+        if fee > 0:
+            by_patron[row['patron_id']] += fee
+            by_book[row['book_id']] += fee
+    return by_patron, by_book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, nargs='+', default=[100000])
+    parser.add_argument('--patrons', type=int, default=20000)
+    parser.add_argument('--books', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'loans':>9} {'sql s':>8} {'scalar s':>9} {'patrons':>8} {'mismatches':>10}")
+    for count in args.loans:
+        with temp_database():
+            seed_books(args.books)
+            seed_loans(count, args.patrons, args.books)
+            as_of = datetime.now()
+
+            started = time.perf_counter()
+            totals = library_service.assess_late_fees(as_of)
+            sql_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            by_patron, _ = scalar_assessment(as_of)
+            scalar_elapsed = time.perf_counter() - started
+
+            mismatches = sum(
+                1 for patron_id, fee in by_patron.items()
+                if abs(totals['by_patron'].get(patron_id, {}).get('fee_total', 0.0) - fee) > 0.005
+            )
+            print(f"{count:>9} {sql_elapsed:>8.3f} {scalar_elapsed:>9.3f} {len(by_patron):>8} {mismatches:>10}")
+
+
+if __name__ == '__main__':
+    main()
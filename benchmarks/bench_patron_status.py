@@ -0,0 +1,111 @@
+"""
+Patron status report benchmark: query count and latency per report.
+
+Compares the single-query report against the original implementation,
+which re-queried the book and the open loans for every borrowed book
+(calculate_late_fee_for_book) before fetching the history separately.
+
+    python -m benchmarks.bench_patron_status --history 10 100 1000 --open 5
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.common import temp_database, seed_books, count_queries, summarize
+from models import to_timestamp
+from services import library_service
+
+
+def legacy_report(patron_id: str):
+    """The original report: one late-fee lookup (two queries) per borrowed book, then the history."""
+    borrowed_books = database.get_patron_borrowed_books(patron_id)
+    
+    total_late_fees = 0.00
+    formatted_books = []
+    for book in borrowed_books:
+        late_fee_info = library_service.calculate_late_fee_for_book(patron_id, book['book_id'])
+        total_late_fees += late_fee_info.get('fee_amount', 0.00)
+        formatted_books.append({
+            'book_id': book['book_id'],
+            'title': book['title'],
+            'author': book['author'],
+            'borrow_date': book['borrow_date'].strftime("%Y-%m-%d"),
+            'due_date': book['due_date'].strftime("%Y-%m-%d"),
+            'is_overdue': book['is_overdue'],
+            'days_overdue': (datetime.now() - book['due_date']).days if book['is_overdue'] else 0,
+            'late_fee': late_fee_info.get('fee_amount', 0.00)
+        })
+    
+    borrowing_history = []
+    for record in database.get_patron_borrowing_history(patron_id):
+        return_date = record['return_date']
+        due_date = record['due_date']
+        history_item = {
+            'book_id': record['book_id'],
+            'title': record['title'],
+            'author': record['author'],
+            'borrow_date': record['borrow_date'].strftime("%Y-%m-%d"),
+            'due_date': due_date.strftime("%Y-%m-%d"),
+            'return_date': return_date.strftime("%Y-%m-%d") if return_date else "Currently Borrowed",
+            'status': 'Returned' if return_date else 'Currently Borrowed',
+            'was_overdue': False,
+            'days_late': 0
+        }
+        if return_date and return_date > due_date:
+            history_item['was_overdue'] = True
+            history_item['days_late'] = (return_date - due_date).days
+        borrowing_history.append(history_item)
+    
+    return formatted_books, borrowing_history, total_late_fees
+
+
+def seed_patron(patron_id: str, history: int, open_loans: int, book_count: int):
+    now = datetime.now()
+    conn = database.get_db_connection()
+    rows = []
+    for i in range(history):
+        borrow_date = now - timedelta(days=30 + i)
+        due_date = borrow_date + timedelta(days=14)
+        return_date = None if i < open_loans else to_timestamp(due_date - timedelta(days=1))
+        rows.append((patron_id, i % book_count + 1, to_timestamp(borrow_date), to_timestamp(due_date), return_date))
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def measure(report, patron_id: str, repeat: int):
+    with count_queries() as counts:
+        report(patron_id)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        report(patron_id)
+        samples.append(time.perf_counter() - started)
+    return counts['queries'], summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--open', type=int, default=5, help='open loans per patron')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'report':>7} {'queries':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    with temp_database():
+        seed_books(1000)
+        for index, history in enumerate(args.history):
+            patron_id = f'{500000 + index:06d}'
+            seed_patron(patron_id, history, min(args.open, history), 1000)
+            for name, report in (('single', library_service.get_patron_status_report), ('legacy', legacy_report)):
+                queries, stats = measure(report, patron_id, args.repeat)
+                print(f"{history:>8} {name:>7} {queries:>8} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Payment settlement benchmark: sequential PaymentGateway vs pay_late_fees_batch.
+
+Both sides see the same per-request gateway latency: PaymentGateway sleeps for
+it, and the async client talks to a FakePaymentServer that waits that long.
+
+    python -m benchmarks.bench_payments --payments 200 --latency 0.5 --sequential 10
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import temp_database, seed_books
+from database import get_book_by_isbn, insert_borrow_record
+from services.async_payment_service import AsyncPaymentGateway
+from services.fake_payment_server import FakePaymentServer
+from services.library_service import pay_late_fees_batch
+from services.payment_service import PaymentGateway
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--max-connections', type=int, default=50)
+    parser.add_argument('--sequential', type=int, default=10,
+                        help='payments to send one at a time through PaymentGateway')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    gateway = PaymentGateway()
+    for i in range(args.sequential):
+        gateway.process_payment(f'{100000 + i:06d}', 6.50, "Late fees")
+    elapsed = time.perf_counter() - started
+    print(f"PaymentGateway (sequential): {args.sequential} payments, {args.sequential / elapsed:.1f} payments/sec")
+
+    with temp_database():
+        seed_books(1, copies=args.payments)
+        book_id = get_book_by_isbn(f'{9780000000000:013d}')['id']
+        due_date = datetime.now() - timedelta(days=10, hours=1)
+        payments = []
+        for i in range(args.payments):
+            patron_id = f'{100000 + i:06d}'
+            insert_borrow_record(patron_id, book_id, due_date - timedelta(days=14), due_date)
+            payments.append((patron_id, book_id))
+
+        with FakePaymentServer(latency=args.latency).running_in_thread() as server:
+            client = AsyncPaymentGateway(base_url=server.url, max_connections=args.max_connections)
+            started = time.perf_counter()
+            results = pay_late_fees_batch(payments, client)
+            elapsed = time.perf_counter() - started
+        settled = sum(1 for success, _, _ in results if success)
+        print(f"pay_late_fees_batch: {settled}/{args.payments} settled, {args.payments / elapsed:.1f} payments/sec, "
+              f"{client.connections_opened} connections, {client.retries} retries")
+
+
+if __name__ == '__main__':
+    main()
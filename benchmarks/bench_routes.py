@@ -0,0 +1,208 @@
+"""
+Route latency and throughput benchmark.
+
+Seeds a synthetic catalog, patrons and loans, then drives every main route
+through the Flask test client (application cost only) and through a real
+threaded WSGI server (adds HTTP parsing and socket overhead), reporting
+p50/p95/p99 latency and requests/sec per route.
+
+Results can be saved as a named baseline under benchmarks/baselines/ and
+later runs compared against it; a route whose p95 latency or throughput is
+worse than the baseline by more than --tolerance is flagged and the run
+exits with status 1. Baselines are machine specific, so record your own
+before comparing.
+
+    python -m benchmarks.bench_routes --save-baseline local
+    python -m benchmarks.bench_routes --compare local
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from benchmarks.common import temp_database, seed_books, seed_patrons, summarize
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+ROUTES = ('catalog', 'search', 'api_search', 'borrow', 'return', 'patron_status', 'api_late_fee')
+SEARCH_TERMS = ['river', 'shadow garden', 'win', 'empire', 'silent night', 'stone', 'ocean', 'glass']
+
+# (method, path, form data or None)
+Request = Tuple[str, str, Optional[Dict]]
+
+
+def build_requests(route: str, count: int, open_loans: List[Tuple[str, int]], books: int) -> List[Request]:
+    """The request sequence for one route. /borrow and /return use the same (patron, book) pairs."""
+    requests = []
+    for i in range(count):
+        if route == 'catalog':
+            requests.append(('GET', '/catalog', None))
+        elif route == 'search':
+            query = {'q': SEARCH_TERMS[i % len(SEARCH_TERMS)], 'type': 'title' if i % 2 else 'author'}
+            requests.append(('GET', '/search?' + urlencode(query), None))
+        elif route == 'api_search':
+            query = {'q': SEARCH_TERMS[i % len(SEARCH_TERMS)], 'type': 'title'}
+            requests.append(('GET', '/api/search?' + urlencode(query), None))
+        elif route in ('borrow', 'return'):
+            # Patrons 900000.. have no seeded loans, so the borrow limit never interferes
+            form = {'patron_id': f'{900000 + i:06d}', 'book_id': str(i % books + 1)}
+            requests.append(('POST', f'/{route}', form))
+        elif route == 'patron_status':
+            patron_id, _ = open_loans[i % len(open_loans)]
+            requests.append(('POST', '/patron_status', {'patron_id': patron_id}))
+        elif route == 'api_late_fee':
+            patron_id, book_id = open_loans[i % len(open_loans)]
+            requests.append(('GET', f'/api/late_fee/{patron_id}/{book_id}', None))
+    return requests
+
+
+def run_test_client(app, requests: List[Request], concurrency: int) -> Tuple[List[float], int, float]:
+    """Send requests one at a time through the Flask test client."""
+    client = app.test_client(use_cookies=False)
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for method, path, form in requests:
+        sent = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        samples.append(time.perf_counter() - sent)
+        errors += response.status_code >= 400
+    return samples, errors, time.perf_counter() - started
+
+
+def wsgi_runner(port: int) -> Callable:
+    """Send requests over HTTP to the server on port, concurrency at a time."""
+    def send(request: Request) -> Tuple[float, bool]:
+        method, path, form = request
+        body = urlencode(form) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        sent = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            failed = response.status >= 400
+        finally:
+            conn.close()
+        return time.perf_counter() - sent, failed
+
+    def run(app, requests: List[Request], concurrency: int) -> Tuple[List[float], int, float]:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(send, requests))
+        elapsed = time.perf_counter() - started
+        return [latency for latency, _ in outcomes], sum(failed for _, failed in outcomes), elapsed
+
+    return run
+
+
+def benchmark(app, runner: Callable, routes: List[str], count: int, warmup: int, concurrency: int,
+              open_loans: List[Tuple[str, int]], books: int) -> Dict:
+    results = {}
+    for route in routes:
+        requests = build_requests(route, warmup + count, open_loans, books)
+        # Warm-up requests are the tail of the sequence so /return still matches /borrow
+        if warmup:
+            runner(app, requests[count:], concurrency)
+        samples, errors, elapsed = runner(app, requests[:count], concurrency)
+        results[route] = dict(summarize(samples), errors=errors, rps=count / elapsed if elapsed else 0.0)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Describe every mode/route that regressed beyond tolerance."""
+    regressions = []
+    for mode, routes in results.items():
+        for route, current in routes.items():
+            previous = baseline.get(mode, {}).get(route)
+            if not previous:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{mode} {route}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+            if current['rps'] < previous['rps'] / (1 + tolerance):
+                regressions.append(f"{mode} {route}: {previous['rps']:.0f} -> {current['rps']:.0f} req/s")
+    return regressions
+
+
+def print_results(mode: str, routes: Dict):
+    print(f"\n[{mode}]")
+    print(f"{'route':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6}")
+    for route, r in routes.items():
+        print(f"{route:<14} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rps']:>8.0f} {r['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--patrons', type=int, default=2000)
+    parser.add_argument('--loans-per-patron', type=int, default=20)
+    parser.add_argument('--open-loans', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=300, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads for the WSGI server')
+    parser.add_argument('--mode', choices=('test_client', 'wsgi', 'both'), default='both')
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown before a route is flagged (0.25 = 25%%)')
+    args = parser.parse_args()
+    # /return must follow /borrow so there is something to return
+    routes = sorted(args.routes, key=ROUTES.index)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    results = {}
+    with temp_database():
+        seed_books(args.books)
+        open_loans = seed_patrons(args.patrons, args.loans_per_patron, args.books, args.open_loans)
+        app = create_app()
+
+        if args.mode in ('test_client', 'both'):
+            results['test_client'] = benchmark(app, run_test_client, routes, args.requests, args.warmup,
+                                               1, open_loans, args.books)
+            print_results('test_client', results['test_client'])
+
+        if args.mode in ('wsgi', 'both'):
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                results['wsgi'] = benchmark(app, wsgi_runner(server.server_port), routes, args.requests,
+                                            args.warmup, args.concurrency, open_loans, args.books)
+            finally:
+                server.shutdown()
+                thread.join()
+            print_results(f'wsgi, {args.concurrency} clients', results['wsgi'])
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save_baseline}.json')
+        with open(path, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(f"\nRegressions against '{args.compare}' (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against '{args.compare}' (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Row model benchmark: per-row dicts vs the __slots__ models in models.py.
+
+Fetches large result sets of books and of loans joined to their books and
+compares building a dict per row from sqlite3.Row (the previous approach,
+which also converted every loan date up front) with the Book and
+BorrowRecord row factories. Reports fetch time and the peak memory held by
+the result list (measured in a separate tracemalloc pass).
+
+    python -m benchmarks.bench_row_models --rows 1000000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.common import temp_database, seed_books
+from models import Book, BorrowRecord, to_timestamp, from_timestamp
+
+BOOKS_SQL = 'SELECT * FROM books'
+LOANS_SQL = '''
+    SELECT br.id, br.book_id, b.title, b.author, br.borrow_date, br.due_date, br.return_date 
+    FROM borrow_records br JOIN books b ON b.id = br.book_id
+'''
+
+
+def books_as_dicts(conn):
+    return [dict(row) for row in conn.execute(BOOKS_SQL).fetchall()]
+
+
+def books_as_models(conn):
+    return database._query(conn, BOOKS_SQL, row_factory=Book.row_factory).fetchall()
+
+
+def loans_as_dicts(conn):
+    return [{
+        'book_id': row['book_id'],
+        'title': row['title'],
+        'author': row['author'],
+        'borrow_date': from_timestamp(row['borrow_date']),
+        'due_date': from_timestamp(row['due_date']),
+        'return_date': from_timestamp(row['return_date']) if row['return_date'] else None
+    } for row in conn.execute(LOANS_SQL).fetchall()]
+
+
+def loans_as_models(conn):
+    return database._query(conn, LOANS_SQL, row_factory=BorrowRecord.row_factory).fetchall()
+
+
+def loans_as_models_reading_dates(conn):
+    records = loans_as_models(conn)
+    for record in records:
+        record.due_date
+    return records
+
+
+def seed_loans(count: int, books: int, batch_size: int = 50000):
+    now = datetime.now()
+    conn = database.get_db_connection()
+    batch = []
+    for i in range(count):
+        borrow_date = now - timedelta(days=i % 700, seconds=i)
+        batch.append((f'{100000 + i % 50000:06d}', i % books + 1, to_timestamp(borrow_date),
+                      to_timestamp(borrow_date + timedelta(days=14)),
+                      to_timestamp(borrow_date + timedelta(days=10)) if i % 10 else None))
+        if len(batch) >= batch_size:
+            conn.executemany('''
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', batch)
+            batch = []
+    if batch:
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', batch)
+    conn.commit()
+    conn.close()
+
+
+def measure(fetch, repeat: int):
+    conn = database.get_db_connection()
+    try:
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            rows = fetch(conn)
+            timings.append(time.perf_counter() - started)
+            del rows
+        gc.collect()
+        tracemalloc.start()
+        rows = fetch(conn)
+        _, peak = tracemalloc.get_traced_memory()
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return min(timings), held, peak, len(rows)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cases = (
+        ('books: dicts', books_as_dicts),
+        ('books: Book', books_as_models),
+        ('loans: dicts', loans_as_dicts),
+        ('loans: BorrowRecord', loans_as_models),
+        ('loans: + due_date', loans_as_models_reading_dates),
+    )
+    with temp_database():
+        seed_books(args.rows)
+        seed_loans(args.rows, args.rows)
+        print(f"{'result set':<22} {'rows':>9} {'fetch s':>8} {'held MB':>8} {'peak MB':>8}")
+        for label, fetch in cases:
+            seconds, held, peak, rows = measure(fetch, args.repeat)
+            print(f"{label:<22} {rows:>9} {seconds:>8.2f} {held / 2**20:>8.1f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Search benchmark: FTS5 index vs the original full-table scan.
+
+For each catalog size, seeds a temporary database and times the same
+title, author and ISBN queries through both implementations.
+
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import database
+from benchmarks.common import temp_database, seed_books, summarize
+
+QUERIES = [
+    ('golden', 'title'),
+    ('river sha', 'title'),
+    ('orwell', 'author'),
+    ('9780000000042', 'isbn'),
+]
+
+
+def scan_search(search_term: str, search_type: str):
+    """The original implementation: load every book and filter in Python."""
+    results = []
+    for book in database.get_all_books():
+        if search_type == "title" and search_term in book["title"].lower():
+            results.append(book)
+        elif search_type == "author" and search_term in book["author"].lower():
+            results.append(book)
+        elif search_type == "isbn" and search_term == book["isbn"]:
+            results.append(book)
+    return results
+
+
+def time_queries(search, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        for term, search_type in QUERIES:
+            started = time.perf_counter()
+            search(term, search_type)
+            samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scan-limit', type=int, default=1000000,
+                        help='skip the full scan above this catalog size')
+    args = parser.parse_args()
+
+    print(f"{'books':>9} {'engine':>6} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for size in args.sizes:
+        with temp_database():
+            seed_books(size)
+            engines = [('fts', database.search_books)]
+            if size <= args.scan_limit:
+                engines.append(('scan', scan_search))
+            for name, search in engines:
+                stats = time_queries(search, args.repeat)
+                print(f"{size:>9} {name:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['mean_ms']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Serving mode throughput benchmark: Flask development server vs gunicorn.
+
+Seeds a synthetic catalog, patrons and loans in a temporary database, then
+starts each server as a separate process on that database and drives every
+main route over HTTP with the same concurrent clients, reporting
+p50/p95/p99 latency and requests/sec per route.
+
+The development server runs as in "python app.py" (threaded, debugger on)
+except that the reloader is off. Gunicorn runs with gunicorn.conf.py;
+--workers and --threads override its defaults.
+
+    python -m benchmarks.bench_serving --workers 4 --concurrency 32
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from benchmarks.bench_routes import ROUTES, benchmark, print_results, wsgi_runner
+from benchmarks.common import temp_database, seed_books, seed_patrons
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEV_SERVER = '''
+import sys
+from app import create_app
+create_app().run(host='127.0.0.1', port=int(sys.argv[1]), debug=True, use_reloader=False, threaded=True)
+'''
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    """Poll the server until it answers, failing early if it exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode}')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+        try:
+            conn.request('GET', '/catalog')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            conn.close()
+    raise RuntimeError(f'server on port {port} did not start within {timeout:.0f}s')
+
+
+@contextmanager
+def server_process(command: List[str], port: int, env: Dict[str, str]):
+    """Run a server process for the duration of the block, then shut it down gracefully."""
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(port, process)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--patrons', type=int, default=2000)
+    parser.add_argument('--loans-per-patron', type=int, default=20)
+    parser.add_argument('--open-loans', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--servers', nargs='+', choices=('dev', 'gunicorn'), default=['dev', 'gunicorn'])
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+    args = parser.parse_args()
+    # /return must follow /borrow so there is something to return
+    routes = sorted(args.routes, key=ROUTES.index)
+
+    results = {}
+    with temp_database() as path:
+        seed_books(args.books)
+        open_loans = seed_patrons(args.patrons, args.loans_per_patron, args.books, args.open_loans)
+        env = dict(os.environ, LIBRARY_DATABASE=path)
+
+        for server in args.servers:
+            port = free_port()
+            if server == 'dev':
+                command = [sys.executable, '-c', DEV_SERVER, str(port)]
+                label = 'flask dev server'
+            else:
+                command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+                env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+                           GUNICORN_THREADS=str(args.threads))
+                label = f'gunicorn, {args.workers} workers x {args.threads} threads'
+            with server_process(command, port, env):
+                results[server] = benchmark(None, wsgi_runner(port), routes, args.requests, args.warmup,
+                                            args.concurrency, open_loans, args.books)
+            print_results(f'{label}, {args.concurrency} clients', results[server])
+
+    if 'dev' in results and 'gunicorn' in results:
+        print(f"\n{'route':<14} {'speedup':>8}")
+        for route in routes:
+            dev_rps = results['dev'][route]['rps']
+            speedup = results['gunicorn'][route]['rps'] / dev_rps if dev_rps else 0.0
+            print(f"{route:<14} {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
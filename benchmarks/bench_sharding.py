@@ -0,0 +1,97 @@
+"""
+Branch sharding write-throughput benchmark.
+
+Forks worker processes that each borrow and return books as fast as they
+can, worker i working in branch i % shards. With one shard every worker
+queues on the same SQLite writer lock; with more, each branch's workers
+only wait for each other. Reports committed transactions per second for
+each shard count.
+
+    python -m benchmarks.bench_sharding --workers 8 --seconds 5 --shards 1 2 4
+
+On a machine with fewer cores than workers the gain comes from less lock
+waiting (busy-timeout sleeps) rather than from parallel commits.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.common import seed_books
+
+BOOKS = 200
+
+
+def worker(index: int, branch: str, seconds: float, start, results):
+    database.reset_connection_pools_after_fork()
+    patron_id = f'{200000 + index:06d}'
+    done = 0
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    with database.use_branch(branch):
+        while time.perf_counter() < deadline:
+            book_id = (index * 31 + done) % BOOKS + 1
+            now = datetime.now()
+            status, _ = database.borrow_book_transaction(patron_id, book_id, now, now + timedelta(days=14),
+                                                         borrow_limit=5)
+            if status == 'borrowed':
+                database.return_book_transaction(patron_id, book_id, now)
+                done += 2
+            else:
+                done += 1
+    database.close_connection_pools()
+    results.put(done)
+
+
+def run(shards: int, workers: int, seconds: float) -> float:
+    directory = tempfile.mkdtemp(prefix='library_bench_')
+    previous = dict(database.BRANCHES)
+    try:
+        database.configure_branches({f'b{i}': os.path.join(directory, f'b{i}.db') for i in range(shards)})
+        database.init_branch_databases()
+        for branch in database.get_branches():
+            with database.use_branch(branch):
+                seed_books(BOOKS, copies=workers)
+        database.close_connection_pools()
+
+        context = multiprocessing.get_context('fork')
+        start = context.Event()
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(i, f'b{i % shards}', seconds, start, results))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        start.set()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / seconds
+    finally:
+        database.close_connection_pools()
+        database.configure_branches(previous)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{'shards':>6} {'workers':>8} {'tx/s':>9} {'speedup':>8}")
+    baseline = None
+    for shards in args.shards:
+        rate = run(shards, args.workers, args.seconds)
+        baseline = baseline or rate
+        print(f"{shards:>6} {args.workers:>8} {rate:>9.0f} {rate / baseline:>7.2f}x")
+    print(f"({os.cpu_count()} CPUs)")
+
+
+if __name__ == '__main__':
+    main()
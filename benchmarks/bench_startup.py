@@ -0,0 +1,65 @@
+"""
+App startup benchmark: create_app() with and without startup migrations and seeding.
+
+Each sample runs in a fresh Python process against an already migrated
+database, so it includes module imports as a new worker would pay them.
+Reports import time, create_app() time and whether the payment gateway
+(and the requests library) was imported.
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import temp_database, seed_books
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'MIGRATE_ON_STARTUP': sys.argv[1] == '1', 'SAMPLE_DATA_ON_STARTUP': sys.argv[1] == '1'})
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'requests_imported': 'requests' in sys.modules
+}))
+'''
+
+
+def measure(database_path: str, startup_work: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', STARTUP, '1' if startup_work else '0'],
+        cwd=REPO_ROOT, env=dict(os.environ, LIBRARY_DATABASE=database_path),
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with temp_database() as path:
+        seed_books(args.books)
+        print(f"{'mode':<22} {'import ms':>10} {'create_app ms':>14} {'requests loaded':>16}")
+        for label, startup_work in (('migrate + seed check', True), ('skip startup work', False)):
+            samples = [measure(path, startup_work) for _ in range(args.runs)]
+            import_ms = statistics.median(s['import_ms'] for s in samples)
+            create_ms = statistics.median(s['create_app_ms'] for s in samples)
+            loaded = any(s['requests_imported'] for s in samples)
+            print(f"{label:<22} {import_ms:>10.1f} {create_ms:>14.2f} {str(loaded):>16}")
+
+
+if __name__ == '__main__':
+    main()
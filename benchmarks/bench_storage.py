@@ -0,0 +1,81 @@
+"""
+Storage engine benchmark: the SQLite and in-memory repositories side by side.
+
+Loads the same synthetic catalog into each engine and times the service
+layer's hot paths through storage.py: book lookups by ID and ISBN, title
+and author searches, catalog pages, and borrow/return cycles.
+
+    python -m benchmarks.bench_storage --books 20000 --repeat 200
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import database
+import storage
+from benchmarks.common import temp_database, seed_books, summarize
+
+
+def operations(books: int):
+    now = datetime.now()
+
+    def borrow_and_return(i):
+        book_id = i % books + 1
+        storage.borrow_book_transaction('200000', book_id, now, now + timedelta(days=14), borrow_limit=5)
+        storage.return_book_transaction('200000', book_id, now)
+
+    return [
+        ('book by id', lambda i: storage.get_book_by_id(i % books + 1)),
+        ('book by isbn', lambda i: storage.get_book_by_isbn(f'{9780000000000 + i % books:013d}')),
+        ('search title', lambda i: storage.search_books('golden riv', 'title')),
+        ('search author', lambda i: storage.search_books('orwell', 'author')),
+        ('catalog page', lambda i: storage.get_books_page(50, after=('The Golden', i))),
+        ('borrow+return', borrow_and_return),
+    ]
+
+
+def time_operations(books: int, repeat: int):
+    results = {}
+    for label, operation in operations(books):
+        samples = []
+        for i in range(repeat):
+            started = time.perf_counter()
+            operation(i)
+            samples.append(time.perf_counter() - started)
+        results[label] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    previous = storage.get_repository()
+    try:
+        with temp_database():
+            seed_books(args.books)
+            storage.set_repository(storage.create_repository('sqlite'))
+            sqlite = time_operations(args.books, args.repeat)
+
+            memory = storage.create_repository('memory')
+            started = time.perf_counter()
+            memory.insert_books_batch([(book.title, book.author, book.isbn, book.total_copies)
+                                       for book in database.iter_all_books()])
+            load_ms = (time.perf_counter() - started) * 1000
+            storage.set_repository(memory)
+            in_memory = time_operations(args.books, args.repeat)
+    finally:
+        storage.set_repository(previous)
+
+    print(f"{args.books} books; memory engine loaded in {load_ms:.0f} ms")
+    print(f"{'operation':<15} {'sqlite p50 ms':>14} {'memory p50 ms':>14} {'speedup':>8}")
+    for label in sqlite:
+        slow, fast = sqlite[label]['p50_ms'], in_memory[label]['p50_ms']
+        print(f"{label:<15} {slow:>14.3f} {fast:>14.3f} {slow / fast if fast else 0:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
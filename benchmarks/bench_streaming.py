@@ -0,0 +1,84 @@
+"""
+Streaming response benchmark: buffered vs streamed /api/search and catalog export.
+
+Seeds a temporary catalog in which every title matches "the", then reads
+each response through the WSGI test client without buffering, reporting
+time to first chunk and total time, then the peak Python memory
+allocated while the response is produced again under tracemalloc. For
+stream=json the first chunk is the document header, sent before the
+query runs; for jsonl it is the first batch of rows. The buffered export baseline is
+the whole catalog fetched into a list and serialised with jsonify, as a
+non-streaming endpoint would.
+
+    python -m benchmarks.bench_streaming --books 200000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from flask import jsonify
+
+import database
+from app import create_app
+from benchmarks.common import temp_database, seed_books
+
+CASES = [
+    ('search buffered', '/api/search?q=the'),
+    ('search stream=json', '/api/search?q=the&stream=json'),
+    ('search stream=jsonl', '/api/search?q=the&stream=jsonl'),
+    ('export buffered', '/bench/export-buffered'),
+    ('export jsonl', '/api/books/export'),
+    ('export csv', '/api/books/export?format=csv'),
+]
+
+
+def read_response(client, url: str):
+    """Read a response chunk by chunk; returns (time to first chunk, total time, body bytes)."""
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter()
+        size += len(chunk)
+    finished = time.perf_counter()
+    response.close()
+    return (first_byte or finished) - started, finished - started, size
+
+
+def measure(client, url: str) -> dict:
+    """Time one read, then repeat it under tracemalloc (which slows allocation) for the peak."""
+    ttfb, total, size = read_response(client, url)
+    tracemalloc.start()
+    read_response(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ttfb_ms': ttfb * 1000, 'total_ms': total * 1000, 'peak_mb': peak / 2 ** 20, 'body_mb': size / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=200000)
+    args = parser.parse_args()
+
+    with temp_database():
+        seed_books(args.books)
+        app = create_app({'TESTING': True})
+
+        @app.route('/bench/export-buffered')
+        def export_buffered():
+            return jsonify(list(database.iter_all_books()))
+
+        client = app.test_client()
+        client.get('/api/search?q=warmup')
+        print(f"{'case':<22} {'ttfb ms':>9} {'total ms':>9} {'peak MB':>9} {'body MB':>9}")
+        for label, url in CASES:
+            stats = measure(client, url)
+            print(f"{label:<22} {stats['ttfb_ms']:>9.1f} {stats['total_ms']:>9.1f} "
+                  f"{stats['peak_mb']:>9.1f} {stats['body_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
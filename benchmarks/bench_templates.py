@@ -0,0 +1,132 @@
+"""
+Template rendering benchmark: 10k-row catalog and patron status pages, and template warm-up.
+
+Renders catalog.html with synthetic books (no database) four ways:
+the original template (row markup inline, url_for called on every row),
+rows inline with url_for hoisted out of the loop, and the shipped template
+with a cold and a warm row fragment cache. Also renders patron_status.html
+with a long borrowing history, as shipped and with attribute syntax
+(row.title) instead of subscripts (row['title']), and times loading every template in a new
+app with an empty and a populated bytecode cache, as a new worker would.
+
+    python -m benchmarks.bench_templates --rows 10000 --repeat 5
+"""
+
+import argparse
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import render_template, render_template_string
+
+from app import create_app
+from benchmarks.common import summarize
+from models import Book
+from templating import row_cache, precompile_templates
+
+ROW_CALL = "{{ catalog_rows(books, url_for('borrowing.borrow_book')) }}"
+
+
+def inline_catalog_source(app, hoisted: bool) -> str:
+    """catalog.html with the row macro's body inlined in a loop, as it was before fragment caching."""
+    loader = app.jinja_env.loader
+    catalog, _, _ = loader.get_source(app.jinja_env, 'catalog.html')
+    row, _, _ = loader.get_source(app.jinja_env, '_catalog_row.html')
+    row = row.split('-%}\n', 1)[1].rsplit('{%- endmacro', 1)[0]
+    loop = '{% for book in books %}' + row + '{% endfor %}'
+    if hoisted:
+        loop = "{% set borrow_url = url_for('borrowing.borrow_book') %}" + loop
+    else:
+        loop = loop.replace('{{ borrow_url }}', "{{ url_for('borrowing.borrow_book') }}")
+    return catalog.replace(ROW_CALL, loop)
+
+
+def attribute_syntax_source(app, name: str) -> str:
+    """A template with its row['key'] lookups written as row.key, as they were before."""
+    source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+    return re.sub(r"(\w+)\['(\w+)'\]", r"\1.\2", source)
+
+
+def synthetic_books(count: int):
+    return [Book(i, f'The Golden River {i}', f'A. Author {i % 97}', f'{9780000000000 + i:013d}', 3, i % 4)
+            for i in range(1, count + 1)]
+
+
+def synthetic_report(count: int):
+    day = datetime.now().date()
+    history = [{
+        'title': f'The Golden River {i}', 'author': 'A. Author', 'borrow_date': f'{day - timedelta(days=30)}',
+        'due_date': f'{day - timedelta(days=16)}', 'return_date': f'{day - timedelta(days=i % 20)}',
+        'status': 'Returned', 'days_late': max(16 - i % 20, 0)
+    } for i in range(count)]
+    return {'patron_id': '123456', 'num_books_borrowed': 0, 'borrowing_limit_remaining': 5,
+            'total_late_fees': 0.0, 'outstanding_fees': 12.5, 'currently_borrowed': [],
+            'borrowing_history': history}
+
+
+def time_render(render, repeat: int, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        render()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def time_warmup(cache_dir: str, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        app = create_app({'MIGRATE_ON_STARTUP': False, 'SAMPLE_DATA_ON_STARTUP': False,
+                          'TEMPLATE_CACHE_DIR': cache_dir})
+        started = time.perf_counter()
+        precompile_templates(app)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'MIGRATE_ON_STARTUP': False, 'SAMPLE_DATA_ON_STARTUP': False})
+    books = synthetic_books(args.rows)
+    report = synthetic_report(args.rows)
+    page = {'prev_cursor': None, 'next_cursor': None, 'page_size': args.rows}
+    original = inline_catalog_source(app, hoisted=False)
+    hoisted = inline_catalog_source(app, hoisted=True)
+    attribute_status = attribute_syntax_source(app, 'patron_status.html')
+
+    cases = [
+        ('catalog, original', lambda: render_template_string(original, books=books, page=page), None),
+        ('catalog, url_for hoisted', lambda: render_template_string(hoisted, books=books, page=page), None),
+        ('catalog, rows cold', lambda: render_template('catalog.html', books=books, page=page), row_cache.clear),
+        ('catalog, rows cached', lambda: render_template('catalog.html', books=books, page=page), None),
+        ('status, attribute syntax', lambda: render_template_string(attribute_status, report=report), None),
+        ('status, subscripts', lambda: render_template('patron_status.html', report=report), None),
+    ]
+    print(f"{'case':<26} {'rows':>6} {'p50 ms':>9} {'mean ms':>9}")
+    with app.test_request_context('/catalog'):
+        for label, render, before in cases:
+            render()
+            stats = time_render(render, args.repeat, before)
+            print(f"{label:<26} {args.rows:>6} {stats['p50_ms']:>9.1f} {stats['mean_ms']:>9.1f}")
+
+    cache_dir = tempfile.mkdtemp(prefix='library_jinja_')
+    try:
+        cold = time_warmup(cache_dir, 1)
+        warm = time_warmup(cache_dir, args.repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print(f"\n{'template warm-up':<26} {'p50 ms':>9}")
+    print(f"{'compile from source':<26} {cold['p50_ms']:>9.1f}")
+    print(f"{'load bytecode cache':<26} {warm['p50_ms']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Shared helpers for benchmarks: temporary databases and synthetic data.
+"""
+
+import os
+import random
+import shutil
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import database
+from models import to_timestamp
+
+
+@contextmanager
+def temp_database():
+    """
+    Point the database module at a fresh SQLite file for the duration of the block.
+    
+    Yields:
+        str: Path of the temporary database file
+    """
+    directory = tempfile.mkdtemp(prefix='library_bench_')
+    path = os.path.join(directory, 'bench.db')
+    previous = database.DATABASE
+    database.DATABASE = path
+    try:
+        database.init_database()
+        yield path
+    finally:
+        database.close_connection_pools()
+        database.DATABASE = previous
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def seed_books(count: int, copies: int = 3, batch_size: int = 10000, seed: int = 327):
+    """Insert count synthetic books with deterministic titles, authors and ISBNs."""
+    rng = random.Random(seed)
+    words = ['river', 'shadow', 'garden', 'winter', 'empire', 'silent', 'golden', 'night',
+             'stone', 'ocean', 'forest', 'glass', 'crown', 'storm', 'letters', 'mirror']
+    surnames = ['Orwell', 'Austen', 'Tolstoy', 'Morrison', 'Achebe', 'Atwood', 'Munro',
+                'Ishiguro', 'Woolf', 'Baldwin', 'Borges', 'Calvino', 'Eliot', 'Hardy']
+    conn = database.get_db_connection()
+    batch = []
+    for i in range(count):
+        title = f'The {rng.choice(words).title()} {rng.choice(words).title()} {i}'
+        author = f'{rng.choice(surnames)[0]}. {rng.choice(surnames)}'
+        isbn = f'{9780000000000 + i:013d}'
+        batch.append((title, author, isbn, copies, copies))
+        if len(batch) >= batch_size:
+            _insert_books(conn, batch)
+            batch = []
+    if batch:
+        _insert_books(conn, batch)
+    conn.close()
+
+
+def _insert_books(conn, rows: List[tuple]):
+    conn.executemany('''
+        INSERT INTO books (title, author, isbn, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def seed_patrons(patrons: int, loans_per_patron: int, books: int, open_loans: int = 2,
+                 overdue_ratio: float = 0.3, batch_size: int = 50000, seed: int = 327) -> List[Tuple[str, int]]:
+    """
+    Give patrons 100000.. a borrowing history over books 1..books.
+    
+    Each patron's most recent open_loans loans are still open (some of them
+    overdue); the rest were returned, occasionally late.
+    
+    Returns:
+        list: (patron_id, book_id) for every open loan
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = database.get_db_connection()
+    open_pairs = []
+    batch = []
+    for p in range(patrons):
+        patron_id = f'{100000 + p:06d}'
+        for n in range(loans_per_patron):
+            book_id = rng.randrange(books) + 1
+            is_open = n >= loans_per_patron - open_loans
+            if is_open:
+                overdue = rng.random() < overdue_ratio
+                borrow_date = now - timedelta(days=rng.uniform(15, 40) if overdue else rng.uniform(0, 13))
+                return_date = None
+                open_pairs.append((patron_id, book_id))
+            else:
+                borrow_date = now - timedelta(days=rng.uniform(45, 720))
+                return_date = to_timestamp(borrow_date + timedelta(days=rng.uniform(1, 20)))
+            batch.append((patron_id, book_id, to_timestamp(borrow_date),
+                          to_timestamp(borrow_date + timedelta(days=14)), return_date))
+            if len(batch) >= batch_size:
+                _insert_loans(conn, batch)
+                batch = []
+    if batch:
+        _insert_loans(conn, batch)
+    conn.close()
+    return open_pairs
+
+
+def _insert_loans(conn, rows: List[tuple]):
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+@contextmanager
+def count_queries():
+    """
+    Count SQL statements and connection checkouts made through get_db_connection().
+    
+    Yields:
+        dict: {'queries': int, 'connections': int}, updated while the block runs
+    """
+    counts = {'queries': 0, 'connections': 0}
+    original = database.get_db_connection
+
+    def on_statement(sql):
+        if not sql.lstrip().upper().startswith(('BEGIN', 'COMMIT', 'ROLLBACK')):
+            counts['queries'] += 1
+
+    def traced_connection():
+        conn = original()
+        counts['connections'] += 1
+        conn.set_trace_callback(on_statement)
+        return conn
+
+    database.get_db_connection = traced_connection
+    try:
+        yield counts
+    finally:
+        database.get_db_connection = original
+        for pool in list(database._pools.values()):
+            pool.close_all()
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Summarize latency samples (seconds) as milliseconds."""
+    ordered = sorted(samples)
+    
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+    
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(50) if ordered else 0.0,
+        'p95_ms': percentile(95) if ordered else 0.0,
+        'p99_ms': percentile(99) if ordered else 0.0
+    }
@@ -3,23 +3,481 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import heapq
+import os
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import Book, BorrowRecord, to_timestamp, from_timestamp
 
 # Database configuration
-DATABASE = 'library.db'
+DATABASE = os.environ.get('LIBRARY_DATABASE', 'library.db')
+
+def _parse_branches(spec: str) -> Dict[str, str]:
+    """Parse a "key=path,key=path" branch list."""
+    branches = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, path = entry.partition('=')
+        if not key.strip() or not path.strip():
+            raise ValueError(f"Invalid branch '{entry}'; expected key=path.")
+        branches[key.strip()] = path.strip()
+    return branches
+
+# Branch shards: branch key -> database file (see use_branch). Branch
+# libraries listed here keep their books, loans and patron counters in their
+# own file, so each has its own writer lock. Requests and code outside any
+# branch use DATABASE.
+BRANCHES = _parse_branches(os.environ.get('LIBRARY_BRANCHES', ''))
+
+# Returned loans older than this many days are moved to borrow_records_archive
+# by archive_returned_loans() ("flask archive-loans")
+ARCHIVE_AFTER_DAYS = int(os.environ.get('LIBRARY_ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = 5000  # loans moved per write transaction
+
+# Overdue loan scheduler (see services/overdue_scheduler.py): seconds between
+# refresh_overdue_loans() runs. Precomputed late fees older than twice this
+# are treated as missing and recomputed by readers.
+OVERDUE_REFRESH_INTERVAL = int(os.environ.get('LIBRARY_OVERDUE_REFRESH_INTERVAL', '300'))
+
+# Rows fetched per round trip by the iter_* helpers that stream large results
+STREAM_BATCH_SIZE = 500
+
+# Book lookup cache configuration
+BOOK_CACHE_SIZE = 10000   # max cached entries (books plus ISBN mappings)
+BOOK_CACHE_TTL = 30.0     # seconds; bounds staleness from writes in other processes
+
+# Connection pool configuration
+POOL_SIZE = 8  # max idle connections kept per database file
+JOURNAL_MODE = 'WAL'
+CONNECTION_PRAGMAS = (
+    ('synchronous', 'NORMAL'),  # safe with WAL, one fsync per checkpoint instead of per commit
+    ('cache_size', -16000),     # negative = KiB, so ~16 MB page cache per connection
+    ('mmap_size', 268435456),   # 256 MB memory-mapped reads
+    ('temp_store', 'MEMORY'),
+)
+
+class ConnectionPool:
+    """
+    Pool of open SQLite connections for a single database file.
+    
+    Connections are configured once when they are created (row factory,
+    journal mode, PRAGMAs) and then reused, so a helper call costs a list
+    pop instead of a connect/teardown.
+    """
+    
+    def __init__(self, database: str, max_size: int = POOL_SIZE):
+        self.database = database
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        if _query_observer is not None:
+            _query_observer.connection_opened()
+        # Connections move between threads through the pool, but only one
+        # thread uses a given connection at a time.
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}')
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Take an idle connection from the pool, opening a new one if none is idle."""
+        with self._lock:
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+            self.misses += 1
+        return self._connect()
+    
+    def release(self, conn: sqlite3.Connection):
+        """Hand a connection back, discarding any uncommitted work first."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+            self.discarded += 1
+        conn.close()
+    
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+    
+    def stats(self) -> Dict:
+        """Return hit/miss counters for this pool."""
+        with self._lock:
+            return {
+                'database': self.database,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'hits': self.hits,
+                'misses': self.misses,
+                'discarded': self.discarded
+            }
+
+class PooledConnection:
+    """
+    Connection handle returned by get_db_connection().
+    
+    Behaves like sqlite3.Connection, except close() returns the underlying
+    connection to its pool instead of closing it.
+    """
+    
+    __slots__ = ('_conn', '_pool')
+    
+    def __init__(self, conn: sqlite3.Connection, pool: ConnectionPool):
+        self._conn = conn
+        self._pool = pool
+    
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+    
+    def execute(self, sql, parameters=()):
+        if _query_observer is None:
+            return self._connection().execute(sql, parameters)
+        started = time.perf_counter()
+        cursor = self._connection().execute(sql, parameters)
+        _query_observer.query_executed(sql, time.perf_counter() - started)
+        return ObservedCursor(cursor)
+    
+    def executemany(self, sql, seq_of_parameters):
+        if _query_observer is None:
+            return self._connection().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        cursor = self._connection().executemany(sql, seq_of_parameters)
+        _query_observer.query_executed(sql, time.perf_counter() - started)
+        return cursor
+    
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._conn
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+class ObservedCursor:
+    """
+    Cursor returned by PooledConnection.execute() while a query observer is set.
+    
+    SQLite does most of a SELECT's work while rows are fetched, so fetch time
+    is reported to the observer as well as the execute() call itself.
+    """
+    
+    __slots__ = ('_cursor',)
+    
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+    
+    @property
+    def row_factory(self):
+        return self._cursor.row_factory
+    
+    @row_factory.setter
+    def row_factory(self, factory):
+        self._cursor.row_factory = factory
+    
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        observer = _query_observer
+        if observer is not None:
+            observer.rows_fetched(time.perf_counter() - started)
+        return result
+    
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+    
+    def fetchmany(self, size=None):
+        return self._timed(self._cursor.fetchmany, size if size is not None else self._cursor.arraysize)
+    
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+    
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+# Optional instrumentation hook (see instrumentation.py). When set, it is
+# told about every pooled connection checkout, every new SQLite connection
+# and every statement run through a PooledConnection. None costs nothing.
+_query_observer = None
+
+def set_query_observer(observer):
+    """
+    Install (or, with None, remove) the query observer.
+    
+    Args:
+        observer: Object with connection_checked_out(), connection_opened(),
+            query_executed(sql, seconds) and rows_fetched(seconds) methods
+    """
+    global _query_observer
+    _query_observer = observer
+
+# Branch routing
+#
+# Every helper gets its connection from get_db_connection(), which asks
+# get_database_path() which file to use: the current branch's shard inside a
+# use_branch() block, DATABASE otherwise. The branch is a context variable,
+# so each thread and request has its own.
+
+_current_branch = ContextVar('library_branch', default=None)
+
+def configure_branches(branches: Dict[str, str]):
+    """Replace the branch -> database file mapping."""
+    BRANCHES.clear()
+    BRANCHES.update(branches)
+
+def get_branches() -> List[str]:
+    """Get the configured branch keys."""
+    return list(BRANCHES)
+
+def get_current_branch() -> Optional[str]:
+    """Get the branch selected by the enclosing use_branch() block, or None."""
+    return _current_branch.get()
+
+def get_database_path() -> str:
+    """Get the database file for the current branch (DATABASE outside any branch)."""
+    branch = _current_branch.get()
+    return DATABASE if branch is None else BRANCHES[branch]
+
+@contextmanager
+def use_branch(branch: Optional[str]):
+    """
+    Route database helpers called in the block to a branch's shard.
+    
+    Args:
+        branch: A configured branch key, or None for DATABASE
+        
+    Raises:
+        ValueError: If the branch is not configured
+    """
+    if branch is not None and branch not in BRANCHES:
+        raise ValueError(f"Unknown branch '{branch}'.")
+    token = _current_branch.set(branch)
+    try:
+        yield
+    finally:
+        _current_branch.reset(token)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(database: Optional[str] = None) -> ConnectionPool:
+    """Get the connection pool for a database file (defaults to the current branch's)."""
+    database = database or get_database_path()
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(database, ConnectionPool(database))
+    return pool
+
+def _query(conn, sql: str, parameters=(), row_factory=None):
+    """Execute a query on conn, building its rows with row_factory (e.g. Book.row_factory)."""
+    cursor = conn.execute(sql, parameters)
+    cursor.row_factory = row_factory
+    return cursor
 
 def get_db_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
-    return conn
+    """Get a pooled database connection. Calling close() returns it to the pool."""
+    pool = get_connection_pool()
+    if _query_observer is not None:
+        _query_observer.connection_checked_out()
+    return PooledConnection(pool.acquire(), pool)
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = get_db_connection()
+def set_pool_size(max_size: int):
+    """Change how many idle connections each pool keeps."""
+    global POOL_SIZE
+    POOL_SIZE = max_size
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.max_size = max_size
+
+def get_pool_stats() -> List[Dict]:
+    """Get hit/miss metrics for every connection pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+def close_connection_pools():
+    """Close all pooled connections and forget the pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+# Connections inherited from the parent process, kept referenced so they are never closed in a child
+_inherited_pools = []
+
+def reset_connection_pools_after_fork():
+    """
+    Forget pooled connections inherited across fork(); call first thing in a child process.
+    
+    SQLite connections must not be used in a child process. They are not
+    closed either, because closing one may checkpoint or delete the WAL file
+    that the parent is still using; they are just never handed out again.
+    """
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+class BookCache:
+    """
+    Size-bounded LRU cache with a per-entry TTL.
+    
+    Used as a read-through cache by get_book_by_id and get_book_by_isbn.
+    Writes that change a book invalidate its entry explicitly; the TTL only
+    limits staleness from writes made by other processes.
+    """
     
+    def __init__(self, max_size: int = BOOK_CACHE_SIZE, ttl: float = BOOK_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        """Cache value under key, evicting the least recently used entries if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key):
+        """Drop the entry for key if it is cached."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Return size, hit rate and eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+book_cache = BookCache()
+
+def get_book_cache_stats() -> Dict:
+    """Get hit-rate and eviction counters for the book lookup cache."""
+    return book_cache.stats()
+
+def invalidate_book_cache(book_id: Optional[int] = None):
+    """Drop a cached book (by ID), or the whole book cache if no ID is given."""
+    if book_id is None:
+        book_cache.clear()
+    else:
+        book_cache.invalidate((get_database_path(), 'id', book_id))
+
+def get_catalog_version() -> Tuple[int, int]:
+    """
+    Get the catalog version, which changes whenever any book is added, changed or removed.
+    
+    Returns:
+        tuple: (version, updated_at) where updated_at is the UTC epoch second
+        of the latest change
+    """
+    conn = get_db_connection()
+    row = conn.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    conn.close()
+    return row['version'], row['updated_at']
+
+def init_database():
+    """Initialize the database with required tables by applying any pending migrations."""
+    migrate_database()
+
+def init_branch_databases():
+    """Run init_database() on every configured branch shard."""
+    for branch in BRANCHES:
+        with use_branch(branch):
+            init_database()
+
+# Schema migrations
+#
+# Each migration is a function that takes an open connection and brings the
+# schema from version N-1 to version N, where N is its position in
+# MIGRATIONS (starting at 1). The applied version is stored in
+# PRAGMA user_version. Never edit a migration that has shipped; append a new
+# one instead.
+
+def _migration_base_schema(conn):
+    """Version 1: books and borrow_records tables, catalog and search indexes."""
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -45,8 +503,559 @@ def init_database():
         )
     ''')
     
-    conn.commit()
+    # Covering index for keyset pagination of the catalog on (title, id)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_title_id
+        ON books (title, id, author, isbn, total_copies, available_copies)
+    ''')
+    
+    _init_search_index(conn)
+
+def _migration_borrow_record_indexes(conn):
+    """Version 2: indexes for the per-patron borrow_records queries."""
+    # Full borrowing history, newest first
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_borrow_date
+        ON borrow_records (patron_id, borrow_date)
+    ''')
+    # Open loans only: borrow counts, currently borrowed books and returns.
+    # Created after the history index so the planner prefers it when both match.
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_by_patron
+        ON borrow_records (patron_id, borrow_date, book_id)
+        WHERE return_date IS NULL
+    ''')
+
+def _migration_patron_counters(conn):
+    """Version 3: patrons table with per-patron loan and fee counters, kept in sync by triggers."""
+    # Late fees paid while a loan was still open
+    conn.execute('ALTER TABLE borrow_records ADD COLUMN fees_paid REAL NOT NULL DEFAULT 0')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patrons (
+            patron_id TEXT PRIMARY KEY,
+            active_loans INTEGER NOT NULL DEFAULT 0,
+            outstanding_fees REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    
+    # New open loan
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS patrons_loan_opened
+        AFTER INSERT ON borrow_records WHEN new.return_date IS NULL BEGIN
+            INSERT INTO patrons (patron_id, active_loans) VALUES (new.patron_id, 1)
+            ON CONFLICT (patron_id) DO UPDATE SET active_loans = active_loans + 1;
+        END
+    ''')
+    # Loan recorded as already returned (history imports), assessed like a return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS patrons_loan_inserted_returned
+        AFTER INSERT ON borrow_records WHEN new.return_date IS NOT NULL BEGIN
+            INSERT INTO patrons (patron_id, outstanding_fees)
+            SELECT new.patron_id, MAX(MIN(MIN(days_late, 7) * 0.5 + MAX(days_late - 7, 0) * 1.0, 15.0) - new.fees_paid, 0)
+            FROM (SELECT MAX(CAST(julianday(new.return_date) - julianday(new.due_date) AS INTEGER), 0) AS days_late)
+            WHERE true
+            ON CONFLICT (patron_id) DO UPDATE SET outstanding_fees = outstanding_fees + excluded.outstanding_fees;
+        END
+    ''')
+    # Open loan returned: one fewer active loan, plus any late fee not already paid
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS patrons_loan_returned
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN old.return_date IS NULL AND new.return_date IS NOT NULL BEGIN
+            INSERT INTO patrons (patron_id, active_loans, outstanding_fees)
+            SELECT new.patron_id, 0, MAX(MIN(MIN(days_late, 7) * 0.5 + MAX(days_late - 7, 0) * 1.0, 15.0) - new.fees_paid, 0)
+            FROM (SELECT MAX(CAST(julianday(new.return_date) - julianday(new.due_date) AS INTEGER), 0) AS days_late)
+            WHERE true
+            ON CONFLICT (patron_id) DO UPDATE SET
+                active_loans = MAX(active_loans - 1, 0),
+                outstanding_fees = outstanding_fees + excluded.outstanding_fees;
+        END
+    ''')
+    
+    _rebuild_patron_counters(conn, days_late=_ISO_DAYS_LATE_SQL)
+
+def _migration_loan_archive(conn):
+    """Version 4: borrow_records_archive table for returned loans moved out of borrow_records."""
+    # Same columns as borrow_records; ids are kept so a loan has one id for life
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_records_archive (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT NOT NULL,
+            fees_paid REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_archive_patron_borrow_date
+        ON borrow_records_archive (patron_id, borrow_date)
+    ''')
+
+def _migration_overdue_loans(conn):
+    """Version 5: due date index on open loans and the overdue_loans late fee table."""
+    # Open loans by due date: the scheduler's range scan for newly overdue loans
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_due_date
+        ON borrow_records (due_date)
+        WHERE return_date IS NULL
+    ''')
+    # Late fee of every open loan due on or before the watermark, as of assessed_at
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS overdue_loans (
+            loan_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            due_date TEXT NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            late_fee REAL NOT NULL,
+            assessed_at TEXT NOT NULL
+        )
+    ''')
+    # Single row: due dates up to the watermark have been scanned
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS overdue_scan_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            watermark TEXT NOT NULL
+        )
+    ''')
+    
+    # Loans recorded already past the watermark (history imports) would never
+    # be picked up by the incremental scan, so assess them as of the watermark
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS overdue_loans_backdated
+        AFTER INSERT ON borrow_records
+        WHEN new.return_date IS NULL
+         AND new.due_date <= (SELECT watermark FROM overdue_scan_state WHERE id = 1) BEGIN
+            INSERT OR REPLACE INTO overdue_loans
+                (loan_id, patron_id, book_id, due_date, days_overdue, late_fee, assessed_at)
+            SELECT new.id, new.patron_id, new.book_id, new.due_date, days_overdue,
+                   MIN(MIN(days_overdue, 7) * 0.5 + MAX(days_overdue - 7, 0) * 1.0, 15.0), watermark
+            FROM (SELECT watermark,
+                         MAX(CAST(julianday(watermark) - julianday(new.due_date) AS INTEGER), 0) AS days_overdue
+                  FROM overdue_scan_state WHERE id = 1);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS overdue_loans_returned
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN new.return_date IS NOT NULL BEGIN
+            DELETE FROM overdue_loans WHERE loan_id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS overdue_loans_deleted
+        AFTER DELETE ON borrow_records BEGIN
+            DELETE FROM overdue_loans WHERE loan_id = old.id;
+        END
+    ''')
+
+def _migration_epoch_dates(conn):
+    """
+    Version 6: loan dates as INTEGER Unix epoch seconds instead of ISO-8601 TEXT.
+    
+    SQLite cannot change a column's type, so borrow_records and
+    borrow_records_archive are rebuilt (keeping ids and the AUTOINCREMENT
+    sequence) and their indexes and triggers recreated with integer date
+    math. overdue_loans only caches the scheduler's assessments, so it is
+    recreated empty and refilled by the next refresh.
+    """
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'borrow_records'").fetchone()
+    
+    conn.execute('''
+        CREATE TABLE borrow_records_epoch (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            return_date INTEGER,
+            fees_paid REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO borrow_records_epoch (id, patron_id, book_id, borrow_date, due_date, return_date, fees_paid)
+        SELECT id, patron_id, book_id, CAST(strftime('%s', borrow_date) AS INTEGER),
+               CAST(strftime('%s', due_date) AS INTEGER), CAST(strftime('%s', return_date) AS INTEGER), fees_paid
+        FROM borrow_records
+    ''')
+    conn.execute('DROP TABLE borrow_records')
+    conn.execute('ALTER TABLE borrow_records_epoch RENAME TO borrow_records')
+    if sequence:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'borrow_records'", (sequence[0],))
+        conn.execute('''
+            INSERT INTO sqlite_sequence (name, seq) SELECT 'borrow_records', ? 
+            WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'borrow_records')
+        ''', (sequence[0],))
+    
+    conn.execute('''
+        CREATE TABLE borrow_records_archive_epoch (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            return_date INTEGER NOT NULL,
+            fees_paid REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO borrow_records_archive_epoch
+        SELECT id, patron_id, book_id, CAST(strftime('%s', borrow_date) AS INTEGER),
+               CAST(strftime('%s', due_date) AS INTEGER), CAST(strftime('%s', return_date) AS INTEGER), fees_paid
+        FROM borrow_records_archive
+    ''')
+    conn.execute('DROP TABLE borrow_records_archive')
+    conn.execute('ALTER TABLE borrow_records_archive_epoch RENAME TO borrow_records_archive')
+    
+    conn.execute('DROP TABLE overdue_loans')
+    conn.execute('DROP TABLE overdue_scan_state')
+    conn.execute('''
+        CREATE TABLE overdue_loans (
+            loan_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            late_fee REAL NOT NULL,
+            assessed_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE overdue_scan_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            watermark INTEGER NOT NULL
+        )
+    ''')
+    
+    # Indexes from versions 2, 4 and 5
+    conn.execute('CREATE INDEX idx_borrow_records_patron_borrow_date ON borrow_records (patron_id, borrow_date)')
+    conn.execute('''
+        CREATE INDEX idx_borrow_records_open_by_patron
+        ON borrow_records (patron_id, borrow_date, book_id)
+        WHERE return_date IS NULL
+    ''')
+    conn.execute('CREATE INDEX idx_borrow_records_open_due_date ON borrow_records (due_date) WHERE return_date IS NULL')
+    conn.execute('''
+        CREATE INDEX idx_borrow_records_archive_patron_borrow_date
+        ON borrow_records_archive (patron_id, borrow_date)
+    ''')
+    
+    # Triggers from versions 3 and 5, with days computed as (later - earlier) / 86400
+    conn.execute('''
+        CREATE TRIGGER patrons_loan_opened
+        AFTER INSERT ON borrow_records WHEN new.return_date IS NULL BEGIN
+            INSERT INTO patrons (patron_id, active_loans) VALUES (new.patron_id, 1)
+            ON CONFLICT (patron_id) DO UPDATE SET active_loans = active_loans + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER patrons_loan_inserted_returned
+        AFTER INSERT ON borrow_records WHEN new.return_date IS NOT NULL BEGIN
+            INSERT INTO patrons (patron_id, outstanding_fees)
+            SELECT new.patron_id, MAX(MIN(MIN(days_late, 7) * 0.5 + MAX(days_late - 7, 0) * 1.0, 15.0) - new.fees_paid, 0)
+            FROM (SELECT MAX((new.return_date - new.due_date) / 86400, 0) AS days_late)
+            WHERE true
+            ON CONFLICT (patron_id) DO UPDATE SET outstanding_fees = outstanding_fees + excluded.outstanding_fees;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER patrons_loan_returned
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN old.return_date IS NULL AND new.return_date IS NOT NULL BEGIN
+            INSERT INTO patrons (patron_id, active_loans, outstanding_fees)
+            SELECT new.patron_id, 0, MAX(MIN(MIN(days_late, 7) * 0.5 + MAX(days_late - 7, 0) * 1.0, 15.0) - new.fees_paid, 0)
+            FROM (SELECT MAX((new.return_date - new.due_date) / 86400, 0) AS days_late)
+            WHERE true
+            ON CONFLICT (patron_id) DO UPDATE SET
+                active_loans = MAX(active_loans - 1, 0),
+                outstanding_fees = outstanding_fees + excluded.outstanding_fees;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER overdue_loans_backdated
+        AFTER INSERT ON borrow_records
+        WHEN new.return_date IS NULL
+         AND new.due_date <= (SELECT watermark FROM overdue_scan_state WHERE id = 1) BEGIN
+            INSERT OR REPLACE INTO overdue_loans
+                (loan_id, patron_id, book_id, due_date, days_overdue, late_fee, assessed_at)
+            SELECT new.id, new.patron_id, new.book_id, new.due_date, days_overdue,
+                   MIN(MIN(days_overdue, 7) * 0.5 + MAX(days_overdue - 7, 0) * 1.0, 15.0), watermark
+            FROM (SELECT watermark, MAX((watermark - new.due_date) / 86400, 0) AS days_overdue
+                  FROM overdue_scan_state WHERE id = 1);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER overdue_loans_returned
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN new.return_date IS NOT NULL BEGIN
+            DELETE FROM overdue_loans WHERE loan_id = new.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER overdue_loans_deleted
+        AFTER DELETE ON borrow_records BEGIN
+            DELETE FROM overdue_loans WHERE loan_id = old.id;
+        END
+    ''')
+
+def _migration_catalog_version(conn):
+    """Version 7: catalog_version counter, bumped by triggers on every change to books."""
+    # Single row. updated_at is real UTC epoch seconds (used for Last-Modified),
+    # unlike loan dates, which count local wall-clock time
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO catalog_version (id, version, updated_at)
+        VALUES (1, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ''')
+    
+    # Triggers rather than calls in the write helpers, so every write path
+    # and every process (web workers, imports, the CLI) moves the version on
+    for name, event in (('inserted', 'INSERT'), ('updated', 'UPDATE'), ('deleted', 'DELETE')):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS catalog_version_{name}
+            AFTER {event} ON books BEGIN
+                UPDATE catalog_version
+                SET version = version + 1, updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE id = 1;
+            END
+        ''')
+
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_borrow_record_indexes,
+    _migration_patron_counters,
+    _migration_loan_archive,
+    _migration_overdue_loans,
+    _migration_epoch_dates,
+    _migration_catalog_version,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version() -> int:
+    """Get the schema version recorded in the database."""
+    conn = get_db_connection()
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
     conn.close()
+    return version
+
+def check_schema_version():
+    """
+    Make sure the database has been migrated, without migrating it.
+    
+    Raises:
+        RuntimeError: If the schema is older than SCHEMA_VERSION
+    """
+    version = get_schema_version()
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}. "
+            "Run 'flask migrate-db' first."
+        )
+
+def migrate_database(target_version: int = SCHEMA_VERSION) -> int:
+    """
+    Apply pending schema migrations up to target_version.
+    
+    Each migration runs in its own BEGIN IMMEDIATE transaction together with
+    the user_version bump, so a failed migration leaves the previous version
+    intact and concurrent processes cannot apply the same step twice.
+    
+    Returns:
+        int: The schema version after migrating
+    """
+    conn = get_db_connection()
+    try:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= target_version:
+                conn.rollback()
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version + 1}')
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _init_search_index(conn):
+    """
+    Create the FTS5 full-text index over book titles and authors.
+    
+    books_fts is an external-content table backed by books, kept in sync by
+    triggers, so every write path updates it without extra code. If this
+    SQLite build lacks FTS5, searches fall back to LIKE queries.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+    ).fetchone()
+    if exists:
+        return
+    
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE books_fts USING fts5(
+                title, author,
+                content='books', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    
+    # Index any books that existed before the search index was created
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+# Patron counters
+#
+# patrons.active_loans counts a patron's open loans and
+# patrons.outstanding_fees totals the late fees still owed on their returned
+# loans: the fee assessed at return minus anything paid while the loan was
+# open (borrow_records.fees_paid). Triggers on borrow_records update both in
+# the same transaction as every loan insert and return, so borrow limit
+# checks are a primary key lookup instead of a COUNT(*) over the patron's loans.
+# Archiving a returned loan moves it without changing either counter, so
+# recounts read borrow_records and borrow_records_archive together.
+
+# Whole days a returned loan was late, for dates stored as ISO-8601 text
+# (schema versions 3 to 5) and as epoch seconds (version 6 on)
+_ISO_DAYS_LATE_SQL = 'MAX(CAST(julianday(return_date) - julianday(due_date) AS INTEGER), 0)'
+_DAYS_LATE_SQL = 'MAX((return_date - due_date) / 86400, 0)'
+
+_ALL_LOANS_SQL = '''(
+    SELECT patron_id, return_date, due_date, fees_paid FROM borrow_records
+    UNION ALL
+    SELECT patron_id, return_date, due_date, fees_paid FROM borrow_records_archive
+)'''
+
+_PATRON_COUNTERS_SQL = '''
+    SELECT patron_id,
+           SUM(return_date IS NULL) AS active_loans,
+           TOTAL(CASE WHEN return_date IS NOT NULL THEN
+               MAX(MIN(MIN(days_late, 7) * 0.5 + MAX(days_late - 7, 0) * 1.0, 15.0) - fees_paid, 0) END) AS outstanding_fees
+    FROM (
+        SELECT patron_id, return_date, fees_paid,
+               {days_late} AS days_late
+        FROM {loans}
+    )
+    GROUP BY patron_id
+'''
+
+def _rebuild_patron_counters(conn, loans: str = 'borrow_records', days_late: str = _DAYS_LATE_SQL):
+    """Recompute every row of patrons from loans (a table or subquery) on an open connection."""
+    conn.execute('DELETE FROM patrons')
+    conn.execute('INSERT INTO patrons (patron_id, active_loans, outstanding_fees) '
+                 + _PATRON_COUNTERS_SQL.format(loans=loans, days_late=days_late))
+
+def check_patron_counters(repair: bool = False) -> List[Dict]:
+    """
+    Compare the patrons counters with a recount from borrow_records and the archive.
+    
+    Args:
+        repair: Rebuild the patrons table from the loans if any counter is off
+        
+    Returns:
+        list: {'patron_id', 'active_loans', 'expected_active_loans',
+        'outstanding_fees', 'expected_outstanding_fees'} for every patron
+        whose counters disagree with the recount
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        rows = conn.execute(f'''
+            WITH expected AS ({_PATRON_COUNTERS_SQL.format(loans=_ALL_LOANS_SQL, days_late=_DAYS_LATE_SQL)})
+            SELECT e.patron_id,
+                   COALESCE(p.active_loans, 0) AS active_loans, e.active_loans AS expected_active_loans,
+                   COALESCE(p.outstanding_fees, 0) AS outstanding_fees, e.outstanding_fees AS expected_outstanding_fees
+            FROM expected e LEFT JOIN patrons p ON p.patron_id = e.patron_id
+            WHERE p.patron_id IS NULL OR p.active_loans != e.active_loans
+               OR ABS(p.outstanding_fees - e.outstanding_fees) > 0.005
+            UNION ALL
+            SELECT p.patron_id, p.active_loans, 0, p.outstanding_fees, 0.0
+            FROM patrons p
+            WHERE (p.active_loans != 0 OR p.outstanding_fees != 0)
+              AND NOT EXISTS (SELECT 1 FROM borrow_records br WHERE br.patron_id = p.patron_id)
+              AND NOT EXISTS (SELECT 1 FROM borrow_records_archive ba WHERE ba.patron_id = p.patron_id)
+        ''').fetchall()
+        mismatches = [dict(row) for row in rows]
+        if mismatches and repair:
+            _rebuild_patron_counters(conn, _ALL_LOANS_SQL)
+        conn.commit()
+        return mismatches
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_patron_counters(patron_id: str) -> Dict:
+    """Get a patron's active loan count and outstanding late fees (zero for unknown patrons)."""
+    conn = get_db_connection()
+    row = conn.execute(
+        'SELECT active_loans, outstanding_fees FROM patrons WHERE patron_id = ?', (patron_id,)
+    ).fetchone()
+    conn.close()
+    if not row:
+        return {'active_loans': 0, 'outstanding_fees': 0.0}
+    return {'active_loans': row['active_loans'], 'outstanding_fees': round(row['outstanding_fees'], 2)}
+
+def record_late_fee_payment(patron_id: str, book_id: int, amount: float) -> bool:
+    """
+    Record a late fee payment against the patron's oldest open loan of a book.
+    
+    The payment is subtracted from the fee assessed when the loan is
+    returned, so it never reaches patrons.outstanding_fees.
+    
+    Returns:
+        bool: True if an open loan was found and updated
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE borrow_records SET fees_paid = fees_paid + ? 
+            WHERE id = (
+                SELECT id FROM borrow_records 
+                WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+                ORDER BY borrow_date LIMIT 1
+            )
+        ''', (amount, patron_id, book_id))
+        conn.commit()
+        return cursor.rowcount == 1
+    except sqlite3.Error:
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
@@ -62,21 +1071,22 @@ def add_sample_data():
         ]
         
         for title, author, isbn, copies in sample_books:
-            conn.execute('''
+            book_id = conn.execute('''
                 INSERT INTO books (title, author, isbn, total_copies, available_copies)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (title, author, isbn, copies, copies))
+            ''', (title, author, isbn, copies, copies)).lastrowid
         
-        # Make 1984 unavailable by adding a borrow record
+        # Make 1984 unavailable by adding a borrow record. After reset_db the
+        # books get new IDs, so use the one just inserted rather than 3.
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
+        ''', ('123456', book_id, 
+              to_timestamp(datetime.now() - timedelta(days=5)),
+              to_timestamp(datetime.now() + timedelta(days=9))))
         
         # Update available copies for 1984
-        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
+        conn.execute('UPDATE books SET available_copies = 0 WHERE id = ?', (book_id,))
         
         conn.commit()
     
@@ -84,86 +1094,312 @@ def add_sample_data():
 
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
+def get_all_books() -> List[Book]:
     """Get all books from the database."""
     conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
+    books = _query(conn, 'SELECT * FROM books ORDER BY title', row_factory=Book.row_factory).fetchall()
+    conn.close()
+    return books
+
+def get_books_page(limit: int, after: Optional[Tuple[str, int]] = None,
+                   before: Optional[Tuple[str, int]] = None) -> Dict:
+    """
+    Get one page of books ordered by (title, id) using keyset pagination.
+    
+    Seeks directly to the cursor through idx_books_title_id, so the cost of
+    a page does not depend on how far into the catalog it is.
+    
+    Args:
+        limit: Maximum number of books on the page
+        after: (title, id) of the last book on the previous page
+        before: (title, id) of the first book on the next page
+        
+    Returns:
+        dict: books on the page plus has_next/has_prev flags
+    """
+    conn = get_db_connection()
+    if before is not None:
+        rows = _query(conn, '''
+            SELECT * FROM books WHERE (title, id) < (?, ?) 
+            ORDER BY title DESC, id DESC LIMIT ?
+        ''', (before[0], before[1], limit + 1), Book.row_factory).fetchall()
+        has_prev = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            rows = _query(conn, '''
+                SELECT * FROM books WHERE (title, id) > (?, ?) 
+                ORDER BY title, id LIMIT ?
+            ''', (after[0], after[1], limit + 1), Book.row_factory).fetchall()
+        else:
+            rows = _query(conn, '''
+                SELECT * FROM books ORDER BY title, id LIMIT ?
+            ''', (limit + 1,), Book.row_factory).fetchall()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_prev = after is not None
+    
+    # A cursor taken from a page that has since emptied may have nothing on
+    # the other side; check with a single index probe.
+    if rows and has_prev and after is not None:
+        has_prev = conn.execute(
+            'SELECT 1 FROM books WHERE (title, id) < (?, ?) LIMIT 1',
+            (rows[0]['title'], rows[0]['id'])
+        ).fetchone() is not None
+    if rows and has_next and before is not None:
+        has_next = conn.execute(
+            'SELECT 1 FROM books WHERE (title, id) > (?, ?) LIMIT 1',
+            (rows[-1]['title'], rows[-1]['id'])
+        ).fetchone() is not None
     conn.close()
-    return [dict(book) for book in books]
+    
+    return {
+        'books': rows,
+        'has_next': bool(rows) and has_next,
+        'has_prev': bool(rows) and has_prev
+    }
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
-    """Get a specific book by ID."""
+def get_book_by_id(book_id: int) -> Optional[Book]:
+    """Get a specific book by ID (read through the book cache)."""
+    database = get_database_path()
+    key = (database, 'id', book_id)
+    book = book_cache.get(key)
+    if book is not None:
+        return book.copy()
+    
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+    book = _query(conn, 'SELECT * FROM books WHERE id = ?', (book_id,), Book.row_factory).fetchone()
     conn.close()
-    return dict(book) if book else None
+    if not book:
+        return None
+    book_cache.set(key, book)
+    book_cache.set((database, 'isbn', book.isbn), book.id)
+    return book.copy()
 
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
+    """Get a specific book by ISBN (read through the book cache)."""
+    # ISBNs map to a book ID, so the book itself is only cached (and
+    # invalidated) once, under its ID.
+    database = get_database_path()
+    book_id = book_cache.get((database, 'isbn', isbn))
+    if book_id is not None:
+        book = book_cache.get((database, 'id', book_id))
+        if book is not None:
+            return book.copy()
+    
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    book = _query(conn, 'SELECT * FROM books WHERE isbn = ?', (isbn,), Book.row_factory).fetchone()
     conn.close()
-    return dict(book) if book else None
+    if not book:
+        return None
+    book_cache.set((database, 'id', book.id), book)
+    book_cache.set((database, 'isbn', isbn), book.id)
+    return book.copy()
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+def search_books(search_term: str, search_type: str) -> List[Book]:
+    """
+    Search books by title, author or ISBN.
+    
+    Title and author searches use the books_fts index. Each word in the
+    search term is matched as a case-insensitive word prefix, and results
+    are ordered by relevance. ISBN searches are exact matches served by the
+    unique index on books.isbn.
+    """
+    return list(iter_search_books(search_term, search_type))
+
+def _ranked_book(cursor, row):
+    return row[0], Book(*row[1:])
+
+def _unranked_book(cursor, row):
+    return Book(*row[1:])
+
+def iter_search_books(search_term: str, search_type: str, batch_size: int = STREAM_BATCH_SIZE,
+                      with_rank: bool = False) -> Iterator[Book]:
+    """
+    Stream the results of search_books, fetching batch_size rows at a time.
+    
+    The connection stays checked out until the generator is exhausted or
+    closed, so only one batch of books is in memory however many match.
+    With with_rank, yields (rank, book) pairs instead: the FTS5 rank
+    (lower is better), or 0.0 for ISBN and fallback LIKE searches.
+    """
+    if search_type not in ('title', 'author', 'isbn'):
+        return
+    # Underscores separate words, as they do for the unicode61 tokenizer that built the index
+    words = re.findall(r'[^\W_]+', search_term)
+    if search_type != 'isbn' and not words:
+        return
+    
+    conn = get_db_connection()
+    cursor = None
+    try:
+        if search_type == 'isbn':
+            sql, parameters = 'SELECT 0.0, * FROM books WHERE isbn = ?', (search_term,)
+        elif _has_search_index(conn):
+            match = '{%s} : (%s)' % (search_type, ' AND '.join(f'"{word}"*' for word in words))
+            sql = '''
+                SELECT books_fts.rank, b.* FROM books_fts 
+                JOIN books b ON b.id = books_fts.rowid 
+                WHERE books_fts MATCH ? 
+                ORDER BY books_fts.rank, b.title
+            '''
+            parameters = (match,)
+        else:
+            sql = f"SELECT 0.0, * FROM books WHERE {search_type} LIKE ? ESCAPE '\\' ORDER BY title"
+            parameters = ('%' + re.sub(r'([%_\\])', r'\\\1', search_term.strip()) + '%',)
+        
+        cursor = _query(conn, sql, parameters, _ranked_book if with_rank else _unranked_book)
+        while True:
+            books = cursor.fetchmany(batch_size)
+            if not books:
+                return
+            yield from books
+    finally:
+        if cursor is not None:
+            cursor.close()
+        conn.close()
+
+def iter_all_books(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Book]:
+    """
+    Stream the whole catalog in ID order, batch_size books at a time.
+    
+    Each batch is its own keyset query on the primary key, so no connection
+    or read snapshot is held while the caller works through a batch.
+    """
+    last_id = 0
+    while True:
+        conn = get_db_connection()
+        books = _query(conn, 'SELECT * FROM books WHERE id > ? ORDER BY id LIMIT ?',
+                       (last_id, batch_size), Book.row_factory).fetchall()
+        conn.close()
+        if not books:
+            return
+        yield from books
+        last_id = books[-1].id
+
+def search_branches(search_term: str, search_type: str,
+                    branches: Optional[List[str]] = None) -> List[Tuple[Optional[str], Book]]:
+    """
+    Search several branches' catalogs at once and merge the results.
+    
+    Each shard is searched on its own thread (SQLite releases the GIL while
+    it runs a query), then the per-branch results, which are already in
+    rank order, are merged by rank and title.
+    
+    Args:
+        branches: Branch keys to search (default: every configured branch,
+            or just DATABASE if there are none)
+        
+    Returns:
+        list: (branch, book) pairs
+    """
+    if branches is None:
+        branches = get_branches() or [None]
+    
+    def search(branch):
+        with use_branch(branch):
+            return [(rank, book.title, position, branch or '', book) for position, (rank, book)
+                    in enumerate(iter_search_books(search_term, search_type, with_rank=True))]
+    
+    if len(branches) == 1:
+        per_branch = [search(branches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(branches)) as executor:
+            per_branch = list(executor.map(search, branches))
+    # position breaks ties within a branch, so books themselves are never compared
+    return [(branch or None, book) for _, _, _, branch, book in heapq.merge(*per_branch)]
+
+_search_indexed_databases = set()
+
+def _has_search_index(conn) -> bool:
+    """Check whether the current database has the FTS5 search index."""
+    database = get_database_path()
+    if database in _search_indexed_databases:
+        return True
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+    ).fetchone():
+        _search_indexed_databases.add(database)
+        return True
+    return False
+
+def get_patron_borrowed_books(patron_id: str) -> List[BorrowRecord]:
     """Get currently borrowed books for a patron."""
     conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
+    records = _query(conn, '''
+        SELECT br.id, br.book_id, b.title, b.author, br.borrow_date, br.due_date, br.return_date 
         FROM borrow_records br 
         JOIN books b ON br.book_id = b.id 
         WHERE br.patron_id = ? AND br.return_date IS NULL
         ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
+    ''', (patron_id,), BorrowRecord.row_factory).fetchall()
     conn.close()
-    
-    borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
-    
-    return borrowed_books
+    return records
 
-def get_patron_borrowing_history(patron_id: str) -> List[Dict]:
-    """Get all borrowing records for a patron (including returned books)."""
+def get_patron_borrowing_history(patron_id: str) -> List[BorrowRecord]:
+    """
+    Get all borrowing records for a patron (including returned and archived loans).
+    
+    Open loans the overdue scheduler has assessed recently also carry its
+    late_fee and days_overdue; both are None for every other record.
+    fees_paid is what was paid towards each loan's late fee while it was open.
+    """
     conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
+    records = _query(conn, '''
+        SELECT br.id, br.book_id, b.title, b.author, br.borrow_date, br.due_date, br.return_date, 
+               CASE WHEN o.assessed_at >= :fresh_after THEN o.late_fee END AS late_fee, 
+               CASE WHEN o.assessed_at >= :fresh_after THEN o.days_overdue END AS days_overdue, 
+               br.fees_paid 
+        FROM (
+            SELECT id, book_id, borrow_date, due_date, return_date, fees_paid 
+            FROM borrow_records WHERE patron_id = :patron_id
+            UNION ALL
+            SELECT id, book_id, borrow_date, due_date, return_date, fees_paid 
+            FROM borrow_records_archive WHERE patron_id = :patron_id
+        ) br 
         JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ?
+        LEFT JOIN overdue_loans o ON o.loan_id = br.id 
         ORDER BY br.borrow_date DESC
-    ''', (patron_id,)).fetchall()
+    ''', {'patron_id': patron_id, 'fresh_after': _overdue_fees_fresh_after()},
+        BorrowRecord.row_factory).fetchall()
     conn.close()
-    
-    history = []
-    for record in records:
-        history.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'return_date': datetime.fromisoformat(record['return_date']) if record['return_date'] else None
-        })
-    
-    return history
+    return records
 
-def get_patron_borrow_count(patron_id: str) -> int:
-    """Get the number of books currently borrowed by a patron."""
+def get_open_loan(patron_id: str, book_id: int) -> Optional[Dict]:
+    """
+    Get the patron's oldest open loan of a book.
+    
+    Returns:
+        dict: due_date, fees_paid (already paid towards its late fee), plus
+        the overdue scheduler's late_fee and days_overdue if it has assessed
+        the loan recently (otherwise None), or None if the patron has no
+        open loan of the book
+    """
     conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
+    record = conn.execute('''
+        SELECT br.due_date, br.fees_paid, 
+               CASE WHEN o.assessed_at >= :fresh_after THEN o.late_fee END AS late_fee, 
+               CASE WHEN o.assessed_at >= :fresh_after THEN o.days_overdue END AS days_overdue 
+        FROM borrow_records br 
+        LEFT JOIN overdue_loans o ON o.loan_id = br.id 
+        WHERE br.patron_id = :patron_id AND br.book_id = :book_id AND br.return_date IS NULL 
+        ORDER BY br.borrow_date 
+        LIMIT 1
+    ''', {'patron_id': patron_id, 'book_id': book_id, 'fresh_after': _overdue_fees_fresh_after()}).fetchone()
     conn.close()
-    return count
+    if not record:
+        return None
+    return {
+        'due_date': from_timestamp(record['due_date']),
+        'fees_paid': record['fees_paid'],
+        'late_fee': record['late_fee'],
+        'days_overdue': record['days_overdue']
+    }
+
+def get_patron_borrow_count(patron_id: str) -> int:
+    """Get the number of books currently borrowed by a patron (from the patrons counters)."""
+    return get_patron_counters(patron_id)['active_loans']
 
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
@@ -175,11 +1411,54 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
         ''', (title, author, isbn, total_copies, available_copies))
         conn.commit()
         conn.close()
+        book_cache.invalidate((get_database_path(), 'isbn', isbn))
         return True
     except Exception as e:
         conn.close()
         return False
 
+def insert_books_batch(books: List[Tuple[str, str, str, int]]) -> Tuple[int, List[str]]:
+    """
+    Insert many books in one transaction, skipping ISBNs already in the catalog.
+    
+    The duplicate check and the executemany insert run under the same write
+    lock, so concurrent writers cannot slip a duplicate in between.
+    
+    Args:
+        books: (title, author, isbn, total_copies) tuples with unique ISBNs
+        
+    Returns:
+        tuple: (number of books inserted, ISBNs skipped because they already exist)
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        existing = set()
+        isbns = [book[2] for book in books]
+        # Stay under SQLite's default limit of 999 bound parameters
+        for start in range(0, len(isbns), 900):
+            chunk = isbns[start:start + 900]
+            rows = conn.execute(
+                f"SELECT isbn FROM books WHERE isbn IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            existing.update(row['isbn'] for row in rows)
+        
+        new_books = [(title, author, isbn, copies, copies)
+                     for title, author, isbn, copies in books if isbn not in existing]
+        conn.executemany('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?)
+        ''', new_books)
+        conn.commit()
+        for book in new_books:
+            book_cache.invalidate((get_database_path(), 'isbn', book[2]))
+        return len(new_books), [isbn for isbn in isbns if isbn in existing]
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
     conn = get_db_connection()
@@ -187,7 +1466,7 @@ def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, du
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+        ''', (patron_id, book_id, to_timestamp(borrow_date), to_timestamp(due_date)))
         conn.commit()
         conn.close()
         return True
@@ -204,6 +1483,7 @@ def update_book_availability(book_id: int, change: int) -> bool:
         ''', (change, book_id))
         conn.commit()
         conn.close()
+        invalidate_book_cache(book_id)
         return True
     except Exception as e:
         conn.close()
@@ -217,7 +1497,7 @@ def update_borrow_record_return_date(patron_id: str, book_id: int, return_date:
             UPDATE borrow_records 
             SET return_date = ? 
             WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
+        ''', (to_timestamp(return_date), patron_id, book_id))
         conn.commit()
         conn.close()
         return True
@@ -225,12 +1505,455 @@ def update_borrow_record_return_date(patron_id: str, book_id: int, return_date:
         conn.close()
         return False
 
+def get_late_fee_totals(as_of: datetime) -> Dict:
+    """
+    Compute late fees for every open loan with SQL aggregates.
+    
+    Days overdue and the R5 fee schedule (0.50/day for the first 7 days,
+    1.00/day after that, capped at 15.00 per loan) are evaluated inside
+    SQLite, so no per-loan rows are returned to Python. Both groupings come
+    from one statement over the same per-loan fees.
+    
+    Args:
+        as_of: Point in time to assess fees at
+        
+    Returns:
+        dict: by_patron and by_book totals ({key: {'fee_total', 'overdue_loans'}}),
+        plus the overall fee_total and overdue_loans
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        WITH fees AS (
+            SELECT patron_id, book_id,
+                   MIN(MIN(days_overdue, 7) * 0.5 + MAX(days_overdue - 7, 0) * 1.0, 15.0) AS fee
+            FROM (
+                SELECT patron_id, book_id,
+                       (:as_of - due_date) / 86400 AS days_overdue
+                FROM borrow_records 
+                WHERE return_date IS NULL AND due_date < :as_of
+            )
+            WHERE days_overdue > 0
+        )
+        SELECT 'patron' AS grouping, patron_id AS key, SUM(fee) AS fee_total, COUNT(*) AS overdue_loans
+        FROM fees GROUP BY patron_id
+        UNION ALL
+        SELECT 'book' AS grouping, book_id AS key, SUM(fee) AS fee_total, COUNT(*) AS overdue_loans
+        FROM fees GROUP BY book_id
+    ''', {'as_of': to_timestamp(as_of)}).fetchall()
+    conn.close()
+    
+    by_patron = [row for row in rows if row['grouping'] == 'patron']
+    by_book = [row for row in rows if row['grouping'] == 'book']
+    return {
+        'by_patron': {row['key']: {'fee_total': row['fee_total'], 'overdue_loans': row['overdue_loans']}
+                      for row in by_patron},
+        'by_book': {row['key']: {'fee_total': row['fee_total'], 'overdue_loans': row['overdue_loans']}
+                    for row in by_book},
+        'fee_total': sum(row['fee_total'] for row in by_patron),
+        'overdue_loans': sum(row['overdue_loans'] for row in by_patron)
+    }
+
+# Overdue loans
+#
+# refresh_overdue_loans() keeps overdue_loans holding the current late fee of
+# every open loan that is past due. Each run only reads borrow_records for
+# loans that fell due since the previous run's watermark (a range scan of
+# idx_borrow_records_open_due_date), then reassesses the loans already in
+# overdue_loans. Returns and deletes remove loans through triggers.
+
+def _overdue_fees_fresh_after() -> int:
+    """Oldest assessed_at at which precomputed late fees are still used."""
+    return to_timestamp(datetime.now() - timedelta(seconds=2 * OVERDUE_REFRESH_INTERVAL))
+
+def refresh_overdue_loans(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Assess loans that became overdue since the last run and update the others.
+    
+    Args:
+        as_of: Point in time to assess fees at (defaults to now)
+        
+    Returns:
+        dict: newly_overdue (loans added this run), overdue_loans (loans in
+        the table afterwards) and the new watermark
+    """
+    as_of = as_of or datetime.now()
+    params = {'as_of': to_timestamp(as_of)}
+    
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT watermark FROM overdue_scan_state WHERE id = 1').fetchone()
+        params['watermark'] = row['watermark'] if row else 0
+        
+        newly_overdue = conn.execute('''
+            INSERT OR REPLACE INTO overdue_loans 
+                (loan_id, patron_id, book_id, due_date, days_overdue, late_fee, assessed_at)
+            SELECT id, patron_id, book_id, due_date, days_overdue, 
+                   MIN(MIN(days_overdue, 7) * 0.5 + MAX(days_overdue - 7, 0) * 1.0, 15.0), :as_of
+            FROM (
+                SELECT id, patron_id, book_id, due_date, 
+                       MAX((:as_of - due_date) / 86400, 0) AS days_overdue
+                FROM borrow_records 
+                WHERE return_date IS NULL AND due_date > :watermark AND due_date <= :as_of
+            )
+        ''', params).rowcount
+        # Loans found by earlier runs: their fee grows until it reaches the cap
+        conn.execute('''
+            UPDATE overdue_loans SET 
+                days_overdue = MAX((:as_of - due_date) / 86400, 0),
+                assessed_at = :as_of
+            WHERE assessed_at < :as_of
+        ''', params)
+        conn.execute('''
+            UPDATE overdue_loans SET 
+                late_fee = MIN(MIN(days_overdue, 7) * 0.5 + MAX(days_overdue - 7, 0) * 1.0, 15.0)
+            WHERE assessed_at = :as_of
+        ''', params)
+        # A run with an older as_of than the last one never moves the watermark back
+        conn.execute('''
+            INSERT INTO overdue_scan_state (id, watermark) VALUES (1, :as_of)
+            ON CONFLICT (id) DO UPDATE SET watermark = MAX(watermark, excluded.watermark)
+        ''', params)
+        state = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM overdue_loans) AS overdue_loans, watermark 
+            FROM overdue_scan_state WHERE id = 1
+        ''').fetchone()
+        conn.commit()
+        return {
+            'newly_overdue': newly_overdue,
+            'overdue_loans': state['overdue_loans'],
+            'watermark': from_timestamp(state['watermark'])
+        }
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+# Transactional borrow/return operations
+
+def borrow_book_transaction(patron_id: str, book_id: int, borrow_date: datetime,
+                            due_date: datetime, borrow_limit: int) -> Tuple[str, Optional[Book]]:
+    """
+    Borrow a book in a single BEGIN IMMEDIATE transaction.
+    
+    The availability check, the borrow limit check, the conditional decrement
+    of available_copies and the borrow record insert all happen under one
+    write lock with one commit, so concurrent borrowers cannot oversell.
+    The patron is refused once they hold more than borrow_limit open loans,
+    read from their patrons counter row.
+    
+    Returns:
+        tuple: (status, book) where status is one of 'borrowed', 'not_found',
+        'unavailable', 'limit_reached' or 'error'
+    """
+    conn = get_db_connection()
+    book = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        book = _query(conn, 'SELECT * FROM books WHERE id = ?', (book_id,), Book.row_factory).fetchone()
+        if not book:
+            conn.rollback()
+            return 'not_found', None
+        
+        if book['available_copies'] <= 0:
+            conn.rollback()
+            return 'unavailable', book
+        
+        counters = conn.execute(
+            'SELECT active_loans FROM patrons WHERE patron_id = ?', (patron_id,)
+        ).fetchone()
+        if counters and counters['active_loans'] > borrow_limit:
+            conn.rollback()
+            return 'limit_reached', book
+        
+        cursor = conn.execute('''
+            UPDATE books SET available_copies = available_copies - 1
+            WHERE id = ? AND available_copies > 0
+        ''', (book_id,))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            return 'unavailable', book
+        
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', (patron_id, book_id, to_timestamp(borrow_date), to_timestamp(due_date)))
+        conn.commit()
+        invalidate_book_cache(book_id)
+        book['available_copies'] -= 1
+        return 'borrowed', book
+    except sqlite3.Error:
+        conn.rollback()
+        return 'error', book
+    finally:
+        conn.close()
+
+def return_book_transaction(patron_id: str, book_id: int,
+                            return_date: datetime) -> Tuple[str, Optional[Book], Optional[datetime]]:
+    """
+    Return a book in a single BEGIN IMMEDIATE transaction.
+    
+    Closes the patron's oldest open loan of the book and increments
+    available_copies with one commit.
+    
+    Returns:
+        tuple: (status, book, due_date) where status is one of 'returned',
+        'not_found', 'not_borrowed' or 'error', and due_date is the due date
+        of the loan that was closed
+    """
+    conn = get_db_connection()
+    book = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        book = _query(conn, 'SELECT * FROM books WHERE id = ?', (book_id,), Book.row_factory).fetchone()
+        if not book:
+            conn.rollback()
+            return 'not_found', None, None
+        
+        record = conn.execute('''
+            SELECT id, due_date FROM borrow_records 
+            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+            ORDER BY borrow_date
+            LIMIT 1
+        ''', (patron_id, book_id)).fetchone()
+        if not record:
+            conn.rollback()
+            return 'not_borrowed', book, None
+        
+        conn.execute('''
+            UPDATE borrow_records SET return_date = ? WHERE id = ?
+        ''', (to_timestamp(return_date), record['id']))
+        conn.execute('''
+            UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+        ''', (book_id,))
+        conn.commit()
+        invalidate_book_cache(book_id)
+        book['available_copies'] += 1
+        return 'returned', book, from_timestamp(record['due_date'])
+    except sqlite3.Error:
+        conn.rollback()
+        return 'error', book, None
+    finally:
+        conn.close()
+
+def borrow_books_transaction(patron_id: str, book_ids: List[int], borrow_date: datetime,
+                             due_date: datetime, borrow_limit: int) -> List[Tuple[str, Optional[Book]]]:
+    """
+    Borrow several books for one patron in a single BEGIN IMMEDIATE transaction.
+    
+    The books are read with one query and the patron's counter row once.
+    The borrow limit is checked against the whole batch: it passes only if
+    borrowing the available books one at a time would pass
+    borrow_book_transaction's check every time, and otherwise none of them
+    is borrowed. A book ID listed twice borrows two copies.
+    
+    Returns:
+        list: (status, book) per book ID, in order, with the statuses of
+        borrow_book_transaction
+    """
+    conn = get_db_connection()
+    results = []
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        unique_ids = list(dict.fromkeys(book_ids))
+        books = {
+            book.id: book for book in _query(
+                conn, f"SELECT * FROM books WHERE id IN ({','.join('?' * len(unique_ids))})",
+                unique_ids, Book.row_factory
+            )
+        }
+        borrowed = []
+        for book_id in book_ids:
+            book = books.get(book_id)
+            if not book:
+                results.append(('not_found', None))
+            elif book['available_copies'] <= 0:
+                results.append(('unavailable', book))
+            else:
+                book['available_copies'] -= 1
+                borrowed.append(book_id)
+                results.append(('borrowed', book))
+        if not borrowed:
+            conn.rollback()
+            return results
+    
+        counters = conn.execute(
+            'SELECT active_loans FROM patrons WHERE patron_id = ?', (patron_id,)
+        ).fetchone()
+        active_loans = counters['active_loans'] if counters else 0
+        if active_loans + len(borrowed) - 1 > borrow_limit:
+            conn.rollback()
+            for book_id in borrowed:
+                books[book_id]['available_copies'] += 1
+            return [('limit_reached' if status == 'borrowed' else status, book) for status, book in results]
+    
+        conn.executemany('''
+            UPDATE books SET available_copies = available_copies - 1 WHERE id = ?
+        ''', [(book_id,) for book_id in borrowed])
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', [(patron_id, book_id, to_timestamp(borrow_date), to_timestamp(due_date)) for book_id in borrowed])
+        conn.commit()
+        for book_id in set(borrowed):
+            invalidate_book_cache(book_id)
+        return results
+    except sqlite3.Error:
+        conn.rollback()
+        return [('error', None)] * len(book_ids)
+    finally:
+        conn.close()
+
+def return_books_transaction(patron_id: str, book_ids: List[int],
+                             return_date: datetime) -> List[Tuple[str, Optional[Book], Optional[datetime]]]:
+    """
+    Return several books for one patron in a single BEGIN IMMEDIATE transaction.
+    
+    Each book closes the patron's oldest open loan of it, as in
+    return_book_transaction; a book ID listed twice closes two loans. The
+    books and the patron's open loans of them are each read with one query.
+    
+    Returns:
+        list: (status, book, due_date) per book ID, in order, with the
+        statuses of return_book_transaction
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        unique_ids = list(dict.fromkeys(book_ids))
+        placeholders = ','.join('?' * len(unique_ids))
+        books = {
+            book.id: book for book in _query(
+                conn, f'SELECT * FROM books WHERE id IN ({placeholders})', unique_ids, Book.row_factory
+            )
+        }
+        open_loans = {}
+        for loan in conn.execute(f'''
+            SELECT id, book_id, due_date FROM borrow_records
+            WHERE patron_id = ? AND book_id IN ({placeholders}) AND return_date IS NULL
+            ORDER BY borrow_date
+        ''', [patron_id, *unique_ids]):
+            open_loans.setdefault(loan['book_id'], []).append(loan)
+    
+        results = []
+        returned = []
+        for book_id in book_ids:
+            book = books.get(book_id)
+            loans = open_loans.get(book_id)
+            if not book:
+                results.append(('not_found', None, None))
+            elif not loans:
+                results.append(('not_borrowed', book, None))
+            else:
+                loan = loans.pop(0)
+                book['available_copies'] += 1
+                returned.append((loan['id'], book_id))
+                results.append(('returned', book, from_timestamp(loan['due_date'])))
+        if not returned:
+            conn.rollback()
+            return results
+    
+        conn.executemany('''
+            UPDATE borrow_records SET return_date = ? WHERE id = ?
+        ''', [(to_timestamp(return_date), loan_id) for loan_id, _ in returned])
+        conn.executemany('''
+            UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+        ''', [(book_id,) for _, book_id in returned])
+        conn.commit()
+        for book_id in {book_id for _, book_id in returned}:
+            invalidate_book_cache(book_id)
+        return results
+    except sqlite3.Error:
+        conn.rollback()
+        return [('error', None, None)] * len(book_ids)
+    finally:
+        conn.close()
+
+# Loan archive
+#
+# Returned loans are only read for borrowing histories, fee recounts and
+# reports, while every borrow, return and limit check works on open loans.
+# archive_returned_loans() moves returned loans past the horizon into
+# borrow_records_archive so borrow_records and its indexes stay small.
+
+def archive_returned_loans(older_than_days: Optional[int] = None,
+                           batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move loans returned more than older_than_days ago into borrow_records_archive.
+    
+    Loans are moved in id order, batch_size at a time, each batch in its own
+    BEGIN IMMEDIATE transaction so borrows and returns are not held up for
+    the whole run. Patron counters are unaffected: archived loans are
+    already returned and their fees stay owed.
+    
+    Args:
+        older_than_days: Archive horizon in days (defaults to ARCHIVE_AFTER_DAYS)
+        batch_size: Loans moved per transaction
+        
+    Returns:
+        int: Number of loans archived
+    """
+    if older_than_days is None:
+        older_than_days = ARCHIVE_AFTER_DAYS
+    cutoff = to_timestamp(datetime.now() - timedelta(days=older_than_days))
+    
+    conn = get_db_connection()
+    archived = 0
+    last_id = 0
+    try:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            batch_end = conn.execute('''
+                SELECT MAX(id) FROM (
+                    SELECT id FROM borrow_records 
+                    WHERE id > ? AND return_date < ? 
+                    ORDER BY id LIMIT ?
+                )
+            ''', (last_id, cutoff, batch_size)).fetchone()[0]
+            if batch_end is None:
+                conn.rollback()
+                return archived
+            
+            params = (last_id, batch_end, cutoff)
+            conn.execute('''
+                INSERT INTO borrow_records_archive 
+                    (id, patron_id, book_id, borrow_date, due_date, return_date, fees_paid)
+                SELECT id, patron_id, book_id, borrow_date, due_date, return_date, fees_paid 
+                FROM borrow_records 
+                WHERE id > ? AND id <= ? AND return_date < ?
+            ''', params)
+            archived += conn.execute('''
+                DELETE FROM borrow_records WHERE id > ? AND id <= ? AND return_date < ?
+            ''', params).rowcount
+            conn.commit()
+            last_id = batch_end
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def get_archive_stats() -> Dict:
+    """Get the number of loans in borrow_records and in borrow_records_archive."""
+    conn = get_db_connection()
+    row = conn.execute('''
+        SELECT (SELECT COUNT(*) FROM borrow_records) AS borrow_records,
+               (SELECT COUNT(*) FROM borrow_records_archive) AS archived
+    ''').fetchone()
+    conn.close()
+    return dict(row)
+
 # reset any data I have added
 def reset_db():
     conn = get_db_connection()
     conn.execute("DELETE FROM borrow_records")
+    conn.execute("DELETE FROM borrow_records_archive")
+    conn.execute("DELETE FROM overdue_scan_state")
+    conn.execute("DELETE FROM patrons")
     conn.execute("DELETE FROM books")
     conn.commit()
     conn.close()
+    invalidate_book_cache()
     init_database()
     add_sample_data()
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for serving wsgi:app in production.
+
+Every setting can be overridden from the environment:
+
+    PORT                       listen port (default 5000)
+    WEB_CONCURRENCY            worker processes (default 2 * CPUs + 1)
+    GUNICORN_THREADS           threads per worker (default 4)
+    GUNICORN_TIMEOUT           seconds before a silent worker is restarted (default 30)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds workers get to finish requests on shutdown (default 30)
+"""
+
+import multiprocessing
+import os
+
+import database
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Load the app once in the master, then fork workers
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # The master opened connections while loading the app; don't let workers inherit them
+    database.close_connection_pools()
+
+
+def post_fork(server, worker):
+    database.reset_connection_pools_after_fork()
+
+
+def worker_exit(server, worker):
+    # Runs after the worker stops accepting requests and finishes in-flight ones
+    database.close_connection_pools()
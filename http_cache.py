@@ -0,0 +1,72 @@
+"""
+HTTP Cache Module - Conditional GETs and rendered-response caching
+Views decorated with catalog_cached produce output that depends only on
+their query arguments and the catalog. Their rendered responses are cached
+per process, keyed by (store, endpoint, query arguments, catalog
+version), so a repeated request costs one catalog_version lookup instead
+of a search and a template render. Every response carries a strong ETag
+(a digest of the body) and Last-Modified (the catalog's last change), and
+a matching If-None-Match or If-Modified-Since is answered with 304.
+
+The version is kept in the database by triggers, so all worker processes
+agree on it and writes made anywhere are seen by the next request.
+Enabled by create_app unless RESPONSE_CACHE is off (LIBRARY_RESPONSE_CACHE=0).
+"""
+
+import functools
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict
+
+from flask import current_app, request, session
+
+import database
+import storage
+
+# Rendered responses kept per process; entries for older catalog versions
+# are never hit again and age out through the LRU order or the TTL
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 300.0
+
+response_cache = database.BookCache(max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+def get_response_cache_stats() -> Dict:
+    """Get hit-rate and eviction counters for the rendered-response cache."""
+    return response_cache.stats()
+
+
+def catalog_cached(view):
+    """
+    Cache a GET view's successful responses per catalog version and make them conditional.
+
+    Requests with flashed messages waiting to be shown bypass the cache,
+    since those messages are rendered into the page. Error and streamed
+    responses are passed through uncached.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('RESPONSE_CACHE') or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        repository = storage.get_repository()
+        version, updated_at = repository.get_catalog_version()
+        key = (repository.location(), request.endpoint, tuple(sorted(request.args.items(multi=True))), version)
+        entry = response_cache.get(key)
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = (body, response.mimetype, hashlib.blake2b(body, digest_size=16).hexdigest())
+            response_cache.set(key, entry)
+
+        body, mimetype, etag = entry
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(updated_at, timezone.utc)
+        # Let clients keep the page but revalidate it on every use
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    return wrapper
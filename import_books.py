@@ -0,0 +1,33 @@
+# bulk-load books into the catalog from a CSV or JSON Lines file
+import argparse
+import os
+from database import init_database
+from services.import_service import import_books_from_stream, DEFAULT_BATCH_SIZE, IMPORT_FORMATS
+
+def main():
+    parser = argparse.ArgumentParser(description="Import books into the library catalog.")
+    parser.add_argument('path', help="CSV (title,author,isbn,total_copies header) or JSON Lines file")
+    parser.add_argument('--format', choices=IMPORT_FORMATS,
+                        help="file format (default: guessed from the file extension)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="books inserted per transaction")
+    args = parser.parse_args()
+    
+    file_format = args.format or ('jsonl' if os.path.splitext(args.path)[1].lower() in ('.jsonl', '.ndjson') else 'csv')
+    
+    init_database()
+    with open(args.path, newline='', encoding='utf-8') as stream:
+        report = import_books_from_stream(stream, file_format, batch_size=args.batch_size)
+    
+    if not report['success']:
+        raise SystemExit(report['message'])
+    
+    print(f"Read {report['rows']} rows: {report['inserted']} inserted, {report['rejected']} rejected "
+          f"in {report['elapsed_seconds']}s ({report['rows_per_second']} rows/sec)")
+    for rejection in report['rejections']:
+        print(f"  row {rejection['row']} (ISBN {rejection['isbn']}): {rejection['reason']}")
+    if report['rejected'] > len(report['rejections']):
+        print(f"  ... {report['rejected'] - len(report['rejections'])} more rejections not listed")
+
+if __name__ == "__main__":
+    main()
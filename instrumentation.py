@@ -0,0 +1,303 @@
+"""
+Instrumentation Module - Opt-in per-request profiling
+Records what each request costs: SQL statements and time, connection
+checkouts and opens, template render time and time spent in service
+functions. Enabled per app by create_app when INSTRUMENTATION is set (or
+the LIBRARY_INSTRUMENTATION environment variable is 1); requests served by
+other apps in the same process are not recorded.
+
+In debug mode the per-request numbers are added to every response as
+headers (including a standard Server-Timing header). Totals for the whole
+process are served in Prometheus text format at /metrics, together with
+connection pool, book cache and response cache statistics.
+"""
+
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from flask import Flask, Response, before_render_template, g, request, template_rendered
+
+import database
+import http_cache
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Costs recorded while handling one request."""
+
+    __slots__ = ('started', 'queries', 'sql_seconds', 'checkouts', 'connections_opened',
+                 'template_seconds', 'services', '_render_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.checkouts = 0
+        self.connections_opened = 0
+        self.template_seconds = 0.0
+        self.services = {}  # function name -> [calls, seconds]
+        self._render_started = []
+
+
+class Metrics:
+    """Process-wide totals, aggregated from finished requests and service calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}   # (endpoint, method, status) -> count
+            self.durations = {}  # endpoint -> [bucket counts..., sum, count]
+            self.costs = {}      # endpoint -> [queries, sql seconds, checkouts, opens, template seconds]
+            self.services = {}   # function name -> [calls, seconds]
+
+    def record_request(self, endpoint: str, method: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.durations.get(endpoint)
+            if histogram is None:
+                histogram = self.durations[endpoint] = [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+            costs = self.costs.setdefault(endpoint, [0, 0.0, 0, 0, 0.0])
+            costs[0] += stats.queries
+            costs[1] += stats.sql_seconds
+            costs[2] += stats.checkouts
+            costs[3] += stats.connections_opened
+            costs[4] += stats.template_seconds
+
+    def record_service(self, name: str, seconds: float):
+        with self._lock:
+            totals = self.services.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+
+metrics = Metrics()
+
+
+class _QueryObserver:
+    """Forwards database events to the current request's stats, if any."""
+
+    def connection_checked_out(self):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.checkouts += 1
+
+    def connection_opened(self):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.connections_opened += 1
+
+    def query_executed(self, sql: str, seconds: float):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += seconds
+
+    def rows_fetched(self, seconds: float):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.sql_seconds += seconds
+
+
+def timed(func: Callable) -> Callable:
+    """
+    Record calls to a service function made while an instrumented app handles a request.
+
+    Anywhere else the wrapper calls straight through.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _current_stats.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            metrics.record_service(name, seconds)
+            totals = stats.services.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    return wrapper
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Get the stats being recorded for the current request (None outside a request)."""
+    return _current_stats.get()
+
+
+def init_instrumentation(app: Flask):
+    """
+    Enable instrumentation and attach it to app.
+
+    Registers the request hooks, template render signals and the /metrics
+    endpoint. Response headers are only added when app.debug is set.
+    Only this app's requests are recorded, but the database query observer
+    is shared by the process; disable_instrumentation() removes it.
+    """
+    database.set_query_observer(_QueryObserver())
+
+    @app.before_request
+    def start_request_stats():
+        stats = RequestStats()
+        g._request_stats_token = _current_stats.set(stats)
+        g.request_stats = stats
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.get('request_stats')
+        if stats is None:
+            return response
+        seconds = time.perf_counter() - stats.started
+        metrics.record_request(request.endpoint or 'unmatched', request.method, response.status_code,
+                               seconds, stats)
+        if app.debug:
+            response.headers.update(_debug_headers(stats, seconds))
+        return response
+
+    @app.teardown_request
+    def clear_request_stats(exc):
+        token = g.pop('_request_stats_token', None)
+        if token is not None:
+            _current_stats.reset(token)
+
+    def render_started(sender, template, context, **extra):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats._render_started.append(time.perf_counter())
+
+    def render_finished(sender, template, context, **extra):
+        stats = _current_stats.get()
+        if stats is not None and stats._render_started:
+            stats.template_seconds += time.perf_counter() - stats._render_started.pop()
+
+    # weak=False: the receivers are local functions with no other reference
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(render_metrics(),
+                                                              mimetype='text/plain; version=0.0.4'))
+
+
+def disable_instrumentation():
+    """
+    Stop recording database events and clear the process totals.
+
+    Apps set up with init_instrumentation keep their hooks and /metrics,
+    but report no SQL costs afterwards.
+    """
+    database.set_query_observer(None)
+    metrics.reset()
+
+
+def _debug_headers(stats: RequestStats, seconds: float) -> Dict[str, str]:
+    timings = [f'app;dur={seconds * 1000:.2f}', f'sql;dur={stats.sql_seconds * 1000:.2f}',
+               f'template;dur={stats.template_seconds * 1000:.2f}']
+    timings += [f'{name};dur={total * 1000:.2f}' for name, (_, total) in stats.services.items()]
+    return {
+        'X-Request-Time-Ms': f'{seconds * 1000:.2f}',
+        'X-Query-Count': str(stats.queries),
+        'X-Query-Time-Ms': f'{stats.sql_seconds * 1000:.2f}',
+        'X-DB-Checkouts': str(stats.checkouts),
+        'X-DB-Connections-Opened': str(stats.connections_opened),
+        'X-Template-Time-Ms': f'{stats.template_seconds * 1000:.2f}',
+        'Server-Timing': ', '.join(timings)
+    }
+
+
+def _labels(**labels) -> str:
+    escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+               for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_metrics() -> str:
+    """Render process totals, pool and cache statistics in Prometheus text format."""
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{_labels(**labels) if labels else ""} {value}')
+
+    with metrics._lock:
+        requests = dict(metrics.requests)
+        durations = {endpoint: list(h) for endpoint, h in metrics.durations.items()}
+        costs = {endpoint: list(c) for endpoint, c in metrics.costs.items()}
+        services = {name: list(t) for name, t in metrics.services.items()}
+
+    family('library_http_requests_total', 'counter', 'HTTP requests handled.',
+           [('', {'endpoint': e, 'method': m, 'status': s}, n) for (e, m, s), n in sorted(requests.items())])
+
+    samples = []
+    for endpoint, histogram in sorted(durations.items()):
+        for bound, count in zip(DURATION_BUCKETS, histogram):
+            samples.append(('_bucket', {'endpoint': endpoint, 'le': bound}, count))
+        samples.append(('_bucket', {'endpoint': endpoint, 'le': '+Inf'}, histogram[-1]))
+        samples.append(('_sum', {'endpoint': endpoint}, histogram[-2]))
+        samples.append(('_count', {'endpoint': endpoint}, histogram[-1]))
+    family('library_http_request_duration_seconds', 'histogram', 'Request handling time.', samples)
+
+    for index, name, kind, help_text in (
+        (0, 'library_sql_queries_total', 'counter', 'SQL statements executed.'),
+        (1, 'library_sql_seconds_total', 'counter', 'Time spent executing SQL and fetching rows.'),
+        (2, 'library_db_checkouts_total', 'counter', 'Pooled connections checked out.'),
+        (3, 'library_db_connections_opened_total', 'counter', 'New SQLite connections opened.'),
+        (4, 'library_template_render_seconds_total', 'counter', 'Time spent rendering templates.'),
+    ):
+        family(name, kind, help_text, [('', {'endpoint': e}, c[index]) for e, c in sorted(costs.items())])
+
+    family('library_service_calls_total', 'counter', 'Service function calls.',
+           [('', {'function': n}, t[0]) for n, t in sorted(services.items())])
+    family('library_service_seconds_total', 'counter', 'Time spent in service functions.',
+           [('', {'function': n}, t[1]) for n, t in sorted(services.items())])
+
+    pools = database.get_pool_stats()
+    for key, kind, help_text in (('idle', 'gauge', 'Idle pooled connections.'),
+                                 ('hits', 'counter', 'Checkouts served by an idle connection.'),
+                                 ('misses', 'counter', 'Checkouts that opened a new connection.'),
+                                 ('discarded', 'counter', 'Connections closed because the pool was full.')):
+        family(f'library_db_pool_{key}' + ('' if kind == 'gauge' else '_total'), kind, help_text,
+               [('', {'database': p['database']}, p[key]) for p in pools])
+
+    cache = database.get_book_cache_stats()
+    for key, kind, help_text in (('size', 'gauge', 'Entries in the book cache.'),
+                                 ('hits', 'counter', 'Book cache hits.'),
+                                 ('misses', 'counter', 'Book cache misses.'),
+                                 ('evictions', 'counter', 'Entries evicted to stay within the size limit.'),
+                                 ('expirations', 'counter', 'Entries dropped after their TTL.'),
+                                 ('invalidations', 'counter', 'Entries invalidated by writes.')):
+        family(f'library_book_cache_{key}' + ('' if kind == 'gauge' else '_total'), kind, help_text,
+               [('', None, cache[key])])
+
+    responses = http_cache.get_response_cache_stats()
+    for key, kind, help_text in (('size', 'gauge', 'Entries in the rendered-response cache.'),
+                                 ('hits', 'counter', 'Responses served from the cache.'),
+                                 ('misses', 'counter', 'Responses rendered and cached.'),
+                                 ('evictions', 'counter', 'Entries evicted to stay within the size limit.')):
+        family(f'library_response_cache_{key}' + ('' if kind == 'gauge' else '_total'), kind, help_text,
+               [('', None, responses[key])])
+
+    return '\n'.join(lines) + '\n'
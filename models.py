@@ -0,0 +1,164 @@
+"""
+Row Models - Compact records for query results
+Book and BorrowRecord store one query row each in __slots__ instead of a
+per-row dict, and are built directly by SQLite row factories in
+database.py. They read like the dicts they replace: by key
+(record['title'], dict(record), record.get(...)) as well as by attribute,
+which is what templates use. Dates in borrow records are kept as the
+stored epoch seconds until first read.
+"""
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+# Loan dates are stored as whole seconds since 1970-01-01 of the naive local
+# wall-clock time (i.e. as if it were UTC), so SQLite's strftime('%s', ...)
+# of the former ISO text and these functions agree.
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_timestamp(value: datetime) -> int:
+    """Convert a naive datetime to stored epoch seconds (sub-second precision is dropped)."""
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+
+def from_timestamp(seconds: int) -> datetime:
+    """Convert stored epoch seconds back to a naive datetime."""
+    return _EPOCH + timedelta(0, seconds)
+
+
+class Record(Mapping):
+    """
+    Base class for the row models: a fixed set of fields readable by key or attribute.
+
+    Subclasses list their keys in fields. Fields can be assigned by key or
+    attribute; keys cannot be added or removed.
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def to_dict(self) -> dict:
+        """Return the fields as a plain dict (used for JSON responses)."""
+        return {name: getattr(self, name) for name in self.fields}
+
+    def copy(self):
+        """Return a shallow copy, as dict.copy() would."""
+        clone = object.__new__(type(self))
+        for name in type(self).__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+
+class Book(Record):
+    """A row of the books table, built from its columns in table order."""
+
+    __slots__ = ('id', 'title', 'author', 'isbn', 'total_copies', 'available_copies')
+    fields = __slots__
+
+    def __init__(self, id, title, author, isbn, total_copies, available_copies):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.total_copies = total_copies
+        self.available_copies = available_copies
+
+    @staticmethod
+    def row_factory(cursor, row):
+        """SQLite row factory for SELECT * FROM books (or b.* joined to other tables)."""
+        return Book(*row)
+
+
+def _parsed(value):
+    return from_timestamp(value) if isinstance(value, int) else value
+
+
+class BorrowRecord(Record):
+    """
+    A loan joined with its book's title and author.
+
+    borrow_date, due_date and return_date are converted from epoch seconds
+    into datetimes the first time they are read, so rows whose dates are
+    never used skip the conversion. late_fee and days_overdue hold the
+    overdue scheduler's current assessment of an open loan, or None;
+    fees_paid is what was paid towards the loan's late fee while it was open.
+    """
+
+    __slots__ = ('id', 'book_id', 'title', 'author', '_borrow_date', '_due_date', '_return_date',
+                 'late_fee', 'days_overdue', 'fees_paid')
+    fields = ('book_id', 'title', 'author', 'borrow_date', 'due_date', 'return_date',
+              'late_fee', 'days_overdue', 'fees_paid', 'is_overdue')
+
+    def __init__(self, id, book_id, title, author, borrow_date, due_date, return_date,
+                 late_fee=None, days_overdue=None, fees_paid=0.0):
+        self.id = id
+        self.book_id = book_id
+        self.title = title
+        self.author = author
+        self._borrow_date = borrow_date
+        self._due_date = due_date
+        self._return_date = return_date
+        self.late_fee = late_fee
+        self.days_overdue = days_overdue
+        self.fees_paid = fees_paid
+
+    @staticmethod
+    def row_factory(cursor, row):
+        """
+        SQLite row factory for (id, book_id, title, author, borrow_date,
+        due_date, return_date, late_fee, days_overdue, fees_paid) rows;
+        trailing columns may be left out.
+        """
+        return BorrowRecord(*row)
+
+    @property
+    def borrow_date(self) -> datetime:
+        value = self._borrow_date = _parsed(self._borrow_date)
+        return value
+
+    @borrow_date.setter
+    def borrow_date(self, value):
+        self._borrow_date = value
+
+    @property
+    def due_date(self) -> datetime:
+        value = self._due_date = _parsed(self._due_date)
+        return value
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date = value
+
+    @property
+    def return_date(self):
+        value = self._return_date = _parsed(self._return_date)
+        return value
+
+    @return_date.setter
+    def return_date(self, value):
+        self._return_date = value
+
+    @property
+    def is_overdue(self) -> bool:
+        """Whether the loan is open and past its due date right now."""
+        return self._return_date is None and datetime.now() > self.due_date
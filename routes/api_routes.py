@@ -2,8 +2,15 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+import codecs
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.library_service import (
+    calculate_late_fee_for_book, search_books_in_catalog, search_catalog_branches, iter_search_results, iter_catalog, get_catalog_page,
+    borrow_books_by_patron, return_books_by_patron
+)
+from services.import_service import import_books_from_stream, DEFAULT_BATCH_SIZE
+from services.export_service import EXPORT_FORMATS, iter_csv, iter_jsonl, iter_json_document
+from http_cache import catalog_cached
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -16,17 +23,160 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/borrow/batch', methods=['POST'])
+def borrow_books_batch_api():
+    """
+    Borrow several books in one request: {"patron_id": "123456", "book_ids": [1, 2, 3]}.
+    Batch interface for R3: Book Borrowing
+    
+    Responds 200 with a result per book whenever the request is valid, even
+    if some books could not be borrowed.
+    """
+    return _batch_response(borrow_books_by_patron)
+
+@api_bp.route('/return/batch', methods=['POST'])
+def return_books_batch_api():
+    """
+    Return several books in one request: {"patron_id": "123456", "book_ids": [1, 2, 3]}.
+    Batch interface for R4: Book Return Processing
+    """
+    return _batch_response(return_books_by_patron)
+
+def _batch_response(process):
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object.'}), 400
+    
+    report = process(str(payload.get('patron_id') or '').strip(), payload.get('book_ids'))
+    if not report['success']:
+        return jsonify({'error': report['message']}), 400
+    
+    return jsonify(report), 200
+
+@api_bp.route('/books')
+def list_books_api():
+    """
+    List catalog books one page at a time via API endpoint.
+    Alternative API interface for R2: Book Catalog Display
+    """
+    page = get_catalog_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        page_size=request.args.get('per_page', type=int)
+    )
+    if not page['success']:
+        return jsonify({'error': page['message']}), 400
+    
+    return jsonify({
+        'books': page['books'],
+        'count': len(page['books']),
+        'page_size': page['page_size'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor']
+    })
+
+@api_bp.route('/books/bulk', methods=['POST'])
+def bulk_import_books_api():
+    """
+    Bulk-import books from a CSV or JSON Lines upload.
+    Batch interface for R1: Book Catalog Management
+    
+    Send the file either as the raw request body or as a multipart 'file'
+    field. The format comes from ?format=csv|jsonl, defaulting to jsonl for
+    NDJSON/JSON Lines content types and csv otherwise.
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'error': "A 'file' field is required."}), 400
+        stream, content_type = upload.stream, upload.mimetype or ''
+    else:
+        # Read the body incrementally instead of buffering it in memory
+        stream, content_type = request.stream, request.mimetype or ''
+    default_format = 'jsonl' if 'ndjson' in content_type or 'jsonl' in content_type else 'csv'
+    file_format = request.args.get('format', default_format)
+    batch_size = request.args.get('batch_size', DEFAULT_BATCH_SIZE, type=int)
+    
+    # codecs works on any file-like object; TextIOWrapper needs readable(),
+    # which Werkzeug's spooled upload files lack before Python 3.11
+    text_stream = codecs.getreader('utf-8')(stream)
+    report = import_books_from_stream(text_stream, file_format, batch_size=batch_size)
+    if not report['success']:
+        return jsonify({'error': report['message']}), 400
+    
+    return jsonify(report), 200
+
+@api_bp.route('/books/export')
+def export_books_api():
+    """
+    Stream the whole catalog as JSON Lines or CSV (?format=jsonl|csv, default jsonl).
+    The output can be re-imported through /api/books/bulk.
+    """
+    file_format = request.args.get('format', 'jsonl')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{file_format}'; use csv or jsonl."}), 400
+    
+    if file_format == 'csv':
+        body, mimetype = iter_csv(iter_catalog()), 'text/csv'
+    else:
+        body, mimetype = iter_jsonl(iter_catalog()), 'application/x-ndjson'
+    # The request context (and with it the X-Library-Branch shard) stays open until the body is sent
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=catalog.{file_format}'})
+
+@api_bp.route('/branches/search')
+def search_branches_api():
+    """
+    Search every branch library's catalog at once.
+    
+    ?branch=east&branch=west limits the search to those branches. Results
+    are merged by relevance and each names the branch that holds the book.
+    """
+    search_term = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'title')
+    branches = request.args.getlist('branch') or None
+    
+    if not search_term:
+        return jsonify({'error': 'Search term is required'}), 400
+    try:
+        books = search_catalog_branches(search_term, search_type, branches)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'search_term': search_term,
+        'search_type': search_type,
+        'results': books,
+        'count': len(books)
+    })
+
 @api_bp.route('/search')
+@catalog_cached
 def search_books_api():
     """
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
+    
+    With ?stream=json the usual response body is streamed as results are
+    read, with count written last; ?stream=jsonl streams one book per line
+    instead.
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    stream = request.args.get('stream')
     
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
+    if stream is not None and stream not in ('json', 'jsonl'):
+        return jsonify({'error': f"Unsupported stream format '{stream}'; use json or jsonl."}), 400
+    
+    if stream == 'jsonl':
+        return Response(stream_with_context(iter_jsonl(iter_search_results(search_term, search_type))),
+                        mimetype='application/x-ndjson')
+    if stream == 'json':
+        header = {'search_term': search_term, 'search_type': search_type}
+        body = iter_json_document(header, iter_search_results(search_term, search_type))
+        return Response(stream_with_context(body), mimetype='application/json')
     
     # Use business logic function
     books = search_books_in_catalog(search_term, search_type)
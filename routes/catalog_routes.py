@@ -3,8 +3,8 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from services.library_service import add_book_to_catalog
+from services.library_service import add_book_to_catalog, get_catalog_page
+from http_cache import catalog_cached
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -14,13 +14,21 @@ def index():
     return redirect(url_for('catalog.catalog'))
 
 @catalog_bp.route('/catalog')
+@catalog_cached
 def catalog():
     """
-    Display all books in the catalog.
+    Display the books in the catalog, one page at a time.
     Implements R2: Book Catalog Display
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    page = get_catalog_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        page_size=request.args.get('per_page', type=int)
+    )
+    if not page['success']:
+        flash(page['message'], 'error')
+        page = get_catalog_page()
+    return render_template('catalog.html', books=page['books'], page=page)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
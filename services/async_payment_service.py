@@ -0,0 +1,273 @@
+"""
+Async Payment Service Module - Concurrent Payment Gateway Client
+asyncio-based counterpart of PaymentGateway for settling many payments at
+once without tying up a worker thread per request.
+
+Keeps a pool of keep-alive HTTP/1.1 connections to the gateway, limits the
+number of requests in flight, and retries transient failures (connection
+errors, timeouts, 5xx responses) with exponential backoff. Every logical
+request carries an Idempotency-Key that stays the same across retries, so a
+retried charge is never applied twice.
+
+In tests, point it at services.fake_payment_server.FakePaymentServer.
+SimulatedAsyncPaymentGateway offers the same interface over the simulated
+PaymentGateway, for use until a real gateway URL is configured.
+"""
+
+import asyncio
+import functools
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, quote
+
+
+class PaymentGatewayError(Exception):
+    """Raised when the gateway cannot be reached after all retries."""
+
+
+class AsyncPaymentGateway:
+    """
+    Async client for the external payment gateway API.
+
+    Use it inside a single event loop and close() it when done, e.g.:
+
+        async with AsyncPaymentGateway(base_url=server.url) as gateway:
+            success, txn_id, msg = await gateway.process_payment("123456", 10.50, "Late fees")
+    """
+
+    def __init__(self, api_key: str = "test_key_12345",
+                 base_url: str = "https://api.payment-gateway.example.com",
+                 timeout: float = 5.0, max_retries: int = 3, backoff: float = 0.1,
+                 max_connections: int = 20):
+        """
+        Initialize the client.
+
+        Args:
+            api_key: API key for authentication (default is test key)
+            base_url: Gateway URL (http or https)
+            timeout: Seconds allowed for each attempt of a request
+            max_retries: Retries after the first attempt for transient failures
+            backoff: Delay before the first retry; doubles on each further retry
+            max_connections: Maximum requests in flight (and pooled connections)
+        """
+        parsed = urlsplit(base_url)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self._host = parsed.hostname
+        self._ssl = parsed.scheme == 'https'
+        self._port = parsed.port or (443 if self._ssl else 80)
+        self._idle = []
+        self._slots = None
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self.retries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close pooled connections. The client can be reused afterwards, e.g. in another event loop."""
+        await self.release_connections()
+
+    async def release_connections(self):
+        """
+        Close idle connections and forget the in-flight limit.
+
+        Connections belong to the event loop that opened them, so call this
+        before that loop ends if the client will be used again elsewhere.
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        self._slots = None
+
+    async def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
+        """
+        Charge a patron through the gateway.
+
+        Returns:
+            tuple: (success: bool, transaction_id: str, message: str)
+        """
+        status, data = await self._request('POST', '/charges', {
+            "customer_id": patron_id,
+            "amount": amount,
+            "currency": "usd",
+            "description": description
+        })
+        if status == 200:
+            return True, data.get("id", ""), data.get("message", "")
+        return False, "", data.get("error", f"Payment gateway returned HTTP {status}")
+
+    async def refund_payment(self, transaction_id: str, amount: float) -> Tuple[bool, str]:
+        """
+        Refund a previous payment.
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        status, data = await self._request('POST', '/refunds', {
+            "transaction_id": transaction_id,
+            "amount": amount
+        })
+        if status == 200:
+            return True, data.get("message", "")
+        return False, data.get("error", f"Payment gateway returned HTTP {status}")
+
+    async def verify_payment_status(self, transaction_id: str) -> Dict:
+        """
+        Check the status of a payment transaction.
+
+        Returns:
+            dict: Payment status information
+        """
+        status, data = await self._request('GET', f'/charges/{quote(transaction_id, safe="")}')
+        if status == 404:
+            return {"status": "not_found", "message": "Transaction not found"}
+        return data
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Tuple[int, Dict]:
+        """Send a request, retrying transient failures with exponential backoff."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        idempotency_key = uuid.uuid4().hex
+        error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                async with self._slots:
+                    status, data = await asyncio.wait_for(
+                        self._request_once(method, path, payload, idempotency_key), self.timeout
+                    )
+            except asyncio.TimeoutError:
+                error = f"timed out after {self.timeout}s"
+                continue
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                error = str(e) or type(e).__name__
+                continue
+            if status < 500:
+                return status, data
+            error = f"HTTP {status}"
+
+        raise PaymentGatewayError(f"Payment gateway unavailable after {self.max_retries + 1} attempts: {error}")
+
+    async def _request_once(self, method: str, path: str, payload: Optional[Dict],
+                            idempotency_key: str) -> Tuple[int, Dict]:
+        """Send one HTTP/1.1 request over a pooled keep-alive connection."""
+        reader, writer = await self._connect()
+        reusable = False
+        try:
+            body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            head = (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self._host}\r\n"
+                f"Authorization: Bearer {self.api_key}\r\n"
+                f"Idempotency-Key: {idempotency_key}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: keep-alive\r\n\r\n"
+            )
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+            self.requests_sent += 1
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("connection closed by payment gateway")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            data = await reader.readexactly(length) if length else b''
+
+            reusable = headers.get('connection', '').lower() != 'close'
+            return status, json.loads(data) if data else {}
+        finally:
+            if reusable and len(self._idle) < self.max_connections:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+
+    async def _connect(self):
+        """Reuse an idle keep-alive connection, or open a new one."""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        self.connections_opened += 1
+        return await asyncio.open_connection(self._host, self._port, ssl=True if self._ssl else None)
+
+
+class SimulatedAsyncPaymentGateway:
+    """
+    Async interface over the simulated PaymentGateway.
+
+    Makes no network calls: each call runs PaymentGateway's simulated
+    request on a worker thread, so up to max_connections calls wait on its
+    simulated latency at once. pay_late_fees_batch uses it when no gateway
+    is passed in.
+    """
+
+    def __init__(self, gateway=None, max_connections: int = 20):
+        """
+        Args:
+            gateway: Synchronous gateway to wrap (defaults to a new PaymentGateway)
+            max_connections: Maximum calls in flight
+        """
+        if gateway is None:
+            from services.payment_service import PaymentGateway
+            gateway = PaymentGateway()
+        self._gateway = gateway
+        self.max_connections = max_connections
+        self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Stop the worker threads. The client can be reused afterwards."""
+        await self.release_connections()
+
+    async def release_connections(self):
+        """Stop the worker threads (there are no network connections to release)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _call(self, method, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_connections)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args))
+
+    async def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
+        """Charge a patron through the simulated gateway."""
+        return await self._call(self._gateway.process_payment, patron_id, amount, description)
+
+    async def refund_payment(self, transaction_id: str, amount: float) -> Tuple[bool, str]:
+        """Refund a previous payment through the simulated gateway."""
+        return await self._call(self._gateway.refund_payment, transaction_id, amount)
+
+    async def verify_payment_status(self, transaction_id: str) -> Dict:
+        """Check a payment's status through the simulated gateway."""
+        return await self._call(self._gateway.verify_payment_status, transaction_id)
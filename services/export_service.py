@@ -0,0 +1,68 @@
+"""
+Export Service Module - Streaming catalog output
+Encodes books as CSV, JSON Lines or a JSON document a chunk at a time, so
+responses built from these generators hold one chunk of output in memory
+however many books they contain. CSV and JSON Lines output can be fed back
+to the bulk importer.
+"""
+
+import csv
+import io
+import json
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator
+from models import Book
+
+# Books encoded per yielded chunk of output
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_COLUMNS = Book.fields
+
+def _chunks(books: Iterable[Book], chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for book in books:
+        chunk.append(book)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# One shared encoder: json.dumps builds a new one per call when given options
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+def iter_jsonl(books: Iterable[Book], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Encode books as JSON Lines, one object per line."""
+    for chunk in _chunks(books, chunk_size):
+        yield ''.join([_encode(book.to_dict()) + '\n' for book in chunk])
+
+def iter_csv(books: Iterable[Book], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Encode books as CSV with a header row of EXPORT_COLUMNS."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    row = attrgetter(*EXPORT_COLUMNS)
+    for chunk in _chunks(books, chunk_size):
+        writer.writerows(map(row, chunk))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_json_document(header: Dict, books: Iterable[Book], key: str = 'results',
+                       chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Encode {**header, key: [books...], 'count': N} as one JSON object.
+
+    The count is only known once the books run out, so it is written last.
+    """
+    opening = _encode(header)[:-1]
+    yield f'{opening},"{key}":[' if header else f'{{"{key}":['
+    count = 0
+    for chunk in _chunks(books, chunk_size):
+        # Encoding the chunk as one list is about twice as fast as book by book
+        yield (',' if count else '') + _encode([book.to_dict() for book in chunk])[1:-1]
+        count += len(chunk)
+    yield f'],"count":{count}}}'
@@ -0,0 +1,177 @@
+"""
+Fake Payment Server - Local stand-in for the external payment gateway
+A small asyncio HTTP/1.1 server that answers the same requests as the real
+gateway, using the same simulated rules as PaymentGateway. Used by the tests
+and benchmarks for AsyncPaymentGateway.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+
+class FakePaymentServer:
+    """
+    Fake gateway with configurable latency and failure injection.
+
+    Example:
+        async with FakePaymentServer(latency=0.3) as server:
+            gateway = AsyncPaymentGateway(base_url=server.url)
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            latency: Seconds to wait before answering each request
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.charges = {}
+        self.connections = 0
+        self.requests = 0
+        self._responses_by_key = {}
+        self._failures = []
+        self._ids = itertools.count(1)
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @contextmanager
+    def running_in_thread(self):
+        """
+        Serve from a background thread with its own event loop.
+
+        For synchronous callers that start their own event loop, such as
+        pay_late_fees_batch.
+        """
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            asyncio.run_coroutine_threadsafe(self.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def fail_next(self, count: int = 1, status: int = 503, delay: float = 0.0):
+        """Make the next count requests fail with status (after an extra delay) before being processed."""
+        self._failures.extend([(status, delay)] * count)
+
+    async def _handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                self.requests += 1
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self._failures:
+                    status, delay = self._failures.pop(0)
+                    if delay:
+                        await asyncio.sleep(delay)
+                    payload = {"error": "Service unavailable"}
+                else:
+                    status, payload = self._respond(method, path, headers, body)
+
+                data = json.dumps(payload).encode('utf-8')
+                writer.write((
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n"
+                ).encode('latin-1') + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, path: str, headers: Dict, body: bytes) -> Tuple[int, Dict]:
+        key = headers.get('idempotency-key')
+        if method == 'POST' and key in self._responses_by_key:
+            return self._responses_by_key[key]
+
+        if method == 'POST' and path == '/charges':
+            response = self._charge(json.loads(body or b'{}'))
+        elif method == 'POST' and path == '/refunds':
+            response = self._refund(json.loads(body or b'{}'))
+        elif method == 'GET' and path.startswith('/charges/'):
+            charge = self.charges.get(path[len('/charges/'):])
+            response = (200, charge) if charge else (404, {"error": "Transaction not found"})
+        else:
+            response = (404, {"error": "Not found"})
+
+        if method == 'POST' and key:
+            self._responses_by_key[key] = response
+        return response
+
+    def _charge(self, request: Dict) -> Tuple[int, Dict]:
+        amount = request.get("amount", 0)
+        patron_id = str(request.get("customer_id", ""))
+        if amount <= 0:
+            return 400, {"error": "Invalid amount: must be greater than 0"}
+        if amount > 1000:
+            return 402, {"error": "Payment declined: amount exceeds limit"}
+        if len(patron_id) != 6:
+            return 400, {"error": "Invalid patron ID format"}
+
+        transaction_id = f"txn_{patron_id}_{int(time.time())}_{next(self._ids)}"
+        self.charges[transaction_id] = {
+            "transaction_id": transaction_id,
+            "status": "completed",
+            "amount": amount,
+            "timestamp": time.time()
+        }
+        return 200, {"id": transaction_id, "message": f"Payment of ${amount:.2f} processed successfully"}
+
+    def _refund(self, request: Dict) -> Tuple[int, Dict]:
+        transaction_id = request.get("transaction_id", "")
+        amount = request.get("amount", 0)
+        if not transaction_id or not transaction_id.startswith("txn_"):
+            return 400, {"error": "Invalid transaction ID"}
+        if amount <= 0:
+            return 400, {"error": "Invalid refund amount"}
+        refund_id = f"refund_{transaction_id}_{int(time.time())}"
+        return 200, {"message": f"Refund of ${amount:.2f} processed successfully. Refund ID: {refund_id}"}
@@ -0,0 +1,177 @@
+"""
+Import Service Module - Bulk catalog loading
+Streams books from CSV or JSON Lines sources into the catalog in batches,
+applying the same validation rules as add_book_to_catalog.
+"""
+
+import csv
+import json
+import time
+from typing import Dict, IO, Iterable, Iterator, Tuple
+from storage import insert_books_batch
+from instrumentation import timed
+from services.library_service import validate_book_fields
+
+# Import tuning
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_REJECTIONS = 1000  # rejections beyond this are counted but not listed
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+def iter_csv_books(stream: IO[str]) -> Iterator[Tuple[int, Dict]]:
+    """
+    Read books from a CSV stream with a header row.
+
+    Expected columns: title, author, isbn, total_copies.
+
+    Yields:
+        tuple: (row number, raw record dict); the header is row 1
+    """
+    for row_number, record in enumerate(csv.DictReader(stream), start=2):
+        yield row_number, record
+
+def iter_jsonl_books(stream: IO[str]) -> Iterator[Tuple[int, Dict]]:
+    """
+    Read books from a JSON Lines stream, one object per line. Blank lines are skipped.
+
+    Yields:
+        tuple: (line number, raw record dict, or None if the line is not a JSON object)
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+def _parse_record(record) -> Tuple[Tuple[str, str, str, int], str]:
+    """
+    Normalise and validate one raw record.
+
+    Returns:
+        tuple: ((title, author, isbn, total_copies), None) if valid, else (None, error message)
+    """
+    if record is None:
+        return None, "Row is not a valid JSON object."
+
+    title = str(record.get('title') or '')
+    author = str(record.get('author') or '')
+    isbn = str(record.get('isbn') or '').strip()
+
+    total_copies = record.get('total_copies')
+    if isinstance(total_copies, str):
+        try:
+            total_copies = int(total_copies.strip())
+        except ValueError:
+            return None, "Total copies must be a positive integer."
+    if isinstance(total_copies, bool):
+        return None, "Total copies must be a positive integer."
+
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return None, error
+    return (title.strip(), author.strip(), isbn, total_copies), None
+
+@timed
+def import_books(records: Iterable[Tuple[int, Dict]], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    """
+    Import a stream of raw book records into the catalog.
+
+    Records are validated one at a time, duplicate ISBNs within the import
+    are dropped in memory, and valid books are inserted in batches of
+    batch_size, each batch in a single transaction that also skips ISBNs
+    already in the catalog. Memory use is bounded by the batch size plus
+    the set of ISBNs seen.
+
+    Args:
+        records: (row number, raw record) pairs, e.g. from iter_csv_books
+        batch_size: Books per insert transaction
+
+    Returns:
+        dict: rows read, books inserted, rejection count and details
+        (row, isbn, reason), elapsed seconds and rows per second. If the
+        source cannot be read (not UTF-8, malformed CSV), success is False,
+        message says why, and the books in the unfinished batch are not inserted
+    """
+    started = time.perf_counter()
+    seen_isbns = set()
+    batch = []
+    batch_rows = {}
+    report = {
+        'success': True,
+        'rows': 0,
+        'inserted': 0,
+        'rejected': 0,
+        'rejections': []
+    }
+
+    def reject(row_number, isbn, reason):
+        report['rejected'] += 1
+        if len(report['rejections']) < MAX_REPORTED_REJECTIONS:
+            report['rejections'].append({'row': row_number, 'isbn': isbn, 'reason': reason})
+
+    def flush():
+        try:
+            inserted, duplicates = insert_books_batch(batch)
+        except Exception:
+            for book in batch:
+                reject(batch_rows[book[2]], book[2], "Database error occurred while adding the book.")
+        else:
+            report['inserted'] += inserted
+            for isbn in duplicates:
+                reject(batch_rows[isbn], isbn, "A book with this ISBN already exists.")
+        batch.clear()
+        batch_rows.clear()
+
+    try:
+        for row_number, record in records:
+            report['rows'] += 1
+            book, error = _parse_record(record)
+            if error:
+                reject(row_number, (record or {}).get('isbn'), error)
+                continue
+
+            isbn = book[2]
+            if isbn in seen_isbns:
+                reject(row_number, isbn, "Duplicate ISBN in import.")
+                continue
+            seen_isbns.add(isbn)
+
+            batch.append(book)
+            batch_rows[isbn] = row_number
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        reason = "the file is not valid UTF-8 text" if isinstance(e, UnicodeDecodeError) else f"malformed CSV ({e})"
+        report['success'] = False
+        report['message'] = (f"Could not read the import after {report['rows']} rows: {reason}. "
+                             f"{report['inserted']} books were imported before the error.")
+        return report
+
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows'] / elapsed, 1) if elapsed > 0 else None
+    return report
+
+def import_books_from_stream(stream: IO[str], file_format: str,
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> Dict:
+    """
+    Import books from a text stream in CSV or JSON Lines format.
+
+    Returns:
+        dict: The import report from import_books, or success False with a message
+        if the format is not supported
+    """
+    if file_format not in IMPORT_FORMATS:
+        return {
+            'success': False,
+            'message': f"Unsupported import format. Use one of: {', '.join(IMPORT_FORMATS)}."
+        }
+
+    records = iter_csv_books(stream) if file_format == 'csv' else iter_jsonl_books(stream)
+    return import_books(records, batch_size=max(1, batch_size))
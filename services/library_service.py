@@ -3,15 +3,33 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
+import asyncio
+import base64
+import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from database import (
-    get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_patron_borrowed_books, get_patron_borrowing_history
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from storage import (
+    get_book_by_id, get_book_by_isbn, insert_book, get_open_loan, get_patron_borrowing_history,
+    search_books, iter_search_books, search_branches, iter_all_books, get_books_page, get_late_fee_totals,
+    borrow_book_transaction, return_book_transaction, borrow_books_transaction, return_books_transaction,
+    get_patron_counters, record_late_fee_payment
 )
-from services.payment_service import PaymentGateway
+from instrumentation import timed
 
+# The payment gateways (and the requests library) are imported when a
+# payment is first made, so processes that never take payments skip them.
+if TYPE_CHECKING:
+    from services.payment_service import PaymentGateway
+    from services.async_payment_service import AsyncPaymentGateway
+
+# Catalog page size limits
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Books per batch borrow or return request
+MAX_BATCH_BOOKS = 50
+
+@timed
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
     Add a new book to the catalog. 
@@ -27,40 +45,108 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
         tuple: (success: bool, message: str)
     """
     # Input validation
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return False, error
+    
+    # Check for duplicate ISBN
+    existing = get_book_by_isbn(isbn)
+    if existing:
+        return False, "A book with this ISBN already exists."
+    
+    # Insert new book
+    success = insert_book(title.strip(), author.strip(), isbn, total_copies, total_copies)
+    if success:
+        return True, f'Book "{title.strip()}" has been successfully added to the catalog.'
+    else:
+        return False, "Database error occurred while adding the book."
+
+def validate_book_fields(title: str, author: str, isbn: str, total_copies: int) -> Optional[str]:
+    """
+    Validate the fields of a new book against the R1 rules.
+    
+    Returns:
+        str: The first validation error message, or None if the fields are valid
+    """
     if not title or not title.strip():
-        return False, "Title is required."
+        return "Title is required."
     
     if len(title.strip()) > 200:
-        return False, "Title must be less than 200 characters."
+        return "Title must be less than 200 characters."
     
     if not author or not author.strip():
-        return False, "Author is required."
+        return "Author is required."
     
     if len(author.strip()) > 100:
-        return False, "Author must be less than 100 characters."
+        return "Author must be less than 100 characters."
     
     if len(isbn) != 13:
-        return False, "ISBN must be exactly 13 digits."
+        return "ISBN must be exactly 13 digits."
     
     # check if ISBN is an integer
     if not isbn.isdigit():
-        return False, "ISBN must be an integer."
+        return "ISBN must be an integer."
     
     if not isinstance(total_copies, int) or total_copies <= 0:
-        return False, "Total copies must be a positive integer."
+        return "Total copies must be a positive integer."
     
-    # Check for duplicate ISBN
-    existing = get_book_by_isbn(isbn)
-    if existing:
-        return False, "A book with this ISBN already exists."
+    return None
+
+@timed
+def get_catalog_page(after: Optional[str] = None, before: Optional[str] = None,
+                     page_size: Optional[int] = None) -> Dict:
+    """
+    Get one page of the catalog ordered by title.
+    Implements R2 with keyset pagination.
     
-    # Insert new book
-    success = insert_book(title.strip(), author.strip(), isbn, total_copies, total_copies)
-    if success:
-        return True, f'Book "{title.strip()}" has been successfully added to the catalog.'
-    else:
-        return False, "Database error occurred while adding the book."
+    Args:
+        after: Cursor for the page following a previous page (its next_cursor)
+        before: Cursor for the page preceding a previous page (its prev_cursor)
+        page_size: Books per page (clamped to 1..MAX_PAGE_SIZE)
+        
+    Returns:
+        dict: success flag, books, page_size and next/prev cursors (None at the ends)
+    """
+    if page_size is None:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    
+    try:
+        after_key = _decode_cursor(after) if after else None
+        before_key = _decode_cursor(before) if before else None
+    except ValueError:
+        return {
+            'success': False,
+            'message': "Invalid page cursor."
+        }
+    
+    page = get_books_page(page_size, after=after_key, before=before_key)
+    books = page['books']
+    return {
+        'success': True,
+        'books': books,
+        'page_size': page_size,
+        'next_cursor': _encode_cursor(books[-1]) if page['has_next'] else None,
+        'prev_cursor': _encode_cursor(books[0]) if page['has_prev'] else None
+    }
+
+def _encode_cursor(book: Dict) -> str:
+    """Encode a book's (title, id) sort key as an opaque URL-safe cursor."""
+    raw = json.dumps([book['title'], book['id']], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor produced by _encode_cursor, raising ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        title, book_id = json.loads(raw.decode('utf-8'))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Invalid page cursor.")
+    if not isinstance(title, str) or not isinstance(book_id, int):
+        raise ValueError("Invalid page cursor.")
+    return title, book_id
 
+@timed
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -77,35 +163,31 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
-    # Check if book exists and is available
-    book = get_book_by_id(book_id)
-    if not book:
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=14)
+    
+    # Check availability and borrowing limit, insert the borrow record and
+    # update availability in one transaction
+    status, book = borrow_book_transaction(patron_id, book_id, borrow_date, due_date, borrow_limit=5)
+    return _borrow_outcome(status, book, due_date)
+
+def _borrow_outcome(status: str, book: Optional[Dict], due_date: datetime) -> Tuple[bool, str]:
+    """Turn a borrow transaction status into the (success, message) shown to the patron."""
+    if status == 'not_found':
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    if status == 'unavailable':
         return False, "This book is currently not available."
     
-    # Check patron's current borrowed books count
-    borrowed_books_count = get_patron_borrow_count(patron_id)
-    
-    if borrowed_books_count > 5:
+    if status == 'limit_reached':
         return False, "You have reached the maximum borrowing limit of 5 books."
     
-    # Create borrow record
-    borrow_date = datetime.now()
-    due_date = borrow_date + timedelta(days=14)
-    
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    if status != 'borrowed':
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
+@timed
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron.
@@ -115,36 +197,149 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
-    book = get_book_by_id(book_id)
-    if not book:
+    # Close the loan and update availability in one transaction
+    return_date = datetime.now()
+    status, book, due_date = return_book_transaction(patron_id, book_id, return_date)
+    return _return_outcome(status, book, due_date, return_date)
+
+def _return_outcome(status: str, book: Optional[Dict], due_date: Optional[datetime],
+                    return_date: datetime) -> Tuple[bool, str]:
+    """Turn a return transaction status into the (success, message) shown to the patron."""
+    if status == 'not_found':
         return False, "Book not found."
     
-    borrowed_books = get_patron_borrowed_books(patron_id)
-    book_borrowed = False
-    for borrowed in borrowed_books:
-        if borrowed["book_id"] == book_id:
-            book_borrowed = True
-            break
-    if not book_borrowed:
+    if status == 'not_borrowed':
         return False, "Book has not been borrowed by this patron."
     
-    return_success = update_borrow_record_return_date(patron_id, book_id, datetime.now())
-    if not return_success:
+    if status != 'returned':
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, +1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
-    late_fees = calculate_late_fee_for_book(patron_id, book_id)
-    fee_amount = late_fees.get("fee_amount", 0.00)
-    days_overdue = late_fees.get("days_overdue", 0)
+    fee_amount, days_overdue = _late_fee_for_due_date(due_date, return_date)
     
     message = f'Successfully returned "{book["title"]}". '
     if days_overdue > 0:
         message += f'Book is overdue by {days_overdue} days, late fee is ${fee_amount:.2f}.'
     return True, message
 
+def _validate_batch(patron_id: str, book_ids) -> Optional[str]:
+    """
+    Validate a batch borrow or return request.
+    
+    Returns:
+        str: The first validation error message, or None if the request is valid
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return "Invalid patron ID. Must be exactly 6 digits."
+    
+    if not isinstance(book_ids, list) or not book_ids:
+        return "A non-empty list of book IDs is required."
+    
+    if len(book_ids) > MAX_BATCH_BOOKS:
+        return f"At most {MAX_BATCH_BOOKS} books can be processed at once."
+    
+    if any(not isinstance(book_id, int) or isinstance(book_id, bool) for book_id in book_ids):
+        return "Invalid book ID."
+    
+    return None
+
+def _batch_report(verb: str, book_ids: List[int], outcomes: List[Tuple[bool, str]]) -> Dict:
+    """Pair each book ID with its (success, message) outcome and summarise the batch."""
+    results = [
+        {'book_id': book_id, 'success': success, 'message': message}
+        for book_id, (success, message) in zip(book_ids, outcomes)
+    ]
+    succeeded = sum(result['success'] for result in results)
+    return {
+        'success': True,
+        'message': f"{verb} {succeeded} of {len(results)} books.",
+        'succeeded': succeeded,
+        'results': results
+    }
+
+@timed
+def borrow_books_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Borrow several books for a patron at once, e.g. a stack at a self-service kiosk.
+    Batch form of R3: the patron is validated once, the borrowing limit is
+    checked against the whole batch, and all loans are made in one transaction.
+    
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books to borrow
+        
+    Returns:
+        dict: success flag (False only for an invalid request), summary
+        message, number of books borrowed and a result per book, in order,
+        with the messages borrow_book_by_patron would give
+    """
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return {'success': False, 'message': error, 'succeeded': 0, 'results': []}
+    
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=14)
+    results = borrow_books_transaction(patron_id, book_ids, borrow_date, due_date, borrow_limit=5)
+    return _batch_report('Borrowed', book_ids, [_borrow_outcome(status, book, due_date) for status, book in results])
+
+@timed
+def return_books_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Return several books for a patron at once.
+    Batch form of R4: the patron is validated once and all returns are made
+    in one transaction.
+    
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books to return
+        
+    Returns:
+        dict: success flag (False only for an invalid request), summary
+        message, number of books returned and a result per book, in order,
+        with the messages return_book_by_patron would give
+    """
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return {'success': False, 'message': error, 'succeeded': 0, 'results': []}
+    
+    return_date = datetime.now()
+    results = return_books_transaction(patron_id, book_ids, return_date)
+    return _batch_report('Returned', book_ids, [
+        _return_outcome(status, book, due_date, return_date) for status, book, due_date in results
+    ])
+
+def _late_fee_for_due_date(due_date: datetime, as_of: datetime) -> Tuple[float, int]:
+    """
+    Apply the R5 late fee schedule to a loan with the given due date.
+    
+    Returns:
+        tuple: (fee_amount: float, days_overdue: int)
+    """
+    days_overdue = (as_of - due_date).days
+    if days_overdue <= 0:
+        return 0.00, 0
+    
+    first_7_days_fee = min(days_overdue, 7) * 0.5
+    remaining_days_fee = max(days_overdue - 7, 0) * 1
+    fee_amount = min(first_7_days_fee + remaining_days_fee, 15)
+    return fee_amount, days_overdue
+
+def _precomputed_late_fee(loan: Dict, as_of: datetime) -> Tuple[float, int]:
+    """
+    Late fee still owed on an open loan: the fee assessed by the overdue
+    scheduler if it has assessed the loan recently, otherwise computed from
+    its due date, less what has already been paid towards it.
+    
+    Returns:
+        tuple: (fee_amount: float, days_overdue: int)
+    """
+    # A loan assessed on its due date (0 days) may have become overdue since
+    if loan['late_fee'] is not None and loan['days_overdue'] > 0:
+        fee_amount, days_overdue = loan['late_fee'], loan['days_overdue']
+    else:
+        fee_amount, days_overdue = _late_fee_for_due_date(loan['due_date'], as_of)
+    return max(round(fee_amount - loan['fees_paid'], 2), 0.0), days_overdue
+
+@timed
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
     Calculate late fees for a specific book.
@@ -165,86 +360,123 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
             "status": "Book not found." 
         }
     
-    borrowed_books = get_patron_borrowed_books(patron_id)
-    book_borrowed = None
-    for book in borrowed_books:
-        if book["book_id"] == book_id:
-            book_borrowed = book
-            break
-    if not book_borrowed:
+    loan = get_open_loan(patron_id, book_id)
+    if not loan:
         return {
             "fee_amount": 0.00,
             "days_overdue": 0,
             "status": "Book has not been borrowed by this patron." 
         }
-    due_date = book_borrowed['due_date']
-    days_overdue = (datetime.now() - due_date).days
+    fee_amount, days_overdue = _precomputed_late_fee(loan, datetime.now())
     if days_overdue <= 0:
         return {
             "fee_amount": 0.00,
             "days_overdue": 0,
             "status": "No late fee, book is not overdue." 
         }
+    if fee_amount <= 0:
+        return {
+            "fee_amount": 0.00,
+            "days_overdue": days_overdue,
+            "status": "The late fee for this book has already been paid." 
+        }
     
-    first_7_days_fee = min(days_overdue, 7) * 0.5
-    remaining_days_fee = max(days_overdue - 7, 0) * 1
-    fee_amount = min(first_7_days_fee + remaining_days_fee, 15)
     return {
         "fee_amount": fee_amount,
         "days_overdue": days_overdue,
         "status": f'Book is overdue by {days_overdue} days, late fee is {fee_amount}.'
     }
 
+@timed
+def assess_late_fees(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Assess late fees for every open loan in one pass.
+    
+    Batch counterpart of calculate_late_fee_for_book for nightly fee
+    assessment: applies the same R5 schedule to the whole loan table.
+    
+    Args:
+        as_of: Point in time to assess fees at (defaults to now)
+        
+    Returns:
+        dict: per-patron and per-book fee totals, overall total and number of overdue loans
+    """
+    totals = get_late_fee_totals(as_of or datetime.now())
+    for group in (totals['by_patron'], totals['by_book']):
+        for entry in group.values():
+            entry['fee_total'] = round(entry['fee_total'], 2)
+    totals['fee_total'] = round(totals['fee_total'], 2)
+    return totals
+
+@timed
 def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     """
     Search for books in the catalog.
+    Implements R6: title/author match on word prefixes (case-insensitive,
+    ranked by relevance), ISBN requires an exact match.
     
-    TODO: Implement R6 as per requirements
+    Args:
+        search_term: Text to search for
+        search_type: One of 'title', 'author' or 'isbn'
+        
+    Returns:
+        list: Matching books
     """
-    results = []
-    for book in get_all_books():
-        if search_type == "title" and search_term in book["title"].lower():
-            results.append(book)
-        elif search_type == "author" and search_term in book["author"].lower():
-            results.append(book)
-        elif search_type == "isbn" and search_term == book["isbn"]:
-            results.append(book)     
-    return results
+    return search_books(search_term.strip(), search_type)
+
+def iter_search_results(search_term: str, search_type: str) -> Iterator[Dict]:
+    """
+    Streaming form of search_books_in_catalog: yields the same books in the
+    same order, reading them from the database a batch at a time.
+    """
+    return iter_search_books(search_term.strip(), search_type)
 
+@timed
+def search_catalog_branches(search_term: str, search_type: str,
+                            branches: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Search the catalogs of several branch libraries as one.
+    Branches are SQLite shards; the memory engine searches its one store
+    and rejects named branches.
+    
+    Args:
+        search_term: Text to search for
+        search_type: One of 'title', 'author' or 'isbn'
+        branches: Branch keys to search (default: all of them)
+        
+    Returns:
+        list: Matching books, each with the branch that holds it, best matches first
+    """
+    return [dict(book.to_dict(), branch=branch)
+            for branch, book in search_branches(search_term.strip(), search_type, branches)]
+
+def iter_catalog() -> Iterator[Dict]:
+    """Yield every book in the catalog in ID order, a batch at a time."""
+    return iter_all_books()
+
+@timed
 def get_patron_status_report(patron_id: str) -> Dict:
     """
     Get status report for a patron.
-    
-    TODO: Implement R7 as per requirements
-    """    
+    Implements R7: built from a single joined query over the patron's loans,
+    with late fees taken from the overdue scheduler's assessments where they
+    are current and computed in memory from the fetched due dates otherwise. The
+    borrowing limit and fees still owed on returned loans come from the
+    patron's counters.
+    """
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return {
             'success': False,
             'message': "Invalid patron ID. Must be exactly 6 digits."
         }
     
-    borrowed_books = get_patron_borrowed_books(patron_id)
-    
-    total_late_fees = 0.00
-    formatted_books = []
-    for book in borrowed_books:
-        late_fee_info = calculate_late_fee_for_book(patron_id, book['book_id'])
-        total_late_fees += late_fee_info.get('fee_amount', 0.00)
-        
-        formatted_books.append({
-            'book_id': book['book_id'],
-            'title': book['title'],
-            'author': book['author'],
-            'borrow_date': book['borrow_date'].strftime("%Y-%m-%d"),
-            'due_date': book['due_date'].strftime("%Y-%m-%d"),
-            'is_overdue': book['is_overdue'],
-            'days_overdue': (datetime.now() - book['due_date']).days if book['is_overdue'] else 0,
-            'late_fee': late_fee_info.get('fee_amount', 0.00)
-        })
-    
+    # One joined query returns every loan; open loans and late fees are
+    # derived from it in memory.
+    now = datetime.now()
     history = get_patron_borrowing_history(patron_id)
     
     borrowing_history = []
+    open_loans = []
     for record in history:
         return_date = record['return_date']
         due_date = record['due_date']
@@ -264,20 +496,46 @@ def get_patron_status_report(patron_id: str) -> Dict:
         if return_date and return_date > due_date:
             history_item['was_overdue'] = True
             history_item['days_late'] = (return_date - due_date).days
+        
+        if return_date is None:
+            open_loans.append(record)
             
         borrowing_history.append(history_item)
     
+    # History is newest first; currently borrowed books are listed oldest first
+    total_late_fees = 0.00
+    formatted_books = []
+    for record in reversed(open_loans):
+        due_date = record['due_date']
+        fee_amount, _ = _precomputed_late_fee(record, now)
+        is_overdue = now > due_date
+        total_late_fees += fee_amount
+        
+        formatted_books.append({
+            'book_id': record['book_id'],
+            'title': record['title'],
+            'author': record['author'],
+            'borrow_date': record['borrow_date'].strftime("%Y-%m-%d"),
+            'due_date': due_date.strftime("%Y-%m-%d"),
+            'is_overdue': is_overdue,
+            'days_overdue': (now - due_date).days if is_overdue else 0,
+            'late_fee': fee_amount
+        })
+    
+    counters = get_patron_counters(patron_id)
     return {
         'success': True,
         'patron_id': patron_id,
         'currently_borrowed': formatted_books,
-        'num_books_borrowed': len(borrowed_books),
+        'num_books_borrowed': len(formatted_books),
         'total_late_fees': round(total_late_fees, 2),
-        'borrowing_limit_remaining': max(0, 5 - len(borrowed_books)),
+        'outstanding_fees': counters['outstanding_fees'],
+        'borrowing_limit_remaining': max(0, 5 - counters['active_loans']),
         'borrowing_history': borrowing_history
     }
 
-def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
+@timed
+def pay_late_fees(patron_id: str, book_id: int, payment_gateway: 'PaymentGateway' = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
     
@@ -298,29 +556,13 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         mock_gateway.process_payment.return_value = (True, "txn_123", "Success")
         success, msg, txn = pay_late_fees("123456", 1, mock_gateway)
     """
-    # Validate patron ID
-    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
-        return False, "Invalid patron ID. Must be exactly 6 digits.", None
-    
-    # Calculate late fee first
-    fee_info = calculate_late_fee_for_book(patron_id, book_id)
-    
-    # Check if there's a fee to pay
-    if not fee_info or 'fee_amount' not in fee_info:
-        return False, "Unable to calculate late fees.", None
-    
-    fee_amount = fee_info.get('fee_amount', 0.0)
-    
-    if fee_amount <= 0:
-        return False, "No late fees to pay for this book.", None
-    
-    # Get book details for payment description
-    book = get_book_by_id(book_id)
-    if not book:
-        return False, "Book not found.", None
+    error, fee_amount, book = _prepare_late_fee_payment(patron_id, book_id)
+    if error:
+        return False, error, None
     
     # Use provided gateway or create new one
     if payment_gateway is None:
+        from services.payment_service import PaymentGateway
         payment_gateway = PaymentGateway()
     
     # Process payment through external gateway
@@ -333,6 +575,7 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         )
         
         if success:
+            record_late_fee_payment(patron_id, book_id, fee_amount)
             return True, f"Payment successful! {message}", transaction_id
         else:
             return False, f"Payment failed: {message}", None
@@ -342,7 +585,105 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         return False, f"Payment processing error: {str(e)}", None
 
 
-def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
+def _prepare_late_fee_payment(patron_id: str, book_id: int) -> Tuple[Optional[str], float, Optional[Dict]]:
+    """
+    Validate a late fee payment request and look up the amount owed.
+    
+    Returns:
+        tuple: (error message or None, fee amount, book)
+    """
+    # Validate patron ID
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return "Invalid patron ID. Must be exactly 6 digits.", 0.0, None
+    
+    # Calculate late fee first
+    fee_info = calculate_late_fee_for_book(patron_id, book_id)
+    
+    # Check if there's a fee to pay
+    if not fee_info or 'fee_amount' not in fee_info:
+        return "Unable to calculate late fees.", 0.0, None
+    
+    fee_amount = fee_info.get('fee_amount', 0.0)
+    
+    if fee_amount <= 0:
+        return "No late fees to pay for this book.", 0.0, None
+    
+    # Get book details for payment description
+    book = get_book_by_id(book_id)
+    if not book:
+        return "Book not found.", 0.0, None
+    
+    return None, fee_amount, book
+
+@timed
+def pay_late_fees_batch(payments: List[Tuple[str, int]],
+                        payment_gateway: Optional['AsyncPaymentGateway'] = None) -> List[Tuple[bool, str, Optional[str]]]:
+    """
+    Settle late fees for many (patron_id, book_id) pairs concurrently.
+    
+    Batch counterpart of pay_late_fees: fees are validated and calculated
+    first, then every charge is sent through the async gateway at once, so
+    the total wait is roughly one gateway round trip instead of one per payment.
+    
+    Args:
+        payments: (patron_id, book_id) pairs to settle
+        payment_gateway: Async gateway client (injectable for testing). The
+            caller keeps ownership and closes it; only the connections
+            opened on this call's event loop are released before it ends.
+            Defaults to a SimulatedAsyncPaymentGateway, matching pay_late_fees.
+        
+    Returns:
+        list: (success: bool, message: str, transaction_id: Optional[str]) per payment, in input order
+    """
+    results = [None] * len(payments)
+    charges = []
+    charged = set()
+    for index, (patron_id, book_id) in enumerate(payments):
+        error, fee_amount, book = _prepare_late_fee_payment(patron_id, book_id)
+        # Fees are only recorded after the gateway answers, so a loan listed
+        # twice would otherwise be charged twice
+        if not error and (patron_id, book_id) in charged:
+            error = "No late fees to pay for this book."
+        if error:
+            results[index] = (False, error, None)
+        else:
+            charged.add((patron_id, book_id))
+            charges.append((index, patron_id, book_id, fee_amount, f"Late fees for '{book['title']}'"))
+    
+    if not charges:
+        return results
+    
+    owns_gateway = payment_gateway is None
+    if owns_gateway:
+        from services.async_payment_service import SimulatedAsyncPaymentGateway
+        payment_gateway = SimulatedAsyncPaymentGateway()
+    
+    async def settle():
+        try:
+            return await asyncio.gather(*(
+                payment_gateway.process_payment(patron_id=patron_id, amount=amount, description=description)
+                for _, patron_id, _, amount, description in charges
+            ), return_exceptions=True)
+        finally:
+            if owns_gateway:
+                await payment_gateway.close()
+            else:
+                await payment_gateway.release_connections()
+    
+    for (index, patron_id, book_id, amount, _), outcome in zip(charges, asyncio.run(settle())):
+        if isinstance(outcome, Exception):
+            results[index] = (False, f"Payment processing error: {str(outcome)}", None)
+        else:
+            success, transaction_id, message = outcome
+            if success:
+                record_late_fee_payment(patron_id, book_id, amount)
+                results[index] = (True, f"Payment successful! {message}", transaction_id)
+            else:
+                results[index] = (False, f"Payment failed: {message}", None)
+    return results
+
+@timed
+def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: 'PaymentGateway' = None) -> Tuple[bool, str]:
     """
     Refund a late fee payment (e.g., if book was returned on time but fees were charged in error).
     
@@ -368,6 +709,7 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
     
     # Use provided gateway or create new one
     if payment_gateway is None:
+        from services.payment_service import PaymentGateway
         payment_gateway = PaymentGateway()
     
     # Process refund through external gateway
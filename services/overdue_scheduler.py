@@ -0,0 +1,61 @@
+"""
+Overdue Scheduler Module - Background assessment of overdue loans
+Runs database.refresh_overdue_loans() every OVERDUE_REFRESH_INTERVAL
+seconds on a daemon thread, so status pages and /api/late_fee read late
+fees from overdue_loans instead of recomputing them per request.
+
+Started by create_app when OVERDUE_SCHEDULER is set (or the
+LIBRARY_OVERDUE_SCHEDULER environment variable is 1). Under gunicorn, run
+"flask refresh-overdue-loans --every N" as its own process instead, so the
+workers do not each run a copy.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+import database
+
+logger = logging.getLogger(__name__)
+
+
+class OverdueScheduler:
+    """Daemon thread that refreshes the overdue_loans table on a fixed interval."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else database.OVERDUE_REFRESH_INTERVAL
+        self._stopped = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.last_result = None
+
+    def run_once(self):
+        """Refresh overdue loans now, logging instead of raising on database errors."""
+        try:
+            self.last_result = database.refresh_overdue_loans()
+            self.runs += 1
+        except sqlite3.Error:
+            logger.exception("Refreshing overdue loans failed")
+        return self.last_result
+
+    def _run(self):
+        self.run_once()
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        """Start refreshing in the background (the first run happens immediately)."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='overdue-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread and wait for a run in progress to finish."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,601 @@
+"""
+Storage Module - Pluggable storage engines for the service layer
+The business logic in services/ reads and writes the catalog and loans
+only through the helpers at the bottom of this module, which call the
+active repository: any object implementing LibraryRepository. Two engines
+are provided:
+
+- sqlite (default): the SQLite database in database.py, including branch
+  shards, the book cache, the FTS5 search index and the overdue scheduler.
+- memory: MemoryRepository, which keeps books and loans in dicts with
+  secondary indexes and never touches the disk. For tests and for
+  read-mostly kiosk replicas; its contents are lost when the process ends
+  and are not shared between worker processes.
+
+create_app selects the engine from the STORAGE config value
+(LIBRARY_STORAGE, default sqlite). Database maintenance (migrations,
+archiving, overdue refreshes, the flask CLI commands) is SQLite only.
+"""
+
+import bisect
+import itertools
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Protocol, Tuple
+
+import database
+from models import Book, BorrowRecord, to_timestamp, from_timestamp
+
+
+class LibraryRepository(Protocol):
+    """
+    The storage operations the services use.
+
+    Signatures, return values and statuses are those of the functions of
+    the same names in database.py. Books and records returned are the
+    caller's to modify.
+    """
+
+    def location(self) -> str:
+        """Identify the store, so caches shared between stores never mix their entries."""
+
+    def add_sample_data(self): ...
+
+    def reset_db(self): ...
+
+    def get_catalog_version(self) -> Tuple[int, int]: ...
+
+    def get_book_by_id(self, book_id: int) -> Optional[Book]: ...
+
+    def get_book_by_isbn(self, isbn: str) -> Optional[Book]: ...
+
+    def insert_book(self, title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool: ...
+
+    def insert_books_batch(self, books: List[Tuple[str, str, str, int]]) -> Tuple[int, List[str]]: ...
+
+    def get_books_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                       before: Optional[Tuple[str, int]] = None) -> Dict: ...
+
+    def search_books(self, search_term: str, search_type: str) -> List[Book]: ...
+
+    def iter_search_books(self, search_term: str, search_type: str) -> Iterator[Book]: ...
+
+    def search_branches(self, search_term: str, search_type: str,
+                        branches: Optional[List[str]] = None) -> List[Tuple[Optional[str], Book]]: ...
+
+    def iter_all_books(self) -> Iterator[Book]: ...
+
+    def insert_borrow_record(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool: ...
+
+    def get_open_loan(self, patron_id: str, book_id: int) -> Optional[Dict]: ...
+
+    def get_patron_borrowing_history(self, patron_id: str) -> List[BorrowRecord]: ...
+
+    def get_patron_counters(self, patron_id: str) -> Dict: ...
+
+    def record_late_fee_payment(self, patron_id: str, book_id: int, amount: float) -> bool: ...
+
+    def get_late_fee_totals(self, as_of: datetime) -> Dict: ...
+
+    def borrow_book_transaction(self, patron_id: str, book_id: int, borrow_date: datetime,
+                                due_date: datetime, borrow_limit: int) -> Tuple[str, Optional[Book]]: ...
+
+    def return_book_transaction(self, patron_id: str, book_id: int,
+                                return_date: datetime) -> Tuple[str, Optional[Book], Optional[datetime]]: ...
+
+    def borrow_books_transaction(self, patron_id: str, book_ids: List[int], borrow_date: datetime,
+                                 due_date: datetime, borrow_limit: int) -> List[Tuple[str, Optional[Book]]]: ...
+
+    def return_books_transaction(self, patron_id: str, book_ids: List[int],
+                                 return_date: datetime) -> List[Tuple[str, Optional[Book], Optional[datetime]]]: ...
+
+
+class SQLiteRepository:
+    """The SQLite database (the current branch's shard inside use_branch)."""
+
+    location = staticmethod(database.get_database_path)
+    add_sample_data = staticmethod(database.add_sample_data)
+    reset_db = staticmethod(database.reset_db)
+    get_catalog_version = staticmethod(database.get_catalog_version)
+    get_book_by_id = staticmethod(database.get_book_by_id)
+    get_book_by_isbn = staticmethod(database.get_book_by_isbn)
+    insert_book = staticmethod(database.insert_book)
+    insert_books_batch = staticmethod(database.insert_books_batch)
+    get_books_page = staticmethod(database.get_books_page)
+    search_books = staticmethod(database.search_books)
+    iter_search_books = staticmethod(database.iter_search_books)
+    search_branches = staticmethod(database.search_branches)
+    iter_all_books = staticmethod(database.iter_all_books)
+    insert_borrow_record = staticmethod(database.insert_borrow_record)
+    get_open_loan = staticmethod(database.get_open_loan)
+    get_patron_borrowing_history = staticmethod(database.get_patron_borrowing_history)
+    get_patron_counters = staticmethod(database.get_patron_counters)
+    record_late_fee_payment = staticmethod(database.record_late_fee_payment)
+    get_late_fee_totals = staticmethod(database.get_late_fee_totals)
+    borrow_book_transaction = staticmethod(database.borrow_book_transaction)
+    return_book_transaction = staticmethod(database.return_book_transaction)
+    borrow_books_transaction = staticmethod(database.borrow_books_transaction)
+    return_books_transaction = staticmethod(database.return_books_transaction)
+
+
+def _late_fee(days: int) -> float:
+    """The R5 fee schedule, as the SQL in database.py applies it."""
+    return min(min(days, 7) * 0.5 + max(days - 7, 0) * 1.0, 15.0)
+
+
+def _search_tokens(text: str) -> List[str]:
+    """Split text into lowercase words without diacritics, like the FTS5 unicode61 tokenizer."""
+    if not text.isascii():
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return re.findall(r'[^\W_]+', text.lower())
+
+
+class _Loan:
+    """A borrow_records row; dates are epoch seconds, as stored by database.py."""
+
+    __slots__ = ('id', 'patron_id', 'book_id', 'borrow_date', 'due_date', 'return_date', 'fees_paid')
+
+    def __init__(self, id, patron_id, book_id, borrow_date, due_date):
+        self.id = id
+        self.patron_id = patron_id
+        self.book_id = book_id
+        self.borrow_date = borrow_date
+        self.due_date = due_date
+        self.return_date = None
+        self.fees_paid = 0.0
+
+
+class MemoryRepository:
+    """
+    Books and loans held in dicts, with the indexes the services' lookups need.
+
+    - books by ID and by ISBN, and a sorted (title, id) list for catalog pages
+    - per-field sorted word lists for prefix search
+    - loans by patron, and each patron's open loans of a book, oldest first
+    - per-patron active loan and outstanding fee counters, updated on every
+      borrow and return as the SQLite triggers do
+
+    Every operation holds one lock, so each is atomic like the SQLite
+    transactions. Searches return matches in title order rather than by
+    relevance.
+    """
+
+    _serials = itertools.count(1)
+
+    def __init__(self):
+        self._name = f'memory:{next(self._serials)}'
+        self._lock = threading.Lock()
+        self._version = 1
+        self._clear()
+
+    def _clear(self):
+        self._books = {}
+        self._book_ids = itertools.count(1)
+        self._books_by_isbn = {}
+        self._catalog_order = []
+        self._words = {'title': {}, 'author': {}}
+        self._sorted_words = {'title': [], 'author': []}
+        self._loan_ids = itertools.count(1)
+        self._loans_by_patron = {}
+        self._open_loans = {}
+        self._patrons = {}
+        self._updated_at = int(time.time())
+
+    def location(self) -> str:
+        return self._name
+
+    def _touch(self):
+        """Move the catalog version on after a change to any book."""
+        self._version += 1
+        self._updated_at = int(time.time())
+
+    def add_sample_data(self):
+        """Add the sample books and loan of database.add_sample_data if the catalog is empty."""
+        if self._books:
+            return
+        for title, author, isbn, copies in (('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
+                                            ('To Kill a Mockingbird', 'Harper Lee', '9780061120084', 2),
+                                            ('1984', 'George Orwell', '9780451524935', 1)):
+            self.insert_book(title, author, isbn, copies, copies)
+        now = datetime.now()
+        self.borrow_book_transaction('123456', self._books_by_isbn['9780451524935'],
+                                     now - timedelta(days=5), now + timedelta(days=9),
+                                     borrow_limit=5)
+
+    def reset_db(self):
+        """Delete every book and loan and add the sample data back, as database.reset_db does."""
+        with self._lock:
+            self._clear()
+            self._touch()
+        self.add_sample_data()
+
+    def get_catalog_version(self) -> Tuple[int, int]:
+        with self._lock:
+            return self._version, self._updated_at
+
+    # Books
+
+    def get_book_by_id(self, book_id: int) -> Optional[Book]:
+        with self._lock:
+            book = self._books.get(book_id)
+            return book.copy() if book else None
+
+    def get_book_by_isbn(self, isbn: str) -> Optional[Book]:
+        with self._lock:
+            book = self._books.get(self._books_by_isbn.get(isbn))
+            return book.copy() if book else None
+
+    def _add_book(self, title: str, author: str, isbn: str, total_copies: int, available_copies: int,
+                  keep_sorted: bool = True):
+        """Add a book to every index; with keep_sorted False the caller re-sorts the sorted lists."""
+        book = Book(next(self._book_ids), title, author, isbn, total_copies, available_copies)
+        self._books[book.id] = book
+        self._books_by_isbn[isbn] = book.id
+        add = bisect.insort if keep_sorted else list.append
+        add(self._catalog_order, (title, book.id))
+        for field in ('title', 'author'):
+            words = self._words[field]
+            for word in set(_search_tokens(book[field])):
+                if word not in words:
+                    words[word] = set()
+                    add(self._sorted_words[field], word)
+                words[word].add(book.id)
+
+    def insert_book(self, title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
+        with self._lock:
+            if isbn in self._books_by_isbn:
+                return False
+            self._add_book(title, author, isbn, total_copies, available_copies)
+            self._touch()
+            return True
+
+    def insert_books_batch(self, books: List[Tuple[str, str, str, int]]) -> Tuple[int, List[str]]:
+        with self._lock:
+            duplicates = [isbn for _, _, isbn, _ in books if isbn in self._books_by_isbn]
+            existing = set(duplicates)
+            new_books = [book for book in books if book[2] not in existing]
+            # Sorting once is much faster than inserting a large batch in order
+            for title, author, isbn, copies in new_books:
+                self._add_book(title, author, isbn, copies, copies, keep_sorted=False)
+            if new_books:
+                self._catalog_order.sort()
+                for sorted_words in self._sorted_words.values():
+                    sorted_words.sort()
+                self._touch()
+            return len(new_books), duplicates
+
+    def get_books_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                       before: Optional[Tuple[str, int]] = None) -> Dict:
+        with self._lock:
+            order = self._catalog_order
+            if before is not None:
+                end = bisect.bisect_left(order, tuple(before))
+                start = max(end - limit, 0)
+                has_prev, has_next = start > 0, end < len(order)
+            else:
+                start = bisect.bisect_right(order, tuple(after)) if after is not None else 0
+                end = start + limit
+                has_prev, has_next = start > 0, end < len(order)
+            books = [self._books[book_id].copy() for _, book_id in order[start:end]]
+        return {
+            'books': books,
+            'has_next': bool(books) and has_next,
+            'has_prev': bool(books) and has_prev
+        }
+
+    def search_books(self, search_term: str, search_type: str) -> List[Book]:
+        """Search as database.search_books does: ISBNs exactly, titles and authors by word prefix."""
+        if search_type == 'isbn':
+            book = self.get_book_by_isbn(search_term)
+            return [book] if book else []
+        if search_type not in ('title', 'author'):
+            return []
+        words = _search_tokens(search_term)
+        if not words:
+            return []
+
+        with self._lock:
+            index, sorted_words = self._words[search_type], self._sorted_words[search_type]
+            matches = None
+            for word in words:
+                ids = set()
+                for position in range(bisect.bisect_left(sorted_words, word), len(sorted_words)):
+                    if not sorted_words[position].startswith(word):
+                        break
+                    ids |= index[sorted_words[position]]
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+            books = [self._books[book_id].copy() for book_id in matches]
+        books.sort(key=lambda book: (book.title, book.id))
+        return books
+
+    def iter_search_books(self, search_term: str, search_type: str, batch_size: int = 0) -> Iterator[Book]:
+        return iter(self.search_books(search_term, search_type))
+
+    def search_branches(self, search_term: str, search_type: str,
+                        branches: Optional[List[str]] = None) -> List[Tuple[Optional[str], Book]]:
+        """Search the store as its only branch; branch shards are SQLite databases, so naming any is an error."""
+        if branches:
+            raise ValueError("Branch libraries are only available with the sqlite storage engine.")
+        return [(None, book) for book in self.search_books(search_term, search_type)]
+
+    def iter_all_books(self, batch_size: int = 0) -> Iterator[Book]:
+        """Yield every book in ID order, as of the start of the iteration."""
+        with self._lock:
+            books = list(self._books.values())
+        for book in books:
+            yield book.copy()
+
+    # Loans
+
+    def _counters(self, patron_id: str) -> List:
+        """The patron's [active_loans, outstanding_fees], created on first use."""
+        return self._patrons.setdefault(patron_id, [0, 0.0])
+
+    def _open_loan(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> _Loan:
+        loan = _Loan(next(self._loan_ids), patron_id, book_id, to_timestamp(borrow_date), to_timestamp(due_date))
+        self._loans_by_patron.setdefault(patron_id, []).append(loan)
+        # Kept oldest first; loans are almost always opened in date order
+        open_loans = self._open_loans.setdefault((patron_id, book_id), [])
+        open_loans.append(loan)
+        if len(open_loans) > 1 and open_loans[-2].borrow_date > loan.borrow_date:
+            open_loans.sort(key=lambda open_loan: open_loan.borrow_date)
+        self._counters(patron_id)[0] += 1
+        return loan
+
+    def _close_loan(self, loan: _Loan, return_date: datetime):
+        """Return the loan (its patron and book's oldest open loan) and assess its late fee."""
+        key = (loan.patron_id, loan.book_id)
+        self._open_loans[key].pop(0)
+        if not self._open_loans[key]:
+            del self._open_loans[key]
+        loan.return_date = to_timestamp(return_date)
+        days_late = max((loan.return_date - loan.due_date) // 86400, 0)
+        counters = self._counters(loan.patron_id)
+        counters[0] = max(counters[0] - 1, 0)
+        counters[1] += max(_late_fee(days_late) - loan.fees_paid, 0)
+
+    def _oldest_open_loan(self, patron_id: str, book_id: int) -> Optional[_Loan]:
+        loans = self._open_loans.get((patron_id, book_id))
+        return loans[0] if loans else None
+
+    def insert_borrow_record(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+        with self._lock:
+            self._open_loan(patron_id, book_id, borrow_date, due_date)
+            return True
+
+    def get_open_loan(self, patron_id: str, book_id: int) -> Optional[Dict]:
+        """The oldest open loan's due date; late fees are never precomputed here, so both are None."""
+        with self._lock:
+            loan = self._oldest_open_loan(patron_id, book_id)
+            if not loan:
+                return None
+            return {'due_date': from_timestamp(loan.due_date), 'fees_paid': loan.fees_paid,
+                    'late_fee': None, 'days_overdue': None}
+
+    def get_patron_borrowing_history(self, patron_id: str) -> List[BorrowRecord]:
+        with self._lock:
+            loans = sorted(self._loans_by_patron.get(patron_id, ()), key=lambda loan: loan.borrow_date, reverse=True)
+            return [
+                BorrowRecord(loan.id, loan.book_id, self._books[loan.book_id].title, self._books[loan.book_id].author,
+                             loan.borrow_date, loan.due_date, loan.return_date, fees_paid=loan.fees_paid)
+                for loan in loans if loan.book_id in self._books
+            ]
+
+    def get_patron_counters(self, patron_id: str) -> Dict:
+        with self._lock:
+            active_loans, outstanding_fees = self._patrons.get(patron_id, (0, 0.0))
+        return {'active_loans': active_loans, 'outstanding_fees': round(outstanding_fees, 2)}
+
+    def record_late_fee_payment(self, patron_id: str, book_id: int, amount: float) -> bool:
+        with self._lock:
+            loan = self._oldest_open_loan(patron_id, book_id)
+            if not loan:
+                return False
+            loan.fees_paid += amount
+            return True
+
+    def get_late_fee_totals(self, as_of: datetime) -> Dict:
+        as_of = to_timestamp(as_of)
+        by_patron, by_book = {}, {}
+        with self._lock:
+            for loans in self._open_loans.values():
+                for loan in loans:
+                    days_overdue = (as_of - loan.due_date) // 86400
+                    if days_overdue <= 0:
+                        continue
+                    fee = _late_fee(days_overdue)
+                    for totals, key in ((by_patron, loan.patron_id), (by_book, loan.book_id)):
+                        entry = totals.setdefault(key, {'fee_total': 0.0, 'overdue_loans': 0})
+                        entry['fee_total'] += fee
+                        entry['overdue_loans'] += 1
+        return {
+            'by_patron': by_patron,
+            'by_book': by_book,
+            'fee_total': sum(entry['fee_total'] for entry in by_patron.values()),
+            'overdue_loans': sum(entry['overdue_loans'] for entry in by_patron.values())
+        }
+
+    def borrow_book_transaction(self, patron_id: str, book_id: int, borrow_date: datetime,
+                                due_date: datetime, borrow_limit: int) -> Tuple[str, Optional[Book]]:
+        with self._lock:
+            book = self._books.get(book_id)
+            if not book:
+                return 'not_found', None
+            if book.available_copies <= 0:
+                return 'unavailable', book.copy()
+            if self._patrons.get(patron_id, (0,))[0] > borrow_limit:
+                return 'limit_reached', book.copy()
+
+            book.available_copies -= 1
+            self._open_loan(patron_id, book_id, borrow_date, due_date)
+            self._touch()
+            return 'borrowed', book.copy()
+
+    def return_book_transaction(self, patron_id: str, book_id: int,
+                                return_date: datetime) -> Tuple[str, Optional[Book], Optional[datetime]]:
+        with self._lock:
+            book = self._books.get(book_id)
+            if not book:
+                return 'not_found', None, None
+            loan = self._oldest_open_loan(patron_id, book_id)
+            if not loan:
+                return 'not_borrowed', book.copy(), None
+
+            self._close_loan(loan, return_date)
+            book.available_copies += 1
+            self._touch()
+            return 'returned', book.copy(), from_timestamp(loan.due_date)
+
+    def borrow_books_transaction(self, patron_id: str, book_ids: List[int], borrow_date: datetime,
+                                 due_date: datetime, borrow_limit: int) -> List[Tuple[str, Optional[Book]]]:
+        """Borrow books with database.borrow_books_transaction's batch limit rule."""
+        with self._lock:
+            books = {book_id: self._books[book_id].copy() for book_id in book_ids if book_id in self._books}
+            results = []
+            borrowed = []
+            for book_id in book_ids:
+                book = books.get(book_id)
+                if not book:
+                    results.append(('not_found', None))
+                elif book.available_copies <= 0:
+                    results.append(('unavailable', book))
+                else:
+                    book.available_copies -= 1
+                    borrowed.append(book_id)
+                    results.append(('borrowed', book))
+            if not borrowed:
+                return results
+
+            if self._patrons.get(patron_id, (0,))[0] + len(borrowed) - 1 > borrow_limit:
+                for book_id in borrowed:
+                    books[book_id].available_copies += 1
+                return [('limit_reached' if status == 'borrowed' else status, book) for status, book in results]
+
+            for book_id in borrowed:
+                self._books[book_id].available_copies -= 1
+                self._open_loan(patron_id, book_id, borrow_date, due_date)
+            self._touch()
+            return results
+
+    def return_books_transaction(self, patron_id: str, book_ids: List[int],
+                                 return_date: datetime) -> List[Tuple[str, Optional[Book], Optional[datetime]]]:
+        with self._lock:
+            books = {book_id: self._books[book_id].copy() for book_id in book_ids if book_id in self._books}
+            results = []
+            for book_id in book_ids:
+                book = books.get(book_id)
+                loan = self._oldest_open_loan(patron_id, book_id)
+                if not book:
+                    results.append(('not_found', None, None))
+                elif not loan:
+                    results.append(('not_borrowed', book, None))
+                else:
+                    self._close_loan(loan, return_date)
+                    book.available_copies += 1
+                    self._books[book_id].available_copies += 1
+                    results.append(('returned', book, from_timestamp(loan.due_date)))
+            if any(status == 'returned' for status, _, _ in results):
+                self._touch()
+            return results
+
+
+STORAGE_ENGINES = {
+    'sqlite': SQLiteRepository,
+    'memory': MemoryRepository,
+}
+
+_repository: LibraryRepository = SQLiteRepository()
+
+def create_repository(engine: str) -> LibraryRepository:
+    """
+    Create a repository for a storage engine.
+
+    Raises:
+        ValueError: If the engine is not one of STORAGE_ENGINES
+    """
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"Unknown storage engine '{engine}'; use one of: {', '.join(STORAGE_ENGINES)}.")
+    return STORAGE_ENGINES[engine]()
+
+def get_repository() -> LibraryRepository:
+    """Get the repository the services are using."""
+    return _repository
+
+def set_repository(repository: LibraryRepository):
+    """Make the services use a repository (e.g. one from create_repository)."""
+    global _repository
+    _repository = repository
+
+# Service-facing helpers: each calls the same method of the active repository.
+# The services import these instead of the database.py functions.
+
+def reset_db():
+    _repository.reset_db()
+
+def get_book_by_id(book_id: int) -> Optional[Book]:
+    return _repository.get_book_by_id(book_id)
+
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
+    return _repository.get_book_by_isbn(isbn)
+
+def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
+    return _repository.insert_book(title, author, isbn, total_copies, available_copies)
+
+def insert_books_batch(books: List[Tuple[str, str, str, int]]) -> Tuple[int, List[str]]:
+    return _repository.insert_books_batch(books)
+
+def get_books_page(limit: int, after: Optional[Tuple[str, int]] = None,
+                   before: Optional[Tuple[str, int]] = None) -> Dict:
+    return _repository.get_books_page(limit, after=after, before=before)
+
+def search_books(search_term: str, search_type: str) -> List[Book]:
+    return _repository.search_books(search_term, search_type)
+
+def iter_search_books(search_term: str, search_type: str) -> Iterator[Book]:
+    return _repository.iter_search_books(search_term, search_type)
+
+def search_branches(search_term: str, search_type: str,
+                    branches: Optional[List[str]] = None) -> List[Tuple[Optional[str], Book]]:
+    return _repository.search_branches(search_term, search_type, branches)
+
+def iter_all_books() -> Iterator[Book]:
+    return _repository.iter_all_books()
+
+def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+    return _repository.insert_borrow_record(patron_id, book_id, borrow_date, due_date)
+
+def get_open_loan(patron_id: str, book_id: int) -> Optional[Dict]:
+    return _repository.get_open_loan(patron_id, book_id)
+
+def get_patron_borrowing_history(patron_id: str) -> List[BorrowRecord]:
+    return _repository.get_patron_borrowing_history(patron_id)
+
+def get_patron_counters(patron_id: str) -> Dict:
+    return _repository.get_patron_counters(patron_id)
+
+def record_late_fee_payment(patron_id: str, book_id: int, amount: float) -> bool:
+    return _repository.record_late_fee_payment(patron_id, book_id, amount)
+
+def get_late_fee_totals(as_of: datetime) -> Dict:
+    return _repository.get_late_fee_totals(as_of)
+
+def borrow_book_transaction(patron_id: str, book_id: int, borrow_date: datetime,
+                            due_date: datetime, borrow_limit: int) -> Tuple[str, Optional[Book]]:
+    return _repository.borrow_book_transaction(patron_id, book_id, borrow_date, due_date, borrow_limit)
+
+def return_book_transaction(patron_id: str, book_id: int,
+                            return_date: datetime) -> Tuple[str, Optional[Book], Optional[datetime]]:
+    return _repository.return_book_transaction(patron_id, book_id, return_date)
+
+def borrow_books_transaction(patron_id: str, book_ids: List[int], borrow_date: datetime,
+                             due_date: datetime, borrow_limit: int) -> List[Tuple[str, Optional[Book]]]:
+    return _repository.borrow_books_transaction(patron_id, book_ids, borrow_date, due_date, borrow_limit)
+
+def return_books_transaction(patron_id: str, book_ids: List[int],
+                             return_date: datetime) -> List[Tuple[str, Optional[Book], Optional[datetime]]]:
+    return _repository.return_books_transaction(patron_id, book_ids, return_date)
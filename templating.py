@@ -0,0 +1,78 @@
+"""
+Templating Module - Template compilation and fragment caching
+Set up by create_app:
+
+- Compiled templates are cached as bytecode on disk (Jinja's
+  FileSystemBytecodeCache), so a new worker loads them instead of
+  compiling them from source. Entries are keyed by template name and
+  source checksum, so edited templates are recompiled.
+- precompile_templates loads every template up front; wsgi.py calls it
+  before gunicorn forks, so workers start with compiled templates.
+- catalog_rows renders the catalog table rows, caching each row's HTML
+  per book state, so catalog pages only render rows whose book changed.
+"""
+
+from typing import Optional
+
+from flask import Flask, current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from database import BookCache
+
+# Rendered catalog rows kept per process; a row changes only when its
+# book's availability (or details) change, so entries live long
+ROW_CACHE_SIZE = 20000
+ROW_CACHE_TTL = 3600.0
+
+row_cache = BookCache(max_size=ROW_CACHE_SIZE, ttl=ROW_CACHE_TTL)
+
+
+def init_templating(app: Flask, bytecode_cache_dir: Optional[str] = None):
+    """
+    Install the template bytecode cache and the catalog_rows template global.
+
+    Args:
+        bytecode_cache_dir: Directory for compiled templates; Jinja's
+            per-user directory under the system temp dir if not given
+    """
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+    app.jinja_env.globals['catalog_rows'] = catalog_rows
+
+
+def precompile_templates(app: Flask) -> int:
+    """
+    Compile (or load from the bytecode cache) every template of the app.
+
+    Returns:
+        int: Number of templates loaded
+    """
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def catalog_rows(books, borrow_url: str) -> Markup:
+    """
+    Render the catalog table rows of books, reusing each book's row if its state was rendered before.
+
+    Rows are keyed by every field they show, so a borrow or return (which
+    changes available_copies) re-renders only that book's row. The key is
+    only those rendered fields, so identical rows from different branch
+    shards or storage engines share one entry; they render to the same
+    HTML, so that is harmless. The loop runs here rather than in the
+    template, so cached rows cost a lookup each.
+    """
+    render_row = None
+    rows = []
+    for book in books:
+        key = (borrow_url, book.id, book.available_copies, book.total_copies, book.title, book.author, book.isbn)
+        row = row_cache.get(key)
+        if row is None:
+            if render_row is None:
+                render_row = current_app.jinja_env.get_template('_catalog_row.html').module.catalog_row
+            row = render_row(book, borrow_url)
+            row_cache.set(key, row)
+        rows.append(row)
+    return Markup('\n'.join(rows))
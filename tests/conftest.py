@@ -0,0 +1,99 @@
+import pytest
+import database
+import storage
+from app import create_app
+
+@pytest.fixture(scope="session", autouse=True)
+def library_database(tmp_path_factory):
+    """
+    Run the suite against a migrated copy of the sample database.
+    
+    Tests that use the default database (the req*_test modules) get a fresh,
+    fully migrated file with the sample data instead of the checked-in
+    library.db, which may be on an older schema.
+    """
+    previous = database.DATABASE
+    database.DATABASE = str(tmp_path_factory.mktemp('library') / 'library.db')
+    database.init_database()
+    database.add_sample_data()
+    yield
+    database.close_connection_pools()
+    database.DATABASE = previous
+
+@pytest.fixture
+def empty_database(tmp_path, monkeypatch):
+    """Point the database module at a fresh, unmigrated file for one test."""
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'test.db'))
+    database.book_cache.clear()
+    yield
+    database.close_connection_pools()
+    database.book_cache.clear()
+
+@pytest.fixture
+def temp_database(empty_database):
+    """Point the database module at a fresh, fully migrated file for one test."""
+    database.init_database()
+
+@pytest.fixture
+def client(temp_database):
+    """Test client for an app on the temporary database."""
+    return create_app({'TESTING': True}).test_client()
+
+@pytest.fixture(params=list(storage.STORAGE_ENGINES))
+def storage_engine(request):
+    """Run the test once per storage engine; SQLite runs get a fresh migrated file."""
+    if request.param == 'sqlite':
+        request.getfixturevalue('temp_database')
+    yield request.param
+    storage.set_repository(storage.SQLiteRepository())
+
+@pytest.fixture(scope="module", params=list(storage.STORAGE_ENGINES))
+def sample_catalog(request):
+    """
+    Run a module once per storage engine, starting from the sample data.
+    
+    SQLite runs use the session's sample database; memory runs get a new
+    store with the same books and loan.
+    """
+    if request.param == 'memory':
+        repository = storage.create_repository('memory')
+        repository.add_sample_data()
+        storage.set_repository(repository)
+    yield request.param
+    storage.set_repository(storage.SQLiteRepository())
+
+@pytest.fixture
+def repository(storage_engine):
+    """An empty store of the engine under test, made the one the services use."""
+    repository = storage.create_repository(storage_engine)
+    storage.set_repository(repository)
+    return repository
+
+class TracedConnection(database.PooledConnection):
+    """Pooled connection that stops tracing before it goes back to the pool."""
+    
+    __slots__ = ()
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.set_trace_callback(None)
+        super().close()
+
+@pytest.fixture
+def traced_statements(monkeypatch):
+    """
+    Record every SQL statement run on connections from get_db_connection().
+    
+    Returns:
+        list: The statements, in the order they ran
+    """
+    statements = []
+    original = database.get_db_connection
+    
+    def traced_connection():
+        conn = original()
+        conn.set_trace_callback(statements.append)
+        return TracedConnection(conn._connection(), conn._pool)
+    
+    monkeypatch.setattr(database, 'get_db_connection', traced_connection)
+    return statements
@@ -2,12 +2,12 @@ import pytest
 from services.library_service import (
     add_book_to_catalog
 )
-from database import (
+from storage import (
     reset_db
 )
 
 @pytest.fixture(scope="module", autouse=True)
-def reset_database():
+def reset_database(sample_catalog):
     """Reset database after all tests in this module run."""
     yield
     reset_db()
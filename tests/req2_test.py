@@ -1,13 +1,13 @@
 import pytest
-from services.library_service import (
-    get_all_books
-)
-from database import (
-    reset_db
+from storage import (
+    iter_all_books, reset_db
 )
 
+def get_all_books():
+    return list(iter_all_books())
+
 @pytest.fixture(scope="module", autouse=True)
-def reset_database():
+def reset_database(sample_catalog):
     """Reset database after all tests in this module run."""
     yield
     reset_db()
@@ -1,14 +1,19 @@
 import pytest
+from datetime import datetime, timedelta
 from services.library_service import (
-    borrow_book_by_patron, get_book_by_isbn
+    borrow_book_by_patron, return_book_by_patron, get_book_by_isbn
 )
-from database import (
-    reset_db
+from storage import (
+    reset_db, insert_book, insert_borrow_record
 )
 
 @pytest.fixture(scope="module", autouse=True)
-def reset_database():
-    """Reset database after all tests in this module run."""
+def reset_database(sample_catalog):
+    """Put 1984 back on the shelf, leave patron 123456 holding one other book, and reset after the module."""
+    return_book_by_patron("123456", get_book_by_isbn("9780451524935")["id"])
+    insert_book("Req 3 Held Book", "Test Author", "1234567890125", total_copies=1, available_copies=0)
+    insert_borrow_record("123456", get_book_by_isbn("1234567890125")["id"],
+                         datetime.now(), datetime.now() + timedelta(days=14))
     yield
     reset_db()
 
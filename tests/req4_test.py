@@ -2,12 +2,12 @@ import pytest
 from services.library_service import (
     return_book_by_patron, get_book_by_isbn, borrow_book_by_patron
 )
-from database import (
+from storage import (
     reset_db
 )
 
 @pytest.fixture(scope="module", autouse=True)
-def reset_database():
+def reset_database(sample_catalog):
     """Reset database after all tests in this module run."""
     yield
     reset_db()
@@ -52,7 +52,7 @@ def test_return_book_not_borrowed():
 def test_return_book_borrow_record_failure(mocker):
     """Test database error when updating borrow record."""
     borrow_book_by_patron("123456", get_book_by_isbn("9780451524935")["id"])
-    mocker.patch('services.library_service.update_borrow_record_return_date', return_value=False)
+    mocker.patch('services.library_service.return_book_transaction', return_value=('error', None, None))
     success, message = return_book_by_patron("123456", get_book_by_isbn("9780451524935")["id"])
     assert success == False
     assert "Database error occurred while creating borrow record." in message
\ No newline at end of file
@@ -1,14 +1,14 @@
 from datetime import datetime, timedelta
 import pytest
 from services.library_service import (
-    calculate_late_fee_for_book, get_book_by_isbn, insert_borrow_record, insert_book
+    calculate_late_fee_for_book, get_book_by_isbn, insert_book
 )
-from database import (
-    reset_db
+from storage import (
+    reset_db, insert_borrow_record
 )
 
 @pytest.fixture(autouse=True)
-def reset_database():
+def reset_database(sample_catalog):
     """Reset database after all tests in this module run."""
     yield
     reset_db()
@@ -3,12 +3,12 @@ from datetime import datetime, timedelta
 from services.library_service import (
     get_patron_status_report, borrow_book_by_patron, get_book_by_isbn
 )
-from database import (
+from storage import (
     reset_db, insert_book, insert_borrow_record
 )
 
 @pytest.fixture(scope="module", autouse=True)
-def reset_database():
+def reset_database(sample_catalog):
     """Reset database after all tests in this module run."""
     yield
     reset_db()
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+from database import insert_book, get_book_by_isbn, insert_borrow_record
+from services.async_payment_service import AsyncPaymentGateway, PaymentGatewayError
+from services.fake_payment_server import FakePaymentServer
+from services.library_service import pay_late_fees_batch
+
+def run_with_server(scenario, latency=0.0, **gateway_options):
+    """Run scenario(server, gateway) against a fresh fake server and return its result."""
+    async def main():
+        async with FakePaymentServer(latency=latency) as server:
+            async with AsyncPaymentGateway(base_url=server.url, **gateway_options) as gateway:
+                return await scenario(server, gateway)
+    return asyncio.run(main())
+
+def test_process_payment_success_and_status():
+    """Test a charge succeeds and its status can be verified."""
+    async def scenario(server, gateway):
+        success, transaction_id, message = await gateway.process_payment("123456", 10.50, "Late fees")
+        status = await gateway.verify_payment_status(transaction_id)
+        return success, transaction_id, message, status
+
+    success, transaction_id, message, status = run_with_server(scenario)
+    assert success == True
+    assert transaction_id.startswith("txn_123456_")
+    assert "$10.50" in message
+    assert status["status"] == "completed"
+
+def test_process_payment_declined():
+    """Test gateway declines are returned as failures, not retried."""
+    async def scenario(server, gateway):
+        return await gateway.process_payment("123456", 5000), server.requests
+
+    (success, transaction_id, message), requests = run_with_server(scenario)
+    assert success == False
+    assert "declined" in message
+    assert requests == 1
+
+def test_refund_and_unknown_transaction():
+    """Test refunds and lookups of unknown transactions."""
+    async def scenario(server, gateway):
+        return (await gateway.refund_payment("txn_123456_1", 5.0),
+                await gateway.verify_payment_status("txn_missing"))
+
+    (success, message), status = run_with_server(scenario)
+    assert success == True
+    assert "Refund ID" in message
+    assert status["status"] == "not_found"
+
+def test_connections_are_reused():
+    """Test sequential requests share one keep-alive connection."""
+    async def scenario(server, gateway):
+        for _ in range(5):
+            await gateway.process_payment("123456", 1.0)
+        return server.connections, gateway.connections_opened
+
+    assert run_with_server(scenario) == (1, 1)
+
+def test_requests_run_concurrently():
+    """Test many in-flight requests finish in about one round trip."""
+    async def scenario(server, gateway):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(gateway.process_payment("123456", 1.0) for _ in range(20)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = run_with_server(scenario, latency=0.2)
+    assert all(success for success, _, _ in results)
+    assert elapsed < 1.0
+
+def test_transient_failures_are_retried_once_per_charge():
+    """Test 5xx responses are retried with the same idempotency key."""
+    async def scenario(server, gateway):
+        server.fail_next(2)
+        result = await gateway.process_payment("123456", 3.0)
+        return result, gateway.retries, len(server.charges)
+
+    (success, _, _), retries, charges = run_with_server(scenario, backoff=0.01)
+    assert success == True
+    assert retries == 2
+    assert charges == 1
+
+def test_timeout_raises_after_retries():
+    """Test a gateway slower than the timeout raises PaymentGatewayError."""
+    async def scenario(server, gateway):
+        return await gateway.process_payment("123456", 3.0)
+
+    with pytest.raises(PaymentGatewayError):
+        run_with_server(scenario, latency=0.3, timeout=0.05, max_retries=1, backoff=0.01)
+
+def test_pay_late_fees_batch(temp_database):
+    """Test the batch service settles overdue loans and reports per-item errors."""
+    insert_book("Overdue Book", "Test Author", "1234567890123", 5, 5)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    due_date = datetime.now() - timedelta(days=10, hours=1)
+    for patron_id in ("111111", "222222", "333333"):
+        insert_borrow_record(patron_id, book_id, due_date - timedelta(days=14), due_date)
+
+    with FakePaymentServer(latency=0.1).running_in_thread() as server:
+        gateway = AsyncPaymentGateway(base_url=server.url)
+        results = pay_late_fees_batch(
+            [("111111", book_id), ("222222", book_id), ("333333", book_id), ("444444", book_id), ("12", book_id)],
+            gateway
+        )
+        assert gateway.requests_sent == 3
+
+    assert [success for success, _, _ in results] == [True, True, True, False, False]
+    assert all("$6.50" in message for _, message, _ in results[:3])
+    assert results[3][1] == "No late fees to pay for this book."
+    assert "Invalid patron ID" in results[4][1]
+
+def test_pay_late_fees_batch_charges_a_loan_once(temp_database):
+    """Test a loan listed twice in a batch, or already paid, is not charged again."""
+    insert_book("Overdue Book", "Test Author", "1234567890123", 5, 5)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    due_date = datetime.now() - timedelta(days=10, hours=1)
+    insert_borrow_record("111111", book_id, due_date - timedelta(days=14), due_date)
+
+    with FakePaymentServer().running_in_thread() as server:
+        gateway = AsyncPaymentGateway(base_url=server.url)
+        results = pay_late_fees_batch([("111111", book_id), ("111111", book_id)], gateway)
+        assert [success for success, _, _ in results] == [True, False]
+        assert results[1][1] == "No late fees to pay for this book."
+        assert pay_late_fees_batch([("111111", book_id)], gateway)[0][1] == "No late fees to pay for this book."
+        assert gateway.requests_sent == 1
+
+def test_pay_late_fees_batch_defaults_to_simulated_gateway(temp_database):
+    """Test the batch service works without a configured gateway, like pay_late_fees."""
+    insert_book("Overdue Book", "Test Author", "1234567890123", 5, 5)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    due_date = datetime.now() - timedelta(days=10, hours=1)
+    for patron_id in ("111111", "222222"):
+        insert_borrow_record(patron_id, book_id, due_date - timedelta(days=14), due_date)
+
+    started = time.perf_counter()
+    results = pay_late_fees_batch([("111111", book_id), ("222222", book_id)])
+    assert [success for success, _, _ in results] == [True, True]
+    assert all(txn.startswith("txn_") for _, _, txn in results)
+    # Both simulated calls wait concurrently
+    assert time.perf_counter() - started < 0.9
@@ -0,0 +1,104 @@
+import pytest
+from app import create_app
+from storage import insert_book, get_book_by_isbn, get_patron_counters
+from services.library_service import (
+    borrow_books_by_patron, return_books_by_patron, borrow_book_by_patron, get_patron_status_report
+)
+
+def add_books():
+    """Add three books to the store; the last has no copies left."""
+    insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    insert_book("Emma", "Jane Austen", "9780141439587", 3, 3)
+    insert_book("1984", "George Orwell", "9780451524935", 1, 0)
+    return [get_book_by_isbn(isbn)["id"] for isbn in ("9780441172719", "9780141439587", "9780451524935")]
+
+@pytest.fixture
+def book_ids(repository):
+    """Add the three books to an empty store of each engine."""
+    return add_books()
+
+def currently_borrowed(patron_id):
+    return get_patron_status_report(patron_id)['currently_borrowed']
+
+def test_batch_borrow_reports_each_book(book_ids):
+    """Test available books are borrowed and the rest get the single-borrow messages."""
+    dune, emma, nineteen_eighty_four = book_ids
+    report = borrow_books_by_patron("123456", [dune, emma, nineteen_eighty_four, 987654])
+    assert report['success'] == True
+    assert report['succeeded'] == 2
+    assert [result['success'] for result in report['results']] == [True, True, False, False]
+    assert report['results'][2]['message'] == "This book is currently not available."
+    assert report['results'][3]['message'] == "Book not found."
+    assert get_book_by_isbn("9780441172719")["available_copies"] == 1
+    assert len(currently_borrowed("123456")) == 2
+    assert get_patron_counters("123456")['active_loans'] == 2
+
+def test_batch_borrow_repeated_book_takes_one_copy_each(book_ids):
+    """Test listing a book three times borrows its two copies and reports the third unavailable."""
+    dune = book_ids[0]
+    report = borrow_books_by_patron("123456", [dune, dune, dune])
+    assert [result['success'] for result in report['results']] == [True, True, False]
+    assert get_book_by_isbn("9780441172719")["available_copies"] == 0
+
+def test_batch_borrow_limit_covers_whole_batch(book_ids):
+    """Test a batch that single borrows could not complete borrows nothing, and one they could is allowed."""
+    insert_book("Middlemarch", "George Eliot", "9780141439549", 10, 10)
+    middlemarch = get_book_by_isbn("9780141439549")["id"]
+    for _ in range(3):
+        assert borrow_book_by_patron("123456", middlemarch)[0] == True
+    report = borrow_books_by_patron("123456", [middlemarch] * 4)
+    assert report['succeeded'] == 0
+    assert {result['message'] for result in report['results']} == {
+        "You have reached the maximum borrowing limit of 5 books."
+    }
+    assert get_book_by_isbn("9780141439549")["available_copies"] == 7
+    assert get_patron_counters("123456")['active_loans'] == 3
+
+    assert borrow_books_by_patron("123456", [middlemarch] * 3)['succeeded'] == 3
+    assert borrow_book_by_patron("123456", middlemarch)[0] == False
+
+def test_batch_borrow_limit_applies_to_new_patrons(book_ids):
+    """Test a patron with no loans yet cannot borrow more than single borrows would allow in one batch."""
+    insert_book("Middlemarch", "George Eliot", "9780141439549", 10, 10)
+    middlemarch = get_book_by_isbn("9780141439549")["id"]
+    assert borrow_books_by_patron("654321", [middlemarch] * 7)['succeeded'] == 0
+    assert get_patron_counters("654321")['active_loans'] == 0
+    assert borrow_books_by_patron("654321", [middlemarch] * 6)['succeeded'] == 6
+
+def test_batch_return_closes_open_loans(book_ids):
+    """Test returns close the patron's loans and report books not borrowed."""
+    dune, emma, _ = book_ids
+    borrow_books_by_patron("123456", [dune, dune, emma])
+    report = return_books_by_patron("123456", [dune, emma, emma, dune])
+    assert [result['success'] for result in report['results']] == [True, True, False, True]
+    assert report['results'][2]['message'] == "Book has not been borrowed by this patron."
+    assert report['message'] == "Returned 3 of 4 books."
+    assert currently_borrowed("123456") == []
+    assert get_book_by_isbn("9780441172719")["available_copies"] == 2
+
+@pytest.mark.parametrize("patron_id, book_ids, message", [
+    ("12345", [1], "Invalid patron ID. Must be exactly 6 digits."),
+    ("123456", [], "A non-empty list of book IDs is required."),
+    ("123456", "1,2", "A non-empty list of book IDs is required."),
+    ("123456", [1, "2"], "Invalid book ID."),
+    ("123456", list(range(51)), "At most 50 books can be processed at once."),
+])
+def test_batch_request_validation(temp_database, patron_id, book_ids, message):
+    """Test invalid batch requests are refused before touching the database."""
+    assert borrow_books_by_patron(patron_id, book_ids) == {
+        'success': False, 'message': message, 'succeeded': 0, 'results': []
+    }
+
+def test_batch_endpoints(storage_engine):
+    """Test the JSON endpoints borrow and return a batch."""
+    client = create_app({'TESTING': True, 'STORAGE': storage_engine}).test_client()
+    book_ids = add_books()
+    response = client.post('/api/borrow/batch', json={'patron_id': '123456', 'book_ids': book_ids[:2]})
+    assert response.status_code == 200
+    assert response.get_json()['succeeded'] == 2
+
+    response = client.post('/api/return/batch', json={'patron_id': '123456', 'book_ids': book_ids[:2]})
+    assert response.get_json()['succeeded'] == 2
+
+    assert client.post('/api/borrow/batch', data='not json').status_code == 400
+    assert client.post('/api/return/batch', json={'patron_id': 'abc', 'book_ids': [1]}).status_code == 400
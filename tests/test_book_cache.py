@@ -0,0 +1,63 @@
+import pytest
+import database
+from database import (
+    insert_book, get_book_by_id, get_book_by_isbn, update_book_availability, BookCache,
+    get_book_cache_stats
+)
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+@pytest.fixture(autouse=True)
+def cached_book(temp_database):
+    """Add one book to the fresh database (the book cache starts empty)."""
+    insert_book("Cached Book", "Test Author", "1234567890123", 3, 3)
+
+def test_repeated_lookups_hit_cache():
+    """Test a second lookup by ID or ISBN is served from the cache."""
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    hits = get_book_cache_stats()['hits']
+    assert get_book_by_id(book_id)["title"] == "Cached Book"
+    assert get_book_by_isbn("1234567890123")["id"] == book_id
+    assert get_book_cache_stats()['hits'] >= hits + 2
+
+def test_cached_book_cannot_be_mutated_by_caller():
+    """Test callers get copies, so mutating a result does not corrupt the cache."""
+    book = get_book_by_isbn("1234567890123")
+    book["title"] = "Changed"
+    assert get_book_by_id(book["id"])["title"] == "Cached Book"
+
+def test_availability_updates_invalidate_cache():
+    """Test borrow, return and update_book_availability invalidate the cached book."""
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    borrow_book_by_patron("123456", book_id)
+    assert get_book_by_id(book_id)["available_copies"] == 2
+    return_book_by_patron("123456", book_id)
+    assert get_book_by_isbn("1234567890123")["available_copies"] == 3
+    update_book_availability(book_id, -3)
+    assert get_book_by_id(book_id)["available_copies"] == 0
+
+def test_missing_books_are_not_cached():
+    """Test a lookup miss is not cached, so a later insert is visible."""
+    assert get_book_by_isbn("9999999999999") is None
+    insert_book("New Book", "Test Author", "9999999999999", 1, 1)
+    assert get_book_by_isbn("9999999999999")["title"] == "New Book"
+
+def test_cache_evicts_least_recently_used():
+    """Test the cache stays within max_size by evicting the oldest entry."""
+    cache = BookCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_entries_expire(monkeypatch):
+    """Test entries older than the TTL are treated as misses."""
+    now = [1000.0]
+    monkeypatch.setattr(database.time, 'monotonic', lambda: now[0])
+    cache = BookCache(max_size=10, ttl=5)
+    cache.set('a', 1)
+    now[0] += 6
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
@@ -0,0 +1,80 @@
+import pytest
+import database
+from app import create_app
+from database import (
+    configure_branches, init_branch_databases, use_branch, get_database_path,
+    insert_book, get_book_by_isbn, get_patron_counters
+)
+from services.library_service import borrow_book_by_patron, search_catalog_branches
+
+@pytest.fixture
+def branches(temp_database, tmp_path):
+    """Configure two migrated branch shards next to the temporary database."""
+    configure_branches({'east': str(tmp_path / 'east.db'), 'west': str(tmp_path / 'west.db')})
+    init_branch_databases()
+    yield
+    configure_branches({})
+    database.close_connection_pools()
+
+def test_branch_writes_stay_in_their_shard(branches, tmp_path):
+    """Test books and loans written in a branch are only visible there."""
+    with use_branch('east'):
+        assert get_database_path() == str(tmp_path / 'east.db')
+        insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+        book_id = get_book_by_isbn("9780441172719")["id"]
+        assert borrow_book_by_patron("123456", book_id)[0] == True
+    with use_branch('west'):
+        assert get_book_by_isbn("9780441172719") is None
+        assert get_patron_counters("123456")['active_loans'] == 0
+    assert get_book_by_isbn("9780441172719") is None
+    with use_branch('east'):
+        assert get_book_by_isbn("9780441172719")["available_copies"] == 1
+        assert get_patron_counters("123456")['active_loans'] == 1
+
+def test_unknown_branch_is_rejected(branches):
+    """Test selecting a branch that is not configured raises ValueError."""
+    with pytest.raises(ValueError):
+        with use_branch('north'):
+            pass
+
+def test_search_merges_branch_results(branches):
+    """Test a cross-branch search returns every branch's matches, tagged with their branch."""
+    with use_branch('east'):
+        insert_book("The Golden River", "A. Author", "9780000000001", 1, 1)
+        insert_book("The Golden Age", "B. Author", "9780000000002", 1, 1)
+    with use_branch('west'):
+        insert_book("The Golden Bowl", "Henry James", "9780000000003", 1, 1)
+    results = search_catalog_branches("golden", "title")
+    assert [(book['title'], book['branch']) for book in results] == [
+        ("The Golden Age", 'east'), ("The Golden Bowl", 'west'), ("The Golden River", 'east')
+    ]
+    assert [book['branch'] for book in search_catalog_branches("golden", "title", ['west'])] == ['west']
+
+def test_branch_header_routes_requests(branches):
+    """Test the X-Library-Branch header selects the shard and an unknown branch gets a 400."""
+    with use_branch('west'):
+        insert_book("Emma", "Jane Austen", "9780141439587", 1, 1)
+    client = create_app({'TESTING': True}).test_client()
+    west = client.get('/api/search?q=emma', headers={'X-Library-Branch': 'west'}).get_json()
+    assert west['count'] == 1
+    east = client.get('/api/search?q=emma', headers={'X-Library-Branch': 'east'}).get_json()
+    assert east['count'] == 0
+    assert client.get('/api/search?q=emma', headers={'X-Library-Branch': 'north'}).status_code == 400
+    merged = client.get('/api/branches/search?q=emma').get_json()
+    assert [book['branch'] for book in merged['results']] == ['west']
+    assert client.get('/api/branches/search?q=emma&branch=north').status_code == 400
+
+def test_branch_header_applies_to_streamed_responses(branches):
+    """Test streamed search results and catalog exports are read from the header's branch."""
+    with use_branch('west'):
+        insert_book("Emma", "Jane Austen", "9780141439587", 1, 1)
+    client = create_app({'TESTING': True}).test_client()
+    for branch, expected in (('west', 1), ('east', 0)):
+        headers = {'X-Library-Branch': branch}
+        lines = client.get('/api/search?q=emma&stream=jsonl', headers=headers).get_data(as_text=True).splitlines()
+        assert len(lines) == expected
+        assert client.get('/api/search?q=emma&stream=json', headers=headers).get_json()['count'] == expected
+        export = client.get('/api/books/export', headers=headers).get_data(as_text=True)
+        assert ('9780141439587' in export) == bool(expected)
+        csv = client.get('/api/books/export?format=csv', headers=headers).get_data(as_text=True)
+        assert len(csv.splitlines()) == 1 + expected
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+import pytest
+from database import insert_book, get_book_by_isbn
+from services.import_service import import_books_from_stream
+
+CSV_BOOKS = """title,author,isbn,total_copies
+Dune,Frank Herbert,9780441172719,4
+ Emma ,Jane Austen,9780141439587,2
+Bad Isbn,Someone,12345,1
+No Copies,Someone,9780000000001,zero
+Dune Again,Frank Herbert,9780441172719,1
+Existing,Someone,9780451524935,1
+"""
+
+@pytest.fixture(autouse=True)
+def existing_book(temp_database):
+    """Add one existing book to the fresh database."""
+    insert_book("1984", "George Orwell", "9780451524935", 1, 1)
+
+def test_import_csv_inserts_valid_rows_and_reports_rejections():
+    """Test valid rows are inserted and each invalid row gets a reason."""
+    report = import_books_from_stream(io.StringIO(CSV_BOOKS), 'csv', batch_size=2)
+    assert report['rows'] == 6
+    assert report['inserted'] == 2
+    assert report['rejected'] == 4
+    reasons = {rejection['row']: rejection['reason'] for rejection in report['rejections']}
+    assert reasons == {
+        4: "ISBN must be exactly 13 digits.",
+        5: "Total copies must be a positive integer.",
+        6: "Duplicate ISBN in import.",
+        7: "A book with this ISBN already exists."
+    }
+    assert get_book_by_isbn("9780141439587")["title"] == "Emma"
+    assert get_book_by_isbn("9780441172719")["available_copies"] == 4
+
+def test_import_jsonl():
+    """Test JSON Lines import, including malformed lines."""
+    lines = "\n".join([
+        json.dumps({"title": "Dune", "author": "Frank Herbert", "isbn": "9780441172719", "total_copies": 3}),
+        "",
+        "not json",
+        json.dumps({"title": "", "author": "Nobody", "isbn": "9780141439587", "total_copies": 1})
+    ])
+    report = import_books_from_stream(io.StringIO(lines), 'jsonl')
+    assert report['inserted'] == 1
+    assert [rejection['reason'] for rejection in report['rejections']] == [
+        "Row is not a valid JSON object.", "Title is required."
+    ]
+    assert report['rows_per_second'] > 0
+
+def test_import_unsupported_format():
+    """Test an unknown format is rejected up front."""
+    report = import_books_from_stream(io.StringIO(""), 'xml')
+    assert report['success'] == False
+
+def test_bulk_endpoint_accepts_raw_csv_body(client):
+    """Test /api/books/bulk streams a raw CSV body."""
+    response = client.post('/api/books/bulk', data=CSV_BOOKS, content_type='text/csv')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['inserted'] == 2
+    assert data['rejected'] == 4
+
+def test_bulk_endpoint_accepts_file_upload(client):
+    """Test /api/books/bulk accepts a multipart JSON Lines upload."""
+    body = json.dumps({"title": "Dune", "author": "Frank Herbert", "isbn": "9780441172719", "total_copies": 3})
+    response = client.post('/api/books/bulk?format=jsonl',
+                           data={'file': (io.BytesIO(body.encode('utf-8')), 'books.jsonl')},
+                           content_type='multipart/form-data')
+    assert response.get_json()['inserted'] == 1
+
+def test_bulk_endpoint_rejects_unknown_format(client):
+    """Test /api/books/bulk returns 400 for an unsupported format."""
+    response = client.post('/api/books/bulk?format=xml', data="<books/>", content_type='text/xml')
+    assert response.status_code == 400
+
+def test_bulk_endpoint_rejects_invalid_utf8(client):
+    """Test an upload that is not UTF-8 gets a 400 with a message instead of a server error."""
+    body = b"title,author,isbn,total_copies\n\xff\xfeDune,Frank Herbert,9780441172719,4\n"
+    response = client.post('/api/books/bulk', data={'file': (io.BytesIO(body), 'books.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert "UTF-8" in response.get_json()['error']
+
+def test_import_reports_malformed_csv():
+    """Test a CSV the csv module cannot parse is reported instead of raised."""
+    oversized_field = "x" * (csv.field_size_limit() + 1)
+    source = f"title,author,isbn,total_copies\n{oversized_field},A,9780441172719,4\n"
+    report = import_books_from_stream(io.StringIO(source), 'csv')
+    assert report['success'] == False
+    assert "malformed CSV" in report['message']
+    assert get_book_by_isbn("9780441172719") is None
@@ -0,0 +1,70 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytest
+from storage import insert_book, get_book_by_isbn, insert_borrow_record
+from services.library_service import assess_late_fees, calculate_late_fee_for_book, return_book_by_patron
+
+pytestmark = pytest.mark.usefixtures('repository')
+
+def seed_loans():
+    """Give 8 patrons one loan of each of 6 books, due between 40 days ago and 10 days from now."""
+    rng = random.Random(327)
+    book_ids = []
+    for i in range(6):
+        insert_book(f"Book {i}", "Test Author", f"{1000000000000 + i}", 10, 10)
+        book_ids.append(get_book_by_isbn(f"{1000000000000 + i}").id)
+    patrons = [f"{100000 + i}" for i in range(8)]
+    now = datetime.now()
+    for patron_id in patrons:
+        for book_id in book_ids:
+            # Half-day offsets keep every loan away from a day boundary
+            due_date = now - timedelta(days=rng.randint(-10, 40) + 0.5)
+            insert_borrow_record(patron_id, book_id, due_date - timedelta(days=14), due_date)
+    return patrons, book_ids
+
+def test_bulk_fees_match_scalar_calculation():
+    """Test per-patron and per-book totals equal the sum of calculate_late_fee_for_book."""
+    patrons, book_ids = seed_loans()
+    expected_by_patron = defaultdict(float)
+    expected_by_book = defaultdict(float)
+    for patron_id in patrons:
+        for book_id in book_ids:
+            fee = calculate_late_fee_for_book(patron_id, book_id)["fee_amount"]
+            if fee > 0:
+                expected_by_patron[patron_id] += fee
+                expected_by_book[book_id] += fee
+
+    totals = assess_late_fees()
+    assert {key: entry['fee_total'] for key, entry in totals['by_patron'].items()} == pytest.approx(dict(expected_by_patron))
+    assert {key: entry['fee_total'] for key, entry in totals['by_book'].items()} == pytest.approx(dict(expected_by_book))
+    assert totals['fee_total'] == pytest.approx(sum(expected_by_patron.values()))
+
+def test_bulk_fees_schedule_and_cap():
+    """Test the 0.50/1.00 per day schedule and the 15.00 cap."""
+    insert_book("Book", "Test Author", "1234567890123", 3, 3)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    now = datetime.now()
+    for patron_id, days in (("111111", 3.5), ("222222", 10.5), ("333333", 60.5), ("444444", -2.5)):
+        due_date = now - timedelta(days=days)
+        insert_borrow_record(patron_id, book_id, due_date - timedelta(days=14), due_date)
+
+    totals = assess_late_fees(now)
+    assert totals['by_patron'] == {
+        "111111": {'fee_total': 1.5, 'overdue_loans': 1},
+        "222222": {'fee_total': 6.5, 'overdue_loans': 1},
+        "333333": {'fee_total': 15.0, 'overdue_loans': 1}
+    }
+    assert totals['by_book'][book_id] == {'fee_total': 23.0, 'overdue_loans': 3}
+    assert totals['overdue_loans'] == 3
+
+def test_bulk_fees_ignore_returned_loans():
+    """Test returned loans do not accrue fees."""
+    insert_book("Book", "Test Author", "1234567890123", 1, 1)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    due_date = datetime.now() - timedelta(days=5.5)
+    insert_borrow_record("111111", book_id, due_date - timedelta(days=14), due_date)
+    return_book_by_patron("111111", book_id)
+    totals = assess_late_fees()
+    assert totals['by_patron'] == {}
+    assert totals['fee_total'] == 0
@@ -0,0 +1,81 @@
+import pytest
+from database import get_db_connection, insert_book
+from services.library_service import get_catalog_page, MAX_PAGE_SIZE
+
+@pytest.fixture(autouse=True)
+def catalog(temp_database):
+    """Add 25 books to the fresh database."""
+    for i in range(25):
+        # Every title appears twice so pages must break ties on id
+        insert_book(f"Book {i // 2:02d}", "Test Author", f"{1000000000000 + i}", 1, 1)
+
+def walk_forward(page_size):
+    pages = [get_catalog_page(page_size=page_size)]
+    while pages[-1]['next_cursor']:
+        pages.append(get_catalog_page(after=pages[-1]['next_cursor'], page_size=page_size))
+    return pages
+
+def test_catalog_pages_cover_every_book_once_in_order():
+    """Test walking next cursors visits every book exactly once, sorted by (title, id)."""
+    pages = walk_forward(10)
+    keys = [(book['title'], book['id']) for page in pages for book in page['books']]
+    assert [len(page['books']) for page in pages] == [10, 10, 5]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 25
+    assert pages[0]['prev_cursor'] is None
+    assert pages[-1]['next_cursor'] is None
+
+def test_catalog_prev_cursor_returns_previous_page():
+    """Test following prev_cursor returns the same books as the earlier page."""
+    pages = walk_forward(10)
+    previous = get_catalog_page(before=pages[2]['prev_cursor'], page_size=10)
+    assert previous['books'] == pages[1]['books']
+    first = get_catalog_page(before=previous['prev_cursor'], page_size=10)
+    assert first['books'] == pages[0]['books']
+    assert first['prev_cursor'] is None
+
+def test_catalog_page_size_is_clamped():
+    """Test page sizes are limited to 1..MAX_PAGE_SIZE."""
+    assert get_catalog_page(page_size=0)['page_size'] == 1
+    assert get_catalog_page(page_size=MAX_PAGE_SIZE + 1)['page_size'] == MAX_PAGE_SIZE
+
+def test_catalog_invalid_cursor():
+    """Test a malformed cursor is rejected."""
+    result = get_catalog_page(after="not-a-cursor")
+    assert result['success'] == False
+    assert "Invalid page cursor." in result['message']
+
+def test_catalog_pagination_uses_covering_index():
+    """Test the seek query is answered from the covering index."""
+    conn = get_db_connection()
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM books WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT 10",
+        ("Book 05", 11)
+    ).fetchall()
+    conn.close()
+    assert any("COVERING INDEX idx_books_title_id" in row['detail'] for row in plan)
+
+def test_api_books_endpoint(client):
+    """Test /api/books returns a page with cursors."""
+    response = client.get('/api/books?per_page=20')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['count'] == 20
+    assert data['prev_cursor'] is None
+
+    response = client.get(f"/api/books?per_page=20&after={data['next_cursor']}")
+    data = response.get_json()
+    assert data['count'] == 5
+    assert data['next_cursor'] is None
+
+def test_api_books_invalid_cursor(client):
+    """Test /api/books rejects a malformed cursor."""
+    response = client.get('/api/books?after=%%%')
+    assert response.status_code == 400
+
+def test_catalog_view_links_next_page(client):
+    """Test the HTML catalog renders a Next link when more books exist."""
+    response = client.get('/catalog?per_page=10')
+    assert response.status_code == 200
+    assert b'Next' in response.data
+    assert b'Previous' not in response.data
@@ -0,0 +1,86 @@
+import sqlite3
+import pytest
+import database
+from database import (
+    get_db_connection, get_connection_pool
+)
+
+pytestmark = pytest.mark.usefixtures('temp_database')
+
+def test_pool_reuses_released_connection():
+    """Test a closed connection is handed out again instead of reconnecting."""
+    pool = get_connection_pool()
+    first = get_db_connection()
+    raw = first._conn
+    first.close()
+    second = get_db_connection()
+    assert second._conn is raw
+    second.close()
+    assert pool.hits >= 1
+
+def test_pool_counts_miss_for_concurrent_connections():
+    """Test a second connection is opened while the first is checked out."""
+    pool = get_connection_pool()
+    misses = pool.misses
+    first = get_db_connection()
+    second = get_db_connection()
+    assert second._conn is not first._conn
+    first.close()
+    second.close()
+    assert pool.misses >= misses + 1
+
+def test_pool_applies_pragmas():
+    """Test WAL mode and tuned PRAGMAs are applied to pooled connections."""
+    conn = get_db_connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert conn.execute('PRAGMA cache_size').fetchone()[0] == -16000
+    conn.close()
+
+def test_pool_rolls_back_uncommitted_work():
+    """Test uncommitted changes are discarded when a connection is returned."""
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT INTO books (title, author, isbn, total_copies, available_copies)
+        VALUES ('Pool Book', 'Author', '1111111111111', 1, 1)
+    ''')
+    conn.close()
+    conn = get_db_connection()
+    count = conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+    conn.close()
+    assert count == 0
+
+def test_pool_discards_connections_over_max_size():
+    """Test connections beyond the pool size are closed instead of kept."""
+    pool = get_connection_pool()
+    pool.max_size = 1
+    first = get_db_connection()
+    second = get_db_connection()
+    first.close()
+    second.close()
+    assert pool.stats()['idle'] == 1
+    assert pool.discarded == 1
+
+def test_closed_connection_cannot_be_used():
+    """Test using a connection after close raises like sqlite3 does."""
+    conn = get_db_connection()
+    conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+
+def test_reset_after_fork_opens_fresh_connections():
+    """Test pools inherited across fork are set aside, not reused or closed."""
+    conn = get_db_connection()
+    raw = conn._conn
+    conn.close()
+    inherited = get_connection_pool()
+    database.reset_connection_pools_after_fork()
+    try:
+        assert get_connection_pool() is not inherited
+        conn = get_db_connection()
+        assert conn._conn is not raw
+        conn.close()
+        assert raw.execute('SELECT 1').fetchone()[0] == 1
+    finally:
+        database._inherited_pools.remove(inherited)
+        inherited.close_all()
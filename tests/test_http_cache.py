@@ -0,0 +1,72 @@
+import pytest
+from app import create_app
+from database import insert_book, get_book_by_isbn, get_catalog_version, update_book_availability
+from http_cache import response_cache
+
+@pytest.fixture(autouse=True)
+def catalog(temp_database):
+    """Add two books to the fresh database and start with an empty response cache."""
+    insert_book("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    insert_book("Emma", "Jane Austen", "9780141439587", 3, 3)
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+def test_book_writes_bump_catalog_version():
+    """Test inserts and availability changes move the catalog version on."""
+    version, _ = get_catalog_version()
+    insert_book("1984", "George Orwell", "9780451524935", 1, 1)
+    assert get_catalog_version()[0] == version + 1
+    update_book_availability(get_book_by_isbn("9780451524935")["id"], -1)
+    assert get_catalog_version()[0] == version + 2
+
+@pytest.mark.parametrize("url", ['/catalog', '/search?q=dune&type=title', '/api/search?q=dune'])
+def test_repeat_request_is_not_modified(client, url):
+    """Test responses carry validators and a matching If-None-Match gets an empty 304."""
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('"')
+    assert first.last_modified is not None
+    assert first.cache_control.no_cache
+
+    second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.data == b''
+
+def test_cached_response_skips_the_view(client, monkeypatch):
+    """Test a repeat request for the same catalog version is served from the cache."""
+    first = client.get('/api/search?q=dune')
+    monkeypatch.setattr('routes.api_routes.search_books_in_catalog', pytest.fail)
+    second = client.get('/api/search?q=dune')
+    assert second.get_json() == first.get_json()
+
+def test_unrelated_change_keeps_etag_but_relevant_change_does_not(client):
+    """Test ETags follow the body, so only changes that show up in the response invalidate it."""
+    etag = client.get('/api/search?q=dune').headers['ETag']
+    insert_book("1984", "George Orwell", "9780451524935", 1, 1)
+    assert client.get('/api/search?q=dune', headers={'If-None-Match': etag}).status_code == 304
+
+    update_book_availability(get_book_by_isbn("9780441172719")["id"], -1)
+    response = client.get('/api/search?q=dune', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['available_copies'] == 1
+
+def test_flashed_messages_bypass_the_cache(client):
+    """Test the page after a borrow shows its message instead of a cached catalog."""
+    client.get('/catalog')
+    book_id = get_book_by_isbn("9780141439587")["id"]
+    response = client.post('/borrow', data={'patron_id': '123456', 'book_id': book_id}, follow_redirects=True)
+    assert 'Successfully borrowed' in response.get_data(as_text=True)
+
+def test_errors_and_streams_are_not_cached(client):
+    """Test 400s and streamed responses pass through without validators."""
+    assert 'ETag' not in client.get('/api/search').headers
+    assert 'ETag' not in client.get('/api/search?q=dune&stream=json').headers
+    assert response_cache.stats()['size'] == 0
+
+def test_cache_can_be_turned_off(temp_database):
+    """Test RESPONSE_CACHE=False renders every request without validators."""
+    client = create_app({'TESTING': True, 'RESPONSE_CACHE': False}).test_client()
+    response = client.get('/catalog')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
@@ -0,0 +1,64 @@
+import pytest
+import database
+import instrumentation
+from app import create_app
+from database import insert_book, get_book_by_isbn
+
+@pytest.fixture(autouse=True)
+def profiled_book(temp_database):
+    """Add one book to the fresh database and undo any instrumentation a test enables."""
+    insert_book("Profiled Book", "Test Author", "1234567890123", 3, 3)
+    yield
+    instrumentation.disable_instrumentation()
+
+def make_client(debug=True):
+    app = create_app({'TESTING': True, 'INSTRUMENTATION': True})
+    app.debug = debug
+    return app.test_client()
+
+def test_debug_headers_report_request_costs():
+    """Test debug responses carry query, connection, template and service timings."""
+    response = make_client().get('/catalog')
+    assert response.status_code == 200
+    assert int(response.headers['X-Query-Count']) >= 1
+    assert int(response.headers['X-DB-Checkouts']) >= 1
+    assert float(response.headers['X-Template-Time-Ms']) > 0
+    assert 'get_catalog_page;dur=' in response.headers['Server-Timing']
+
+def test_headers_are_omitted_outside_debug_mode():
+    """Test per-request headers are only added in debug mode."""
+    response = make_client(debug=False).get('/catalog')
+    assert 'X-Query-Count' not in response.headers
+
+def test_metrics_endpoint_reports_totals():
+    """Test /metrics aggregates requests, service calls, pool and cache stats."""
+    client = make_client(debug=False)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    client.post('/borrow', data={'patron_id': '123456', 'book_id': str(book_id)})
+    client.get(f'/api/late_fee/123456/{book_id}')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'library_http_requests_total{endpoint="borrowing.borrow_book",method="POST",status="302"} 1' in body
+    assert 'library_service_calls_total{function="borrow_book_by_patron"} 1' in body
+    assert 'library_service_calls_total{function="calculate_late_fee_for_book"} 1' in body
+    assert 'library_sql_queries_total{endpoint="api.get_late_fee"}' in body
+    assert 'library_db_pool_hits_total{database=' in body
+    assert 'library_book_cache_hits_total' in body
+
+def test_instrumentation_is_off_by_default():
+    """Test the app has no /metrics endpoint or timing headers unless enabled."""
+    app = create_app({'TESTING': True})
+    app.debug = True
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 404
+    assert 'X-Query-Count' not in client.get('/catalog').headers
+    assert database._query_observer is None
+
+def test_instrumentation_is_scoped_to_its_app():
+    """Test an instrumented app does not record requests served by another app."""
+    instrumented = make_client(debug=False)
+    plain = create_app({'TESTING': True}).test_client()
+    plain.get('/catalog')
+    body = instrumented.get('/metrics').get_data(as_text=True)
+    assert 'catalog.catalog' not in body
+    assert 'function="get_catalog_page"' not in body
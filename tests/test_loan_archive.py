@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+import pytest
+from app import create_app
+from database import (
+    get_db_connection, insert_book, get_book_by_isbn,
+    archive_returned_loans, get_archive_stats, get_patron_borrowing_history,
+    get_patron_counters, check_patron_counters
+)
+from models import to_timestamp
+from services.library_service import get_patron_status_report
+
+@pytest.fixture(autouse=True)
+def loans(temp_database):
+    """One book with an open loan, a recent return and two old late returns for patron 123456."""
+    insert_book("Archived Book", "Test Author", "1234567890123", 10, 10)
+    book_id = get_book_by_isbn("1234567890123")['id']
+    now = datetime.now()
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES ('123456', ?, ?, ?, ?)
+    ''', [
+        (book_id, to_timestamp(now), to_timestamp(now + timedelta(days=14)), None),
+        (book_id, to_timestamp(now - timedelta(days=30)), to_timestamp(now - timedelta(days=16)),
+         to_timestamp(now - timedelta(days=20))),
+        (book_id, to_timestamp(now - timedelta(days=420)), to_timestamp(now - timedelta(days=406)),
+         to_timestamp(now - timedelta(days=403))),
+        (book_id, to_timestamp(now - timedelta(days=500)), to_timestamp(now - timedelta(days=486)),
+         to_timestamp(now - timedelta(days=476)))
+    ])
+    conn.commit()
+    conn.close()
+
+def test_archive_moves_only_old_returned_loans():
+    """Test loans returned before the horizon move to the archive and others stay."""
+    assert archive_returned_loans(older_than_days=365) == 2
+    assert get_archive_stats() == {'borrow_records': 2, 'archived': 2}
+    assert archive_returned_loans(older_than_days=365) == 0
+
+def test_archive_runs_in_batches():
+    """Test every eligible loan is archived when the batch is smaller than the backlog."""
+    assert archive_returned_loans(older_than_days=10, batch_size=1) == 3
+    assert get_archive_stats() == {'borrow_records': 1, 'archived': 3}
+
+def test_history_includes_archived_loans():
+    """Test the borrowing history reads both tables, newest first."""
+    before = get_patron_borrowing_history("123456")
+    archive_returned_loans(older_than_days=10)
+    after = get_patron_borrowing_history("123456")
+    assert after == before
+    assert len(after) == 4
+    assert after[0]['return_date'] is None
+
+def test_archive_keeps_counters_consistent():
+    """Test archiving leaves patron counters unchanged and the checker agrees."""
+    counters = get_patron_counters("123456")
+    archive_returned_loans(older_than_days=10)
+    assert get_patron_counters("123456") == counters
+    assert check_patron_counters() == []
+    assert check_patron_counters(repair=True) == []
+    assert get_patron_counters("123456") == counters
+
+def test_status_report_shows_archived_history():
+    """Test the status report history is unchanged by archiving."""
+    archive_returned_loans(older_than_days=10)
+    report = get_patron_status_report("123456")
+    assert len(report['borrowing_history']) == 4
+    assert report['num_books_borrowed'] == 1
+
+def test_archive_loans_command():
+    """Test flask archive-loans applies the --older-than-days horizon."""
+    runner = create_app({'TESTING': True}).test_cli_runner()
+    result = runner.invoke(args=['archive-loans', '--older-than-days', '450'])
+    assert result.exit_code == 0
+    assert "Archived 1 loans" in result.output
+    assert get_archive_stats()['archived'] == 1
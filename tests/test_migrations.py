@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import pytest
+import database
+from database import (
+    init_database, get_db_connection, migrate_database, get_schema_version, SCHEMA_VERSION,
+    insert_book, get_book_by_isbn, insert_borrow_record, get_patron_borrow_count,
+    get_patron_borrowed_books, get_patron_borrowing_history, update_borrow_record_return_date,
+    borrow_book_transaction, return_book_transaction
+)
+
+pytestmark = pytest.mark.usefixtures('empty_database')
+
+def index_names():
+    conn = get_db_connection()
+    names = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return names
+
+def test_init_database_applies_all_migrations():
+    """Test a new database is migrated to the latest schema version."""
+    init_database()
+    assert get_schema_version() == SCHEMA_VERSION
+    assert {'idx_borrow_records_open_by_patron', 'idx_borrow_records_patron_borrow_date'} <= index_names()
+
+def test_migrations_are_incremental_and_idempotent():
+    """Test migrating step by step and re-running migrations is safe."""
+    assert migrate_database(target_version=1) == 1
+    assert 'idx_borrow_records_open_by_patron' not in index_names()
+    assert migrate_database() == SCHEMA_VERSION
+    assert migrate_database() == SCHEMA_VERSION
+    assert 'idx_borrow_records_open_by_patron' in index_names()
+
+def test_failed_migration_keeps_previous_version(monkeypatch):
+    """Test a migration that raises is rolled back without bumping the version."""
+    migrate_database(target_version=1)
+
+    def broken_migration(conn):
+        conn.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(database, 'MIGRATIONS', [database.MIGRATIONS[0], broken_migration])
+    with pytest.raises(RuntimeError):
+        migrate_database(target_version=2)
+    assert get_schema_version() == 1
+    conn = get_db_connection()
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    conn.close()
+
+def test_hot_borrow_record_queries_use_indexes(traced_statements):
+    """Test every borrow_records statement issued by the patron helpers is an index search, not a scan."""
+    init_database()
+    insert_book("Indexed Book", "Test Author", "1234567890123", 5, 5)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    now = datetime.now()
+    insert_borrow_record("123456", book_id, now, now + timedelta(days=14))
+
+    traced_statements.clear()
+    get_patron_borrow_count("123456")
+    get_patron_borrowed_books("123456")
+    get_patron_borrowing_history("123456")
+    borrow_book_transaction("123456", book_id, now, now + timedelta(days=14), borrow_limit=5)
+    return_book_transaction("123456", book_id, now)
+    update_borrow_record_return_date("123456", book_id, now)
+
+    hot_queries = [sql for sql in traced_statements
+                   if 'borrow_records' in sql and not sql.lstrip().upper().startswith('INSERT')]
+    assert hot_queries
+
+    conn = get_db_connection()
+    for sql in hot_queries:
+        plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        assert not [detail for detail in plan if detail.startswith('SCAN')], (sql, plan)
+        if 'return_date IS NULL' in sql and sql.lstrip().upper().startswith('SELECT'):
+            assert any('idx_borrow_records_open_by_patron' in detail for detail in plan), (sql, plan)
+    conn.close()
+
+def test_epoch_migration_converts_loan_dates():
+    """Test upgrading ISO-8601 loan dates to epoch seconds keeps dates, ids, counters and triggers."""
+    migrate_database(target_version=5)
+    insert_book("Dated Book", "Test Author", "1234567890123", 5, 5)
+    book_id = get_book_by_isbn("1234567890123")["id"]
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES ('123456', ?, ?, ?, ?)
+    ''', [
+        (book_id, '2026-01-01T09:30:00.250000', '2026-01-15T09:30:00.250000', None),
+        (book_id, '2025-12-01T12:00:00', '2025-12-15T12:00:00', '2025-12-25T12:00:00')
+    ])
+    conn.execute("DELETE FROM borrow_records WHERE id = 2")
+    conn.commit()
+    conn.close()
+    
+    migrate_database()
+    conn = get_db_connection()
+    rows = conn.execute('SELECT id, borrow_date, due_date, return_date FROM borrow_records').fetchall()
+    conn.close()
+    assert [tuple(row) for row in rows] == [(1, 1767259800, 1768469400, None)]
+    history = get_patron_borrowing_history("123456")
+    assert history[0]['due_date'] == datetime(2026, 1, 15, 9, 30)
+    assert database.get_patron_counters("123456") == {'active_loans': 1, 'outstanding_fees': 6.5}
+    
+    # The AUTOINCREMENT sequence survives the rebuild, and the recreated triggers use epoch math
+    insert_borrow_record("123456", book_id, datetime(2026, 2, 1), datetime(2026, 2, 15))
+    # Returns both open loans: 36 days late (15.00) and 5 days late (2.50)
+    update_borrow_record_return_date("123456", book_id, datetime(2026, 2, 20, 12))
+    conn = get_db_connection()
+    assert conn.execute('SELECT MAX(id) FROM borrow_records').fetchone()[0] == 3
+    conn.close()
+    assert database.get_patron_counters("123456") == {'active_loans': 0, 'outstanding_fees': 24.0}
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import pytest
+from app import create_app
+from database import (
+    get_db_connection, insert_book, get_book_by_isbn, insert_borrow_record,
+    refresh_overdue_loans, update_borrow_record_return_date, get_patron_borrowing_history
+)
+from services.library_service import calculate_late_fee_for_book, get_patron_status_report
+from services.overdue_scheduler import OverdueScheduler
+
+@pytest.fixture(autouse=True)
+def book(temp_database):
+    insert_book("Overdue Book", "Test Author", "1234567890123", 10, 10)
+
+def book_id():
+    return get_book_by_isbn("1234567890123")["id"]
+
+def overdue_rows():
+    conn = get_db_connection()
+    rows = conn.execute('SELECT loan_id, days_overdue, late_fee FROM overdue_loans ORDER BY loan_id').fetchall()
+    conn.close()
+    return [tuple(row) for row in rows]
+
+def test_refresh_materializes_overdue_fees():
+    """Test a refresh records the late fee of every open loan past due, and only those."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    insert_borrow_record("123456", book_id(), now - timedelta(days=2), now + timedelta(days=12))
+    result = refresh_overdue_loans()
+    assert result['newly_overdue'] == 1
+    assert result['overdue_loans'] == 1
+    assert overdue_rows() == [(1, 10, 6.5)]
+
+def test_refresh_scans_only_loans_due_since_watermark(traced_statements):
+    """Test later runs only pick up newly overdue loans and reassess the known ones."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    insert_borrow_record("123456", book_id(), now - timedelta(days=2), now + timedelta(days=3, hours=1))
+    refresh_overdue_loans(now)
+    assert refresh_overdue_loans(now + timedelta(days=1))['newly_overdue'] == 0
+    result = refresh_overdue_loans(now + timedelta(days=5))
+    assert result['newly_overdue'] == 1
+    assert overdue_rows() == [(1, 15, 11.5), (2, 1, 0.5)]
+    
+    scan = next(sql for sql in traced_statements if 'FROM borrow_records' in sql and 'due_date >' in sql)
+    conn = get_db_connection()
+    plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + scan,
+                                                  {'watermark': 0, 'as_of': 0})]
+    conn.close()
+    assert any('idx_borrow_records_open_due_date' in detail for detail in plan), plan
+
+def test_returned_and_backdated_loans():
+    """Test returns leave overdue_loans and loans recorded already overdue join it."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    refresh_overdue_loans()
+    insert_borrow_record("654321", book_id(), now - timedelta(days=20), now - timedelta(days=6, hours=1))
+    assert overdue_rows() == [(1, 10, 6.5), (2, 6, 3.0)]
+    update_borrow_record_return_date("123456", book_id(), now)
+    assert overdue_rows() == [(2, 6, 3.0)]
+
+def test_readers_use_current_assessments():
+    """Test the late fee API and status report read the scheduler's fees while they are current."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    refresh_overdue_loans()
+    conn = get_db_connection()
+    conn.execute('UPDATE overdue_loans SET late_fee = 9.0')
+    conn.commit()
+    conn.close()
+    assert calculate_late_fee_for_book("123456", book_id())["fee_amount"] == 9.0
+    assert get_patron_status_report("123456")['total_late_fees'] == 9.0
+
+def test_readers_recompute_stale_assessments():
+    """Test fees assessed too long ago are recomputed from the due date."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    refresh_overdue_loans(now - timedelta(days=2))
+    assert get_patron_borrowing_history("123456")[0]['late_fee'] is None
+    result = calculate_late_fee_for_book("123456", book_id())
+    assert (result["fee_amount"], result["days_overdue"]) == (6.5, 10)
+
+def test_scheduler_thread_refreshes():
+    """Test the background scheduler runs a refresh as soon as it starts."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    scheduler = OverdueScheduler(interval=60)
+    scheduler.start()
+    scheduler.stop(timeout=10)
+    assert scheduler.runs == 1
+    assert overdue_rows() == [(1, 10, 6.5)]
+
+def test_refresh_overdue_loans_command():
+    """Test flask refresh-overdue-loans runs one refresh."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    runner = create_app({'TESTING': True, 'SAMPLE_DATA_ON_STARTUP': False}).test_cli_runner()
+    result = runner.invoke(args=['refresh-overdue-loans'])
+    assert result.exit_code == 0
+    assert "1 newly overdue" in result.output
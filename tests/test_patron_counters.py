@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+import pytest
+import database
+from database import (
+    get_db_connection, insert_book, get_book_by_isbn, insert_borrow_record,
+    update_borrow_record_return_date, get_patron_counters, get_patron_borrow_count,
+    check_patron_counters, migrate_database
+)
+from unittest.mock import Mock
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, pay_late_fees, calculate_late_fee_for_book,
+    get_patron_status_report
+)
+
+@pytest.fixture(autouse=True)
+def counted_book(temp_database):
+    """Add one book to the fresh database."""
+    insert_book("Counted Book", "Test Author", "1234567890123", 10, 10)
+
+def book_id():
+    return get_book_by_isbn("1234567890123")['id']
+
+def test_borrow_and_return_maintain_active_loans():
+    """Test the borrow and return paths keep the active loan counter in step."""
+    assert borrow_book_by_patron("123456", book_id())[0]
+    assert borrow_book_by_patron("123456", book_id())[0]
+    assert get_patron_borrow_count("123456") == 2
+    assert return_book_by_patron("123456", book_id())[0]
+    assert get_patron_counters("123456") == {'active_loans': 1, 'outstanding_fees': 0.0}
+
+def test_late_return_adds_outstanding_fee():
+    """Test returning an overdue loan adds its late fee to the patron's total."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10))
+    update_borrow_record_return_date("123456", book_id(), now)
+    assert get_patron_counters("123456") == {'active_loans': 0, 'outstanding_fees': 6.5}
+
+def test_fee_paid_before_return_is_not_owed():
+    """Test a late fee paid while the loan is open is not added to outstanding fees."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    gateway = Mock()
+    gateway.process_payment.return_value = (True, "txn_123", "Paid")
+    assert pay_late_fees("123456", book_id(), gateway)[0]
+    assert return_book_by_patron("123456", book_id())[0]
+    assert get_patron_counters("123456") == {'active_loans': 0, 'outstanding_fees': 0.0}
+    assert check_patron_counters() == []
+
+def test_late_fee_is_only_paid_once():
+    """Test a paid late fee is not charged again while the loan stays open."""
+    now = datetime.now()
+    insert_borrow_record("123456", book_id(), now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    gateway = Mock()
+    gateway.process_payment.return_value = (True, "txn_123", "Paid")
+    assert pay_late_fees("123456", book_id(), gateway)[0]
+    assert calculate_late_fee_for_book("123456", book_id())['fee_amount'] == 0.0
+    assert get_patron_status_report("123456")['total_late_fees'] == 0.0
+    assert pay_late_fees("123456", book_id(), gateway) == (False, "No late fees to pay for this book.", None)
+    assert gateway.process_payment.call_count == 1
+
+def test_limit_check_reads_counter():
+    """Test the borrow limit is enforced from the patrons counter."""
+    conn = get_db_connection()
+    conn.execute("INSERT INTO patrons (patron_id, active_loans) VALUES ('654321', 6)")
+    conn.commit()
+    conn.close()
+    success, message = borrow_book_by_patron("654321", book_id())
+    assert not success
+    assert "maximum borrowing limit" in message
+
+def test_unknown_patron_has_zero_counters():
+    """Test a patron with no loans reads as zero without a patrons row."""
+    assert get_patron_counters("999999") == {'active_loans': 0, 'outstanding_fees': 0.0}
+
+def test_checker_reports_and_repairs_drift():
+    """Test the consistency checker finds drifted counters and rebuilds them."""
+    borrow_book_by_patron("123456", book_id())
+    conn = get_db_connection()
+    conn.execute("UPDATE patrons SET active_loans = 4 WHERE patron_id = '123456'")
+    conn.execute("INSERT INTO patrons (patron_id, active_loans) VALUES ('111111', 2)")
+    conn.commit()
+    conn.close()
+    
+    mismatches = check_patron_counters()
+    assert {row['patron_id'] for row in mismatches} == {'123456', '111111'}
+    assert get_patron_borrow_count("123456") == 4
+    
+    check_patron_counters(repair=True)
+    assert check_patron_counters() == []
+    assert get_patron_borrow_count("123456") == 1
+    assert get_patron_borrow_count("111111") == 0
+
+def test_migration_builds_counters_from_existing_loans(tmp_path, monkeypatch):
+    """Test upgrading a database with loans fills in the counters."""
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'upgrade_test.db'))
+    migrate_database(target_version=2)
+    now = datetime.now()
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES (?, 1, ?, ?, ?)
+    ''', [
+        ('123456', now.isoformat(), (now + timedelta(days=14)).isoformat(), None),
+        ('123456', (now - timedelta(days=40)).isoformat(), (now - timedelta(days=26)).isoformat(),
+         (now - timedelta(days=6)).isoformat())
+    ])
+    conn.commit()
+    conn.close()
+    migrate_database()
+    assert get_patron_counters("123456") == {'active_loans': 1, 'outstanding_fees': 15.0}
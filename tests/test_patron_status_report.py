@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import pytest
+from storage import insert_book, get_book_by_isbn, insert_borrow_record
+from services.library_service import get_patron_status_report, return_book_by_patron
+
+@pytest.fixture(autouse=True)
+def loans(repository):
+    """Put two books on loan to one patron in an empty store of each engine."""
+    insert_book("Overdue Book", "Test Author", "1111111111111", 2, 2)
+    insert_book("Returned Book", "Test Author", "2222222222222", 1, 1)
+    now = datetime.now()
+    overdue_id = get_book_by_isbn("1111111111111")["id"]
+    returned_id = get_book_by_isbn("2222222222222")["id"]
+    insert_borrow_record("123456", overdue_id, now - timedelta(days=24), now - timedelta(days=10, hours=1))
+    insert_borrow_record("123456", overdue_id, now - timedelta(days=2), now + timedelta(days=12))
+    insert_borrow_record("123456", returned_id, now - timedelta(days=30), now - timedelta(days=16, hours=1))
+    return_book_by_patron("123456", returned_id)
+
+def test_status_report_uses_one_loan_query(storage_engine, traced_statements):
+    """Test the report is built from one loan query plus the patron counter lookup."""
+    if storage_engine != 'sqlite':
+        pytest.skip("only the SQLite engine runs queries")
+    get_patron_status_report("123456")
+    assert len(traced_statements) == 2
+    assert 'FROM patrons' in traced_statements[1]
+
+def test_status_report_fees_per_loan():
+    """Test each open loan gets its own fee and open loans are listed oldest first."""
+    report = get_patron_status_report("123456")
+    assert report['num_books_borrowed'] == 2
+    assert [book['late_fee'] for book in report['currently_borrowed']] == [6.5, 0.0]
+    assert [book['days_overdue'] for book in report['currently_borrowed']] == [10, 0]
+    assert report['total_late_fees'] == 6.5
+    assert report['outstanding_fees'] == 12.5
+    assert report['borrowing_limit_remaining'] == 3
+
+def test_status_report_history_includes_returned_loans():
+    """Test history lists every loan newest first with return status."""
+    report = get_patron_status_report("123456")
+    history = report['borrowing_history']
+    assert len(history) == 3
+    assert [item['status'] for item in history] == ['Currently Borrowed', 'Currently Borrowed', 'Returned']
+    assert history[2]['was_overdue'] == True
+    assert history[2]['days_late'] == 16
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import pytest
+from database import (
+    get_db_connection, insert_book, get_book_by_isbn, insert_borrow_record,
+    get_patron_borrowed_books, get_patron_borrowing_history, search_books
+)
+from models import Book, BorrowRecord
+
+@pytest.fixture(autouse=True)
+def loan(temp_database):
+    """One book with an open, overdue loan."""
+    insert_book("Model Book", "Test Author", "1234567890123", 2, 2)
+    now = datetime.now()
+    insert_borrow_record("123456", get_book_by_isbn("1234567890123")["id"],
+                         now - timedelta(days=20), now - timedelta(days=6))
+
+def test_book_fields_match_table_columns():
+    """Test Book is built positionally from the books columns in table order."""
+    conn = get_db_connection()
+    columns = tuple(row['name'] for row in conn.execute('PRAGMA table_info(books)'))
+    conn.close()
+    assert columns == Book.fields
+
+def test_book_reads_like_a_dict():
+    """Test key, attribute and dict() access all return the row's values."""
+    book = search_books("Model", "title")[0]
+    assert isinstance(book, Book)
+    assert book['title'] == book.title == "Model Book"
+    assert dict(book) == {'id': book.id, 'title': "Model Book", 'author': "Test Author",
+                          'isbn': "1234567890123", 'total_copies': 2, 'available_copies': 2}
+    assert book == dict(book)
+    assert book.get('missing') is None
+    with pytest.raises(KeyError):
+        book['missing']
+
+def test_book_fields_can_be_assigned_but_not_added():
+    """Test existing keys can be updated in place while the key set stays fixed."""
+    book = get_book_by_isbn("1234567890123")
+    book['available_copies'] -= 1
+    assert book.available_copies == 1
+    with pytest.raises(KeyError):
+        book['shelf'] = 'A1'
+
+def test_borrow_record_dates_are_parsed_lazily():
+    """Test dates stay as stored epoch seconds until they are first read."""
+    record = get_patron_borrowed_books("123456")[0]
+    assert isinstance(record, BorrowRecord)
+    assert isinstance(record._due_date, int)
+    assert isinstance(record.due_date, datetime)
+    assert isinstance(record._due_date, datetime)
+    assert record['is_overdue'] is True
+    assert record['return_date'] is None
+
+def test_history_records_convert_to_dicts():
+    """Test history records expose the same keys the status report reads."""
+    record = get_patron_borrowing_history("123456")[0]
+    assert set(dict(record)) >= {'book_id', 'title', 'author', 'borrow_date', 'due_date', 'return_date'}
+
+def test_api_serializes_row_models(client):
+    """Test JSON endpoints serialize books built by the row factory."""
+    response = client.get('/api/search?q=Model&type=title')
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['isbn'] == "1234567890123"
@@ -0,0 +1,74 @@
+import pytest
+import database
+from database import (
+    init_database, get_db_connection, insert_book, search_books
+)
+from services.library_service import search_books_in_catalog
+
+@pytest.fixture(autouse=True)
+def books(temp_database):
+    """Add a few books to the fresh database."""
+    insert_book("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 3, 3)
+    insert_book("Great Expectations", "Charles Dickens", "9780141439563", 2, 2)
+    insert_book("1984", "George Orwell", "9780451524935", 1, 1)
+
+def test_search_title_word_prefix_case_insensitive():
+    """Test title search matches word prefixes regardless of case."""
+    titles = {book["title"] for book in search_books_in_catalog("GREA", "title")}
+    assert titles == {"The Great Gatsby", "Great Expectations"}
+
+def test_search_title_all_words_required():
+    """Test every word in a multi-word search must match."""
+    results = search_books_in_catalog("great gats", "title")
+    assert [book["title"] for book in results] == ["The Great Gatsby"]
+
+def test_search_author_does_not_match_title():
+    """Test author search is restricted to the author column."""
+    assert search_books_in_catalog("great", "author") == []
+    assert search_books_in_catalog("dick", "author")[0]["title"] == "Great Expectations"
+
+def test_search_index_follows_inserts_updates_and_deletes():
+    """Test the triggers keep the search index in sync with books."""
+    insert_book("Animal Farm", "George Orwell", "9780451526342", 1, 1)
+    assert len(search_books("orwell", "author")) == 2
+
+    conn = get_db_connection()
+    conn.execute("UPDATE books SET title = 'Nineteen Eighty-Four' WHERE isbn = '9780451524935'")
+    conn.execute("DELETE FROM books WHERE isbn = '9780451526342'")
+    conn.commit()
+    conn.close()
+
+    assert [book["title"] for book in search_books("nineteen", "title")] == ["Nineteen Eighty-Four"]
+    assert search_books("1984", "title") == []
+    assert len(search_books("orwell", "author")) == 1
+
+def test_search_ignores_fts_syntax_in_term():
+    """Test FTS operators in user input are treated as plain words."""
+    assert search_books_in_catalog('great" OR "x', "title") == []
+    assert search_books_in_catalog("***", "title") == []
+
+def test_search_isbn_uses_unique_index():
+    """Test ISBN lookups are exact and served by the unique index."""
+    assert search_books_in_catalog("978074327356", "isbn") == []
+    assert search_books_in_catalog("9780743273565", "isbn")[0]["title"] == "The Great Gatsby"
+    conn = get_db_connection()
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM books WHERE isbn = ?", ("9780743273565",)).fetchall()
+    conn.close()
+    assert any("USING INDEX" in row["detail"] for row in plan)
+
+def test_search_index_built_for_existing_books(tmp_path, monkeypatch):
+    """Test books inserted before the index existed are still searchable."""
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'legacy.db'))
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, author TEXT NOT NULL,
+            isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, available_copies INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                 "VALUES ('Old Book', 'Old Author', '1111111111111', 1, 1)")
+    conn.commit()
+    conn.close()
+    init_database()
+    assert search_books("old", "title")[0]["isbn"] == "1111111111111"
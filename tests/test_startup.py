@@ -0,0 +1,52 @@
+import subprocess
+import sys
+import pytest
+import database
+from app import create_app
+from database import (
+    get_schema_version, check_schema_version, init_database, SCHEMA_VERSION
+)
+
+pytestmark = pytest.mark.usefixtures('empty_database')
+
+def book_count():
+    conn = database.get_db_connection()
+    count = conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+    conn.close()
+    return count
+
+def test_create_app_migrates_and_seeds_by_default():
+    """Test the default app factory still migrates and adds sample data."""
+    create_app({'TESTING': True})
+    assert get_schema_version() == SCHEMA_VERSION
+    assert book_count() == 3
+
+def test_create_app_can_skip_startup_work():
+    """Test migrations and sample data can be left to the CLI commands."""
+    create_app({'TESTING': True, 'MIGRATE_ON_STARTUP': False, 'SAMPLE_DATA_ON_STARTUP': False})
+    assert get_schema_version() == 0
+
+def test_cli_commands_migrate_and_seed():
+    """Test flask migrate-db and seed-sample-data prepare the database."""
+    app = create_app({'TESTING': True, 'MIGRATE_ON_STARTUP': False, 'SAMPLE_DATA_ON_STARTUP': False})
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['migrate-db'])
+    assert result.exit_code == 0
+    assert get_schema_version() == SCHEMA_VERSION
+    result = runner.invoke(args=['seed-sample-data'])
+    assert result.exit_code == 0
+    assert book_count() == 3
+
+def test_check_schema_version_requires_migrated_database():
+    """Test serving refuses to start on a database that has not been migrated."""
+    with pytest.raises(RuntimeError):
+        check_schema_version()
+    init_database()
+    check_schema_version()
+
+def test_payment_gateway_is_imported_lazily():
+    """Test loading the app does not import the payment gateway or requests."""
+    code = ("import sys, app; "
+            "print('requests' in sys.modules or 'services.payment_service' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == 'False'
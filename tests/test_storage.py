@@ -0,0 +1,166 @@
+import io
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+import pytest
+from app import create_app
+from storage import MemoryRepository, create_repository
+from services.import_service import import_books_from_stream
+from services.library_service import (
+    add_book_to_catalog, get_catalog_page, borrow_book_by_patron, return_book_by_patron,
+    borrow_books_by_patron, return_books_by_patron, calculate_late_fee_for_book, assess_late_fees,
+    search_books_in_catalog, search_catalog_branches, iter_catalog, get_patron_status_report, pay_late_fees, get_book_by_isbn
+)
+
+# Tests using the repository or storage_engine fixtures (conftest.py) run once per storage engine
+
+@pytest.fixture
+def book_ids(repository):
+    """Add three books; the last has no copies left."""
+    repository.insert_book("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 3, 3)
+    repository.insert_book("Great Expectations", "Charles Dickens", "9780141439563", 2, 2)
+    repository.insert_book("1984", "George Orwell", "9780451524935", 1, 0)
+    return [repository.get_book_by_isbn(isbn).id for isbn in ("9780743273565", "9780141439563", "9780451524935")]
+
+def test_add_book_rejects_duplicate_isbn(repository):
+    """Test R1 adds a book once and refuses its ISBN a second time."""
+    assert add_book_to_catalog("Dune", "Frank Herbert", "9780441172719", 2)[0] == True
+    assert add_book_to_catalog("Dune", "Frank Herbert", "9780441172719", 2) == (
+        False, "A book with this ISBN already exists."
+    )
+    assert get_book_by_isbn("9780441172719")["available_copies"] == 2
+
+def test_catalog_pages_follow_cursors(repository):
+    """Test R2 pages through the catalog in title order both ways."""
+    for i in range(5):
+        repository.insert_book(f"Book {i}", "Author", f"978000000000{i}", 1, 1)
+    first = get_catalog_page(page_size=2)
+    assert [book["title"] for book in first['books']] == ["Book 0", "Book 1"]
+    assert first['prev_cursor'] is None
+    second = get_catalog_page(after=first['next_cursor'], page_size=2)
+    assert [book["title"] for book in second['books']] == ["Book 2", "Book 3"]
+    last = get_catalog_page(after=second['next_cursor'], page_size=2)
+    assert [book["title"] for book in last['books']] == ["Book 4"]
+    assert last['next_cursor'] is None
+    back = get_catalog_page(before=second['prev_cursor'], page_size=2)
+    assert [book["title"] for book in back['books']] == ["Book 0", "Book 1"]
+    assert back['prev_cursor'] is None
+
+def test_borrow_and_return_update_availability(book_ids):
+    """Test R3 and R4 move a copy out and back and refuse what they should."""
+    gatsby, _, nineteen_eighty_four = book_ids
+    assert borrow_book_by_patron("123456", gatsby)[0] == True
+    assert get_book_by_isbn("9780743273565")["available_copies"] == 2
+    assert borrow_book_by_patron("123456", nineteen_eighty_four) == (False, "This book is currently not available.")
+    assert borrow_book_by_patron("123456", 999) == (False, "Book not found.")
+    assert return_book_by_patron("654321", gatsby) == (False, "Book has not been borrowed by this patron.")
+    assert return_book_by_patron("123456", gatsby)[0] == True
+    assert get_book_by_isbn("9780743273565")["available_copies"] == 3
+
+def test_borrow_limit(repository):
+    """Test a patron is refused once they hold more than five books."""
+    repository.insert_book("Middlemarch", "George Eliot", "9780141439549", 10, 10)
+    book_id = repository.get_book_by_isbn("9780141439549").id
+    assert [borrow_book_by_patron("123456", book_id)[0] for _ in range(7)] == [True] * 6 + [False]
+    assert get_patron_status_report("123456")['borrowing_limit_remaining'] == 0
+
+def test_batch_borrow_and_return(book_ids):
+    """Test batch requests report a result per book."""
+    gatsby, expectations, nineteen_eighty_four = book_ids
+    report = borrow_books_by_patron("123456", [gatsby, expectations, nineteen_eighty_four, 999])
+    assert [result['success'] for result in report['results']] == [True, True, False, False]
+    report = return_books_by_patron("123456", [gatsby, gatsby, expectations])
+    assert [result['success'] for result in report['results']] == [True, False, True]
+    assert get_book_by_isbn("9780141439563")["available_copies"] == 2
+
+def test_late_fees_and_outstanding_balance(repository, book_ids):
+    """Test R5 fees on an open loan, the bulk totals, and the fee owed after a late return."""
+    gatsby = book_ids[0]
+    now = datetime.now()
+    repository.insert_borrow_record("123456", gatsby, now - timedelta(days=20), now - timedelta(days=6, hours=1))
+    fee = calculate_late_fee_for_book("123456", gatsby)
+    assert (fee['fee_amount'], fee['days_overdue']) == (3.0, 6)
+    totals = assess_late_fees()
+    assert totals['by_patron']["123456"] == {'fee_total': 3.0, 'overdue_loans': 1}
+    assert totals['by_book'][gatsby] == {'fee_total': 3.0, 'overdue_loans': 1}
+
+    gateway = Mock()
+    gateway.process_payment.return_value = (True, "txn_1", "Paid")
+    assert pay_late_fees("123456", gatsby, gateway)[0] == True
+    assert return_book_by_patron("123456", gatsby)[0] == True
+    assert get_patron_status_report("123456")['outstanding_fees'] == 0.0
+
+    repository.insert_borrow_record("123456", gatsby, now - timedelta(days=30), now - timedelta(days=10, hours=1))
+    assert return_book_by_patron("123456", gatsby)[1].endswith("late fee is $6.50.")
+    assert get_patron_status_report("123456")['outstanding_fees'] == 6.5
+
+def test_search(book_ids):
+    """Test R6 word-prefix title and author search and exact ISBN search."""
+    assert {book["title"] for book in search_books_in_catalog("GREA", "title")} == {
+        "The Great Gatsby", "Great Expectations"
+    }
+    assert [book["title"] for book in search_books_in_catalog("great gats", "title")] == ["The Great Gatsby"]
+    assert search_books_in_catalog("great", "author") == []
+    assert search_books_in_catalog("dick", "author")[0]["title"] == "Great Expectations"
+    assert search_books_in_catalog("978074327356", "isbn") == []
+    assert search_books_in_catalog("9780743273565", "isbn")[0]["title"] == "The Great Gatsby"
+    assert search_books_in_catalog("***", "title") == []
+
+def test_search_splits_words_at_underscores(repository):
+    """Test both engines treat underscores as word separators, in the search term and in the catalog."""
+    repository.insert_book("Snake Case Style", "Guido van_Rossum", "9780000000001", 1, 1)
+    for term, search_type in (("snake_case", "title"), ("case_sna", "title"), ("rossum", "author")):
+        assert [book["title"] for book in search_books_in_catalog(term, search_type)] == ["Snake Case Style"]
+    assert search_books_in_catalog("___", "title") == []
+
+def test_branch_search_without_branches(book_ids):
+    """Test a cross-branch search covers the one catalog when no branches are configured."""
+    results = search_catalog_branches("great", "title")
+    assert [(book["title"], book["branch"]) for book in results] == [
+        ("Great Expectations", None), ("The Great Gatsby", None)
+    ]
+    with pytest.raises(ValueError):
+        search_catalog_branches("great", "title", ["north"])
+
+def test_patron_status_report(book_ids):
+    """Test R7 lists current loans and the borrowing history."""
+    gatsby, expectations, _ = book_ids
+    borrow_book_by_patron("123456", gatsby)
+    borrow_book_by_patron("123456", expectations)
+    return_book_by_patron("123456", gatsby)
+    report = get_patron_status_report("123456")
+    assert [book['title'] for book in report['currently_borrowed']] == ["Great Expectations"]
+    assert {item['status'] for item in report['borrowing_history']} == {'Returned', 'Currently Borrowed'}
+    assert report['borrowing_limit_remaining'] == 4
+
+def test_import_and_export(repository):
+    """Test a CSV import skips ISBNs already present and the export lists every book."""
+    repository.insert_book("Dune", "Frank Herbert", "9780441172719", 1, 1)
+    csv = ("title,author,isbn,total_copies\n"
+           "Dune,Frank Herbert,9780441172719,1\n"
+           "Emma,Jane Austen,9780141439587,2\n")
+    report = import_books_from_stream(io.StringIO(csv), 'csv')
+    assert (report['inserted'], report['rejected']) == (1, 1)
+    assert [book["title"] for book in iter_catalog()] == ["Dune", "Emma"]
+
+def test_catalog_page_is_revalidated_after_a_borrow(storage_engine):
+    """Test the app serves the selected engine and its ETag changes when the catalog does."""
+    app = create_app({'TESTING': True, 'STORAGE': storage_engine})
+    client = app.test_client()
+    add_book_to_catalog("Dune", "Frank Herbert", "9780441172719", 1)
+    response = client.get('/catalog')
+    assert 'Dune' in response.get_data(as_text=True)
+    assert client.get('/catalog', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    borrow_book_by_patron("123456", get_book_by_isbn("9780441172719")["id"])
+    changed = client.get('/catalog', headers={'If-None-Match': response.headers['ETag']})
+    assert changed.status_code == 200
+    assert 'Not Available' in changed.get_data(as_text=True)
+
+def test_memory_engine_stores_are_separate():
+    """Test each memory store starts empty and keeps its own books."""
+    first, second = MemoryRepository(), create_repository('memory')
+    first.insert_book("Dune", "Frank Herbert", "9780441172719", 1, 1)
+    assert second.get_book_by_isbn("9780441172719") is None
+    assert first.location() != second.location()
+    with pytest.raises(ValueError):
+        create_repository('postgres')
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import pytest
+from database import (
+    insert_book, insert_books_batch, search_books, iter_search_books, iter_all_books,
+    get_connection_pool, get_db_connection, invalidate_book_cache
+)
+from services.export_service import iter_json_document
+
+@pytest.fixture(autouse=True)
+def catalog(temp_database):
+    """Add a catalog with several books matching 'the'."""
+    insert_books_batch([
+        (f"The Book {i}", f"Author {i}", f"9780000000{i:03d}", 2) for i in range(12)
+    ])
+    insert_book("Dune", "Frank Herbert", "9780441172719", 4, 3)
+
+def test_iter_search_books_matches_search_across_batches():
+    """Test small fetch batches yield the same books in the same order as a buffered search."""
+    streamed = [book['id'] for book in iter_search_books("the book", "title", batch_size=5)]
+    assert streamed == [book['id'] for book in search_books("the book", "title")]
+    assert len(streamed) == 12
+
+def test_abandoned_search_stream_returns_its_connection():
+    """Test closing a partly read stream releases the pooled connection."""
+    pool = get_connection_pool()
+    results = iter_search_books("the", "title", batch_size=2)
+    next(results)
+    idle = pool.stats()['idle']
+    results.close()
+    assert pool.stats()['idle'] == idle + 1
+
+def test_iter_all_books_walks_catalog_in_id_order():
+    """Test the keyset export covers every book exactly once."""
+    ids = [book['id'] for book in iter_all_books(batch_size=5)]
+    assert ids == sorted(ids)
+    assert len(ids) == 13
+
+def test_json_document_without_results():
+    """Test an empty stream still encodes a valid document."""
+    body = ''.join(iter_json_document({'q': 'x'}, []))
+    assert json.loads(body) == {'q': 'x', 'results': [], 'count': 0}
+
+def test_streamed_search_matches_buffered_response(client):
+    """Test ?stream=json returns the same document as the buffered endpoint."""
+    buffered = client.get('/api/search?q=the&type=title')
+    streamed = client.get('/api/search?q=the&type=title&stream=json')
+    assert streamed.is_streamed
+    assert streamed.mimetype == 'application/json'
+    assert json.loads(streamed.get_data(as_text=True)) == buffered.get_json()
+
+def test_streamed_search_as_json_lines(client):
+    """Test ?stream=jsonl returns one book per line."""
+    response = client.get('/api/search?q=dune&stream=jsonl')
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line)['isbn'] for line in lines] == ["9780441172719"]
+
+def test_search_rejects_unknown_stream_format(client):
+    """Test an unknown stream format is a 400."""
+    response = client.get('/api/search?q=the&stream=xml')
+    assert response.status_code == 400
+
+def test_export_round_trips_through_bulk_import(client):
+    """Test both export formats can be imported back into an empty catalog."""
+    exports = {
+        file_format: client.get(f'/api/books/export?format={file_format}').get_data(as_text=True)
+        for file_format in ('jsonl', 'csv')
+    }
+    rows = list(csv.DictReader(io.StringIO(exports['csv'])))
+    assert [json.loads(line)['id'] for line in exports['jsonl'].splitlines()] == [int(row['id']) for row in rows]
+    assert len(rows) == 13
+
+    for file_format, body in exports.items():
+        conn = get_db_connection()
+        conn.execute("DELETE FROM books")
+        conn.commit()
+        conn.close()
+        invalidate_book_cache()
+        response = client.post(f'/api/books/bulk?format={file_format}', data=body, content_type='text/plain')
+        assert response.get_json()['inserted'] == 13
+
+def test_export_rejects_unknown_format(client):
+    """Test an unknown export format is a 400."""
+    assert client.get('/api/books/export?format=xml').status_code == 400
@@ -0,0 +1,41 @@
+import os
+import pytest
+from app import create_app
+from database import insert_book, get_book_by_isbn
+from templating import row_cache, precompile_templates
+
+@pytest.fixture
+def client(temp_database, tmp_path):
+    """Test client without the response cache, compiling templates into a temporary directory."""
+    insert_book("Dune", "Frank Herbert", "9780441172719", 1, 1)
+    row_cache.clear()
+    (tmp_path / 'jinja').mkdir()
+    app = create_app({'TESTING': True, 'RESPONSE_CACHE': False, 'TEMPLATE_CACHE_DIR': str(tmp_path / 'jinja')})
+    yield app.test_client()
+    row_cache.clear()
+
+def test_catalog_rows_are_reused_until_the_book_changes(client):
+    """Test a second render reuses the row, and a borrow re-renders it with the new availability."""
+    assert '1/1 Available' in client.get('/catalog').get_data(as_text=True)
+    hits = row_cache.stats()['hits']
+    client.get('/catalog')
+    assert row_cache.stats()['hits'] == hits + 1
+
+    book_id = get_book_by_isbn("9780441172719")["id"]
+    client.post('/borrow', data={'patron_id': '123456', 'book_id': book_id})
+    html = client.get('/catalog').get_data(as_text=True)
+    assert 'Not Available' in html
+    assert f'value="{book_id}"' not in html
+
+def test_row_escapes_book_fields(client):
+    """Test cached rows are still autoescaped."""
+    insert_book("<b>Bold</b>", "Someone", "9780141439587", 1, 1)
+    html = client.get('/catalog').get_data(as_text=True)
+    assert '&lt;b&gt;Bold&lt;/b&gt;' in html
+
+def test_templates_are_compiled_to_the_bytecode_cache(client, tmp_path):
+    """Test precompiling writes bytecode for every template."""
+    count = precompile_templates(client.application)
+    templates = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
+    assert count == len([name for name in os.listdir(templates) if name.endswith('.html')])
+    assert len(os.listdir(tmp_path / 'jinja')) == count
@@ -0,0 +1,63 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from database import (
+    insert_book, get_book_by_isbn, borrow_book_transaction, return_book_transaction,
+    get_patron_borrowed_books
+)
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+@pytest.fixture(autouse=True)
+def contended_book(temp_database):
+    """Add one book with three copies to the fresh database."""
+    insert_book("Contended Book", "Test Author", "9999999999999", total_copies=3, available_copies=3)
+
+def test_concurrent_borrows_never_oversell():
+    """Test many threads borrowing the same book cannot exceed its copies."""
+    book_id = get_book_by_isbn("9999999999999")["id"]
+    results = []
+    barrier = threading.Barrier(16)
+
+    def borrow(index):
+        barrier.wait()
+        now = datetime.now()
+        status, _ = borrow_book_transaction(f"{index:06d}", book_id, now, now + timedelta(days=14), borrow_limit=5)
+        results.append(status)
+
+    threads = [threading.Thread(target=borrow, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count('borrowed') == 3
+    assert results.count('unavailable') == 13
+    assert get_book_by_isbn("9999999999999")["available_copies"] == 0
+
+def test_borrow_transaction_not_found():
+    """Test borrowing a missing book reports not_found and changes nothing."""
+    now = datetime.now()
+    status, book = borrow_book_transaction("123456", 987654, now, now + timedelta(days=14), borrow_limit=5)
+    assert status == 'not_found'
+    assert book is None
+
+def test_return_transaction_closes_one_loan():
+    """Test returning one of two copies closes only one loan."""
+    book_id = get_book_by_isbn("9999999999999")["id"]
+    borrow_book_by_patron("123456", book_id)
+    borrow_book_by_patron("123456", book_id)
+    status, book, due_date = return_book_transaction("123456", book_id, datetime.now())
+    assert status == 'returned'
+    assert book["available_copies"] == 2
+    assert isinstance(due_date, datetime)
+    assert len(get_patron_borrowed_books("123456")) == 1
+
+def test_return_book_reports_late_fee():
+    """Test returning an overdue book displays the late fee."""
+    book_id = get_book_by_isbn("9999999999999")["id"]
+    borrow_date = datetime.now() - timedelta(days=24)
+    borrow_book_transaction("123456", book_id, borrow_date, borrow_date + timedelta(days=14), borrow_limit=5)
+    success, message = return_book_by_patron("123456", book_id)
+    assert success == True
+    assert "overdue by 10 days" in message
+    assert "$6.50" in message
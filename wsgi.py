@@ -0,0 +1,27 @@
+"""
+Production WSGI entry point.
+
+Serve with the pre-fork server configured in gunicorn.conf.py:
+
+    flask migrate-db
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Schema migrations and sample data are not applied when the app loads;
+run "flask migrate-db" (and optionally "flask seed-sample-data") once per
+deployment first. The database file can be chosen with LIBRARY_DATABASE
+(default library.db) and branch shards with LIBRARY_BRANCHES; every one
+must be migrated. The overdue loan scheduler is not started in the
+workers; run "flask refresh-overdue-loans --every 300" alongside them.
+Templates are compiled here, before gunicorn forks (preload_app), so
+workers start with them already loaded.
+"""
+
+from app import create_app
+from database import check_schema_version, get_branches, use_branch
+from templating import precompile_templates
+
+app = create_app({'MIGRATE_ON_STARTUP': False, 'SAMPLE_DATA_ON_STARTUP': False, 'OVERDUE_SCHEDULER': False})
+for branch in [None, *get_branches()]:
+    with use_branch(branch):
+        check_schema_version()
+precompile_templates(app)